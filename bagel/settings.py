@@ -87,13 +87,55 @@ WSGI_APPLICATION = 'bagel.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# SQLite tuning run on every new connection (see matches/sqlite.py). The 'performance' profile
+# switches to WAL so readers don't block the writer, waits for locks instead of failing and
+# gives each connection a larger page cache and memory-mapped reads. 'default' leaves SQLite's defaults.
+SQLITE_PROFILES = {
+    'default': {},
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',  # Durable across application crashes; WAL keeps the database consistent on power loss
+        'busy_timeout': 5000,  # Milliseconds to wait for a lock before "database is locked"
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64000,  # Negative values are KiB, so 64 MB per connection
+        'temp_store': 'MEMORY',
+    },
+}
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'performance')
+SQLITE_PRAGMAS = SQLITE_PROFILES[SQLITE_PROFILE]
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests so the pragmas above run once per connection
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Seconds the sqlite3 module itself waits on a locked database
+            'timeout': SQLITE_PRAGMAS.get('busy_timeout', 5000) / 1000,
+        },
+        # A file (rather than in-memory) test database lets concurrent test connections wait for locks
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Number of BracketMatch rows written per INSERT when saving a bracket
+BRACKET_SAVE_BATCH_SIZE = int(os.environ.get('BRACKET_SAVE_BATCH_SIZE', 500))
+
+# Number of bracket sizes whose precomputed layout is kept in memory
+BRACKET_TOPOLOGY_CACHE_SIZE = int(os.environ.get('BRACKET_TOPOLOGY_CACHE_SIZE', 32))
+
+# Player ratings: starting rating and how far one match can move it
+RATING_INITIAL = float(os.environ.get('RATING_INITIAL', 1500))
+RATING_K_FACTOR = float(os.environ.get('RATING_K_FACTOR', 32))
+
+# Match scheduling: expected length of a match and minimum rest between a team's matches
+SCHEDULE_MATCH_MINUTES = int(os.environ.get('SCHEDULE_MATCH_MINUTES', 30))
+SCHEDULE_REST_MINUTES = int(os.environ.get('SCHEDULE_REST_MINUTES', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
-from pages.views import home_view, devils_discount_view, medical_bill_view, brackets_view
+from pages.views import home_view, devils_discount_view, medical_bill_view, brackets_view, bracket_scores_api
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -25,5 +25,7 @@ urlpatterns = [
     path('devils-discount/', devils_discount_view, name='devils_discount'),
     path('medical-bill/', medical_bill_view, name='medical_bill'),
     path('brackets/', brackets_view, name='brackets_view'),
+    path('brackets/api/scores/', bracket_scores_api, name='bracket_scores_api'),
     path('matches/', include('matches.urls')),
+    path('players/', include('players.urls')),
 ]
@@ -1,5 +1,10 @@
-from django.contrib import admin
-from .models import Match, Tournament, TournamentParticipant, SavedBracket, BracketMatch, TournamentResult
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
+from .models import Match, PlayerRating, PlayerStats, Tournament, TournamentParticipant, SavedBracket, BracketMatch, TournamentResult, BracketDraft, PickCount, PickSet
+from .models import recount_participants
+from .leaderboard import rebuild_leaderboard
+from .roster import parse_roster_csv, register_roster
 
 
 @admin.register(Tournament)
@@ -8,6 +13,53 @@ class TournamentAdmin(admin.ModelAdmin):
     list_filter = ['status', 'start_date', 'created_at']
     search_fields = ['name', 'description']
     date_hierarchy = 'start_date'
+    raw_id_fields = ['official_bracket']
+    actions = ['score_bracket_pool', 'register_roster', 'repair_participant_counters']
+    
+    @admin.action(description="Score saved brackets against the official bracket")
+    def score_bracket_pool(self, request, queryset):
+        for tournament in queryset.select_related('official_bracket'):
+            try:
+                points = rebuild_leaderboard(tournament)
+            except ValueError as e:
+                self.message_user(request, f"{tournament.name}: {e}", messages.ERROR)
+            else:
+                self.message_user(request, f"{tournament.name}: scored {len(points)} brackets")
+    
+    @admin.action(description="Recount registered participants")
+    def repair_participant_counters(self, request, queryset):
+        updated = recount_participants(queryset)
+        self.message_user(request, f"Recounted the participants of {updated} tournaments")
+    
+    @admin.action(description="Register a roster of players")
+    def register_roster(self, request, queryset):
+        if queryset.count() != 1:
+            self.message_user(request, "Select exactly one tournament to register a roster for", messages.ERROR)
+            return None
+        tournament = queryset.get()
+        roster = request.POST.get('roster', '')
+        assign_seeds = 'assign_seeds' in request.POST
+        if 'apply' in request.POST:
+            upload = request.FILES.get('roster_file')
+            try:
+                text = upload.read().decode('utf-8') if upload else roster
+                summary = register_roster(tournament, parse_roster_csv(text), assign_seeds=assign_seeds)
+            except (ValueError, UnicodeDecodeError) as e:
+                self.message_user(request, f"{tournament.name}: {e}", messages.ERROR)
+            else:
+                self.message_user(request, (
+                    f"{tournament.name}: registered {summary['created']} players, reactivated {summary['reactivated']}, "
+                    f"{summary['already_registered']} already registered"
+                ))
+                return None
+        return TemplateResponse(request, 'admin/matches/tournament/register_roster.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Register a roster',
+            'tournament': tournament,
+            'roster': roster,
+            'assign_seeds': assign_seeds,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
 
 
 @admin.register(TournamentParticipant)
@@ -22,11 +74,12 @@ class SavedBracketAdmin(admin.ModelAdmin):
     list_display = ['name', 'tournament', 'user', 'bracket_type', 'is_public', 'created_at']
     list_filter = ['bracket_type', 'is_public', 'tournament', 'created_at']
     search_fields = ['name', 'tournament__name', 'user__username']
+    raw_id_fields = ['pick_set']
 
 
 @admin.register(BracketMatch)
 class BracketMatchAdmin(admin.ModelAdmin):
-    list_display = ['saved_bracket', 'round_number', 'match_number', 'team1_name', 'team2_name', 'winner_name']
+    list_display = ['saved_bracket', 'round_number', 'match_number', 'team1_name', 'team2_name', 'winner_name', 'match_date', 'court']
     list_filter = ['round_number', 'saved_bracket__tournament', 'is_bye']
     search_fields = ['team1_name', 'team2_name', 'winner_name']
 
@@ -38,4 +91,39 @@ class TournamentResultAdmin(admin.ModelAdmin):
     search_fields = ['tournament__name', 'saved_bracket__name']
 
 
-admin.site.register(Match)
\ No newline at end of file
+@admin.register(BracketDraft)
+class BracketDraftAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'num_participants', 'version', 'updated_at']
+    list_filter = ['updated_at']
+    search_fields = ['user__username']
+    exclude = ['data']
+
+
+admin.site.register(Match)
+
+@admin.register(PickCount)
+class PickCountAdmin(admin.ModelAdmin):
+    list_display = ['tournament', 'round_number', 'match_number', 'team_name', 'count']
+    list_filter = ['tournament', 'round_number']
+    search_fields = ['team_name', 'tournament__name']
+
+
+@admin.register(PickSet)
+class PickSetAdmin(admin.ModelAdmin):
+    list_display = ['digest', 'num_matches', 'num_completed_matches', 'created_at']
+    search_fields = ['digest']
+    readonly_fields = ['digest', 'num_matches', 'num_completed_matches', 'created_at']
+
+
+@admin.register(PlayerRating)
+class PlayerRatingAdmin(admin.ModelAdmin):
+    list_display = ['player', 'rating', 'matches_rated']
+    search_fields = ['player__first_name', 'player__last_name']
+    readonly_fields = ['rating', 'matches_rated']
+
+
+@admin.register(PlayerStats)
+class PlayerStatsAdmin(admin.ModelAdmin):
+    list_display = ['player', 'matches_played', 'wins', 'losses', 'draws', 'points_for', 'points_against', 'recent_form']
+    search_fields = ['player__first_name', 'player__last_name']
+    readonly_fields = ['matches_played', 'wins', 'losses', 'draws', 'points_for', 'points_against', 'recent_form']
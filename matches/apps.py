@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, pre_delete
 
 
 class MatchesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'matches'
+
+    def ready(self):
+        from .models import (
+            Match, SavedBracket, TournamentParticipant, match_deleted, participant_deleted, saved_bracket_deleted,
+            saved_bracket_deleting
+        )
+        from .sqlite import configure_connection
+        connection_created.connect(configure_connection, dispatch_uid='matches_sqlite_pragmas')
+        post_delete.connect(match_deleted, sender=Match, dispatch_uid='matches_match_deleted')
+        post_delete.connect(participant_deleted, sender=TournamentParticipant, dispatch_uid='matches_participant_deleted')
+        pre_delete.connect(saved_bracket_deleting, sender=SavedBracket, dispatch_uid='matches_saved_bracket_deleting')
+        post_delete.connect(saved_bracket_deleted, sender=SavedBracket, dispatch_uid='matches_saved_bracket_deleted')
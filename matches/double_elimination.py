@@ -0,0 +1,285 @@
+"""
+Double-elimination brackets stored as SavedBracket/BracketMatch rows.
+
+Rounds are numbered consecutively: the winners bracket first, then the
+losers bracket, then the grand final and the grand-final reset. A routing
+table computed once per bracket size maps every match to where its winner
+and its loser go next, so recording a result is a constant number of
+lookups instead of a search through the bracket.
+"""
+import math
+from array import array
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import BracketMatch, SavedBracket
+from .seeding import standard_seed_order
+
+WINNERS = 'winners'
+LOSERS = 'losers'
+GRAND_FINAL = 'grand_final'
+RESET = 'reset'
+
+SIDES = ('team1', 'team2')
+
+
+class DoubleEliminationLayout:
+    """
+    Round structure and routing table of a double-elimination bracket.
+
+    For each flat match index, winner_dest/loser_dest hold the flat index of
+    the next match (-1 when the team is done) and winner_side/loser_side hold
+    0 for team1 or 1 for team2.
+    """
+
+    def __init__(self, bracket_size):
+        self.bracket_size = bracket_size
+        depth = int(math.log2(bracket_size))
+
+        sections = []
+        for round_idx in range(depth):
+            sections.append((WINNERS, bracket_size >> (round_idx + 1)))
+        for lb_round in range(2 * (depth - 1)):
+            sections.append((LOSERS, bracket_size >> (lb_round // 2 + 2)))
+        sections.append((GRAND_FINAL, 1))
+        sections.append((RESET, 1))
+        self.sections = tuple(section for section, _ in sections)
+        self.round_sizes = tuple(size for _, size in sections)
+        self.num_rounds = len(sections)
+        offsets = [0]
+        for size in self.round_sizes[:-1]:
+            offsets.append(offsets[-1] + size)
+        self.round_offsets = tuple(offsets)
+        self.num_matches = sum(self.round_sizes)
+        self.losers_start = depth
+        self.grand_final_round = self.num_rounds - 2
+        self.reset_round = self.num_rounds - 1
+
+        self.winner_dest = array('l', [-1]) * self.num_matches
+        self.winner_side = array('b', [0]) * self.num_matches
+        self.loser_dest = array('l', [-1]) * self.num_matches
+        self.loser_side = array('b', [0]) * self.num_matches
+        self._build_routes(depth)
+
+    def _route(self, dest, side_table, flat_idx, round_number, match_number, side):
+        dest[flat_idx] = self.flat_index(round_number, match_number)
+        side_table[flat_idx] = side
+
+    def _build_routes(self, depth):
+        grand_final = self.grand_final_round
+        last_losers_round = grand_final - 1
+
+        for round_idx in range(depth):
+            for match_idx in range(self.round_sizes[round_idx]):
+                flat_idx = self.flat_index(round_idx, match_idx)
+
+                # Winners move up the winners bracket, the champion to the grand final
+                if round_idx < depth - 1:
+                    self._route(self.winner_dest, self.winner_side, flat_idx, round_idx + 1, match_idx // 2, match_idx % 2)
+                else:
+                    self._route(self.winner_dest, self.winner_side, flat_idx, grand_final, 0, 0)
+
+                # Losers drop into the losers bracket
+                if depth == 1:
+                    self._route(self.loser_dest, self.loser_side, flat_idx, grand_final, 0, 1)
+                elif round_idx == 0:
+                    self._route(self.loser_dest, self.loser_side, flat_idx, self.losers_start, match_idx // 2, match_idx % 2)
+                else:
+                    drop_round = self.losers_start + 2 * round_idx - 1
+                    size = self.round_sizes[drop_round]
+                    # Reverse every other drop-down to delay rematches
+                    drop_match = size - 1 - match_idx if round_idx % 2 else match_idx
+                    self._route(self.loser_dest, self.loser_side, flat_idx, drop_round, drop_match, 1)
+
+        for round_idx in range(self.losers_start, grand_final):
+            lb_round = round_idx - self.losers_start
+            for match_idx in range(self.round_sizes[round_idx]):
+                flat_idx = self.flat_index(round_idx, match_idx)
+                if round_idx == last_losers_round:
+                    self._route(self.winner_dest, self.winner_side, flat_idx, grand_final, 0, 1)
+                elif lb_round % 2 == 0:
+                    # Survivors meet the next wave of winners-bracket losers
+                    self._route(self.winner_dest, self.winner_side, flat_idx, round_idx + 1, match_idx, 0)
+                else:
+                    self._route(self.winner_dest, self.winner_side, flat_idx, round_idx + 1, match_idx // 2, match_idx % 2)
+
+    def flat_index(self, round_number, match_number):
+        """Return the flat index of a match"""
+        return self.round_offsets[round_number] + match_number
+
+    def position(self, flat_idx):
+        """Return the (round_number, match_number) of a flat index"""
+        round_number = self.num_rounds - 1
+        while self.round_offsets[round_number] > flat_idx:
+            round_number -= 1
+        return round_number, flat_idx - self.round_offsets[round_number]
+
+    def section(self, round_number):
+        """Return which part of the bracket a round belongs to"""
+        return self.sections[round_number]
+
+    def winner_target(self, round_number, match_number):
+        """Return (round_number, match_number, side) for the winner, or None"""
+        return self._target(self.winner_dest, self.winner_side, round_number, match_number)
+
+    def loser_target(self, round_number, match_number):
+        """Return (round_number, match_number, side) for the loser, or None if eliminated"""
+        return self._target(self.loser_dest, self.loser_side, round_number, match_number)
+
+    def _target(self, dest, side_table, round_number, match_number):
+        flat_idx = self.flat_index(round_number, match_number)
+        if dest[flat_idx] < 0:
+            return None
+        next_round, next_match = self.position(dest[flat_idx])
+        return next_round, next_match, SIDES[side_table[flat_idx]]
+
+
+@lru_cache(maxsize=getattr(settings, 'BRACKET_TOPOLOGY_CACHE_SIZE', 32))
+def get_double_elimination_layout(bracket_size):
+    """Return the shared layout for a power-of-two bracket size"""
+    return DoubleEliminationLayout(bracket_size)
+
+
+def layout_for_bracket(saved_bracket):
+    """Return the layout of a saved double-elimination bracket"""
+    first_round = saved_bracket.matches.filter(round_number=0).count()
+    return get_double_elimination_layout(max(2, first_round * 2))
+
+
+def generate_double_elimination_bracket(names):
+    """
+    Generate a double-elimination bracket with names placed by seed and BYEs
+    already resolved. Returns the layout and a flat list of match dicts in
+    layout order.
+    """
+    num_participants = len(names)
+    bracket_size = max(2, 2 ** math.ceil(math.log2(num_participants)))
+    layout = get_double_elimination_layout(bracket_size)
+    order = standard_seed_order(bracket_size)
+
+    matches = [
+        {'team1': '', 'team2': '', 'winner': '', 'score1': None, 'score2': None}
+        for _ in range(layout.num_matches)
+    ]
+    for match_idx in range(layout.round_sizes[0]):
+        for side, seed in zip(SIDES, order[2 * match_idx:2 * match_idx + 2]):
+            matches[match_idx][side] = names[seed - 1] if seed <= num_participants else 'BYE'
+
+    # Walking in layout order visits every feeder match before its destinations.
+    # Matches with a BYE and a known opponent are decided now; a BYE facing a
+    # team that is still to come is decided when that team is placed.
+    for flat_idx in range(layout.round_offsets[layout.grand_final_round]):
+        match = matches[flat_idx]
+        if 'BYE' not in (match['team1'], match['team2']) or not match['team1'] or not match['team2']:
+            continue
+        match['winner'] = match['team2'] if match['team1'] == 'BYE' else match['team1']
+        round_number, match_number = layout.position(flat_idx)
+        for target, team in ((layout.winner_target(round_number, match_number), match['winner']),
+                             (layout.loser_target(round_number, match_number), 'BYE')):
+            if target is not None:
+                next_round, next_match, side = target
+                matches[layout.flat_index(next_round, next_match)][side] = team
+
+    return layout, matches
+
+
+def create_double_elimination_bracket(tournament, user, names, bracket_name="My Bracket", batch_size=None):
+    """Create a seeded double-elimination SavedBracket for a list of names"""
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+    layout, matches = generate_double_elimination_bracket(names)
+
+    with transaction.atomic():
+        saved_bracket = SavedBracket.objects.create(
+            tournament=tournament,
+            user=user,
+            name=bracket_name,
+            bracket_type='double_elimination'
+        )
+        rows = []
+        for flat_idx, match in enumerate(matches):
+            round_number, match_number = layout.position(flat_idx)
+            rows.append(BracketMatch(
+                saved_bracket=saved_bracket,
+                round_number=round_number,
+                match_number=match_number,
+                team1_name=match['team1'],
+                team2_name=match['team2'],
+                winner_name=match['winner'],
+                is_bye=match['team1'] == 'BYE' or match['team2'] == 'BYE'
+            ))
+        BracketMatch.objects.bulk_create(rows, batch_size=batch_size)
+
+        saved_bracket.num_matches = len(rows)
+        saved_bracket.num_completed_matches = sum(1 for row in rows if row.winner_name)
+        saved_bracket.save(update_fields=['num_matches', 'num_completed_matches'])
+
+    return saved_bracket
+
+
+def _place_team(saved_bracket, layout, target, team, changed):
+    """
+    Put a team into one side of a destination match. If the other side is a
+    BYE, the match is decided straight away and the team keeps moving.
+    """
+    while target is not None:
+        round_number, match_number, side = target
+        match = BracketMatch.objects.get(saved_bracket=saved_bracket, round_number=round_number, match_number=match_number)
+        setattr(match, f'{side}_name', team)
+        other = match.team2_name if side == 'team1' else match.team1_name
+        changed.append(match)
+        if other != 'BYE' or layout.section(round_number) in (GRAND_FINAL, RESET):
+            match.save()
+            return
+        match.is_bye = True
+        match.set_winner(winner_name=team)
+        target = layout.winner_target(round_number, match_number)
+
+
+def record_double_elimination_result(saved_bracket, round_number, match_number, score1, score2, layout=None):
+    """
+    Record the score of one match and route its winner and loser using the
+    precomputed table. Winning the grand final from the losers bracket
+    sends both teams to the reset match. Returns the matches that changed.
+    A match that already has a result cannot be recorded again, since its
+    teams may have played on since.
+    """
+    if score1 < 0 or score2 < 0:
+        raise ValueError("Scores cannot be negative")
+    if score1 == score2:
+        raise ValueError("Double-elimination matches cannot end in a tie")
+    if layout is None:
+        layout = layout_for_bracket(saved_bracket)
+
+    with transaction.atomic():
+        match = BracketMatch.objects.get(saved_bracket=saved_bracket, round_number=round_number, match_number=match_number)
+        if not match.team1_name or not match.team2_name:
+            raise ValueError("Both teams must be known before recording a result")
+        if match.winner_name:
+            raise ValueError("This match already has a result")
+        match.team1_score = score1
+        match.team2_score = score2
+        winner_side = 'team1' if score1 > score2 else 'team2'
+        winner = getattr(match, f'{winner_side}_name')
+        loser = match.team2_name if winner_side == 'team1' else match.team1_name
+        match.set_winner(winner_name=winner)
+        changed = [match]
+
+        section = layout.section(round_number)
+        if section == GRAND_FINAL:
+            if winner_side == 'team2':
+                # The losers-bracket champion forced a deciding match
+                reset = BracketMatch.objects.get(saved_bracket=saved_bracket, round_number=layout.reset_round, match_number=0)
+                reset.team1_name = match.team1_name
+                reset.team2_name = match.team2_name
+                reset.save()
+                changed.append(reset)
+            return changed
+        if section == RESET:
+            return changed
+
+        _place_team(saved_bracket, layout, layout.winner_target(round_number, match_number), winner, changed)
+        _place_team(saved_bracket, layout, layout.loser_target(round_number, match_number), loser, changed)
+    return changed
@@ -0,0 +1,43 @@
+"""
+Session helpers for bracket drafts.
+
+The session only stores the id of the user's current BracketDraft, so the
+session row is rewritten when a new bracket is started rather than on every
+score update.
+"""
+from .models import BracketDraft, pack_bracket_data
+
+DRAFT_SESSION_KEY = 'bracket_draft_id'
+
+
+def get_session_draft(request):
+    """Return the BracketDraft for this session, or None"""
+    draft_id = request.session.get(DRAFT_SESSION_KEY)
+    if draft_id is not None:
+        draft = BracketDraft.objects.filter(pk=draft_id).first()
+        if draft is not None:
+            return draft
+        del request.session[DRAFT_SESSION_KEY]
+
+    # Move brackets stored by older versions out of the session
+    bracket_data = request.session.pop('bracket_data', None)
+    if bracket_data:
+        num_participants = request.session.pop('num_participants', 0)
+        request.session.pop('total_slots', None)
+        return start_session_draft(request, bracket_data, num_participants)
+    return None
+
+
+def start_session_draft(request, bracket_data, num_participants):
+    """Store bracket data in a new draft and make it the session's current draft"""
+    previous_id = request.session.get(DRAFT_SESSION_KEY)
+    if previous_id is not None:
+        BracketDraft.objects.filter(pk=previous_id).delete()
+
+    draft = BracketDraft.objects.create(
+        user=request.user if request.user.is_authenticated else None,
+        num_participants=num_participants,
+        data=pack_bracket_data(bracket_data)
+    )
+    request.session[DRAFT_SESSION_KEY] = draft.pk
+    return draft
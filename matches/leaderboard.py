@@ -0,0 +1,198 @@
+"""
+Live bracket-pool leaderboard kept in TournamentResult.
+
+rebuild_leaderboard() scores every bracket from scratch. After that, each
+official result only touches the brackets that picked one of its two teams:
+the winner's pickers gain points and the loser's pickers lose the points
+they could still have earned with that team. The ranking itself is read
+through the (tournament, -points_earned) index, so top-N and rank lookups
+never sort the whole pool.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, Max, OuterRef, Q, Sum
+
+from .models import BracketMatch, TournamentResult
+from .scoring import (
+    fan_out_points, pool_pick_points, round_points_case, round_points_table, score_tournament_brackets
+)
+
+
+def _official_round_points(official, points_per_round=None):
+    num_rounds = (official.pick_matches().aggregate(max_round=Max('round_number'))['max_round'] or 0) + 1
+    return round_points_table(num_rounds, points_per_round)
+
+
+def _eliminated_teams(official):
+    """Return the names of the teams that lost an official match"""
+    eliminated = set()
+    for team1, team2, winner in official.pick_matches().exclude(winner_name='').values_list('team1_name', 'team2_name', 'winner_name'):
+        eliminated.add(team2 if winner == team1 else team1)
+    eliminated.discard('')
+    return eliminated
+
+
+def remaining_points(tournament, official, points):
+    """
+    Return {saved_bracket_id: points} still reachable by each bracket: picks
+    for undecided official slots whose team has not been eliminated.
+    """
+    eliminated = _eliminated_teams(official)
+
+    undecided_slot = official.pick_matches().filter(
+        round_number=OuterRef('round_number'),
+        match_number=OuterRef('match_number'),
+        winner_name=''
+    )
+    by_bracket, by_pick_set = pool_pick_points(
+        tournament, official, points, Exists(undecided_slot), ~Q(winner_name__in=eliminated)
+    )
+    return fan_out_points(tournament, official, by_bracket, by_pick_set)
+
+
+def _add_to_results(tournament, field, by_bracket, by_pick_set, sign):
+    """
+    Add sign * points to a TournamentResult field, with one UPDATE per
+    distinct amount covering both brackets and shared pick sets.
+    """
+    groups = defaultdict(lambda: ([], []))
+    for bracket_id, value in by_bracket.items():
+        groups[value][0].append(bracket_id)
+    for pick_set_id, value in by_pick_set.items():
+        groups[value][1].append(pick_set_id)
+    results = TournamentResult.objects.filter(tournament=tournament)
+    for value, (bracket_ids, pick_set_ids) in groups.items():
+        results.filter(Q(saved_bracket__in=bracket_ids) | Q(saved_bracket__pick_set__in=pick_set_ids)).update(
+            **{field: F(field) + sign * value}
+        )
+
+
+def rebuild_leaderboard(tournament, points_per_round=None, batch_size=None):
+    """
+    Score the whole pool and store current and maximum possible points.
+    Returns {saved_bracket_id: points}.
+    """
+    official = tournament.official_bracket
+    if official is None:
+        raise ValueError("The tournament has no official bracket to score against")
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+    points = _official_round_points(official, points_per_round)
+
+    with transaction.atomic():
+        points_by_bracket = score_tournament_brackets(tournament, points_per_round=points, batch_size=batch_size)
+        remaining = remaining_points(tournament, official, points)
+        results = list(TournamentResult.objects.filter(tournament=tournament).only(
+            'id', 'saved_bracket_id', 'points_earned', 'max_possible_points'
+        ))
+        for result in results:
+            result.max_possible_points = result.points_earned + remaining.get(result.saved_bracket_id, 0)
+        TournamentResult.objects.bulk_update(results, ['max_possible_points'], batch_size=batch_size)
+    return points_by_bracket
+
+
+def rescore_bracket(saved_bracket, points_per_round=None):
+    """
+    Bring one pool bracket's TournamentResult up to date after its picks
+    were saved, so a bracket created or edited after scoring started is
+    neither missing from the leaderboard nor left with its old points.
+    Does nothing before the pool has been scored.
+    """
+    tournament = saved_bracket.tournament
+    official = tournament.official_bracket
+    if (official is None or official.pk == saved_bracket.pk or saved_bracket.bracket_type != official.bracket_type
+            or not TournamentResult.objects.filter(tournament=tournament).exists()):
+        return None
+    round_points = round_points_case(_official_round_points(official, points_per_round))
+
+    picks = saved_bracket.pick_matches().exclude(winner_name='').order_by()
+    official_slot = official.pick_matches().filter(round_number=OuterRef('round_number'), match_number=OuterRef('match_number'))
+    earned = picks.filter(
+        Exists(official_slot.filter(winner_name=OuterRef('winner_name')))
+    ).aggregate(total=Sum(round_points))['total'] or 0
+    remaining = picks.filter(
+        Exists(official_slot.filter(winner_name='')), ~Q(winner_name__in=_eliminated_teams(official))
+    ).aggregate(total=Sum(round_points))['total'] or 0
+
+    others = TournamentResult.objects.filter(tournament=tournament).exclude(saved_bracket=saved_bracket)
+    result, _ = TournamentResult.objects.update_or_create(
+        tournament=tournament,
+        saved_bracket=saved_bracket,
+        defaults={
+            'points_earned': earned,
+            'max_possible_points': earned + remaining,
+            'final_position': others.filter(points_earned__gt=earned).count() + 1,
+        }
+    )
+    return result
+
+
+def record_official_result(tournament, round_number, match_number, winner_name, points_per_round=None):
+    """
+    Record the winner of an official single-elimination match and update
+    the leaderboard for the brackets it affects. Correcting a result that
+    was already entered falls back to a full rebuild.
+    """
+    official = tournament.official_bracket
+    if official is None:
+        raise ValueError("The tournament has no official bracket")
+    points = _official_round_points(official, points_per_round)
+
+    with transaction.atomic():
+        # Results are written into the official bracket's own rows
+        official.detach_pick_set()
+        match = BracketMatch.objects.get(saved_bracket=official, round_number=round_number, match_number=match_number)
+        if winner_name not in (match.team1_name, match.team2_name) or not winner_name:
+            raise ValueError(f"{winner_name!r} is not playing in this match")
+        previous_winner = match.winner_name
+        if previous_winner == winner_name:
+            return
+        loser_name = match.team2_name if winner_name == match.team1_name else match.team1_name
+        match.set_winner(winner_name=winner_name)
+
+        # Advance the winner in the official bracket
+        next_match = BracketMatch.objects.filter(
+            saved_bracket=official, round_number=round_number + 1, match_number=match_number // 2
+        ).first()
+        if next_match is not None:
+            setattr(next_match, 'team1_name' if match_number % 2 == 0 else 'team2_name', winner_name)
+            next_match.save()
+
+        if previous_winner:
+            rebuild_leaderboard(tournament, points_per_round=points)
+            return
+
+        # Brackets that picked the winner score the points for this round
+        _add_to_results(tournament, 'points_earned', *pool_pick_points(
+            tournament, official, points,
+            Q(round_number=round_number, match_number=match_number, winner_name=winner_name)
+        ), 1)
+
+        # Brackets that picked the loser here or later lose those potential points
+        _add_to_results(tournament, 'max_possible_points', *pool_pick_points(
+            tournament, official, points, Q(winner_name=loser_name, round_number__gte=round_number)
+        ), -1)
+
+
+def _visible_results(tournament, user=None):
+    """Results of the public brackets, plus the user's own private ones"""
+    visible = Q(saved_bracket__is_public=True)
+    if user is not None and user.is_authenticated:
+        visible |= Q(saved_bracket__user=user)
+    return TournamentResult.objects.filter(visible, tournament=tournament)
+
+
+def leaderboard_top(tournament, limit=25, user=None):
+    """Return the top leaderboard entries, best first. Private brackets are only shown to their owner"""
+    return _visible_results(tournament, user).select_related(
+        'saved_bracket__user'
+    ).defer('saved_bracket__snapshot').order_by('-points_earned', '-max_possible_points', 'saved_bracket_id')[:limit]
+
+
+def leaderboard_rank(result):
+    """Return the 1-based rank of a TournamentResult among the public brackets, ties sharing a rank"""
+    return TournamentResult.objects.filter(
+        tournament_id=result.tournament_id, saved_bracket__is_public=True, points_earned__gt=result.points_earned
+    ).count() + 1
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from matches.sqlite import apply_pragmas
+
+SCHEMA = (
+    "CREATE TABLE bracket (id INTEGER PRIMARY KEY, num_matches INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE bracket_match (id INTEGER PRIMARY KEY, bracket_id INTEGER NOT NULL, "
+    "round_number INTEGER NOT NULL, match_number INTEGER NOT NULL, winner_name TEXT NOT NULL)",
+    "CREATE INDEX bracket_match_bracket ON bracket_match (bracket_id)",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent bracket-save throughput on a scratch SQLite database under each "
+        "profile in SQLITE_PROFILES. The application database is not touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writers')
+        parser.add_argument('--seconds', type=float, default=5, help='How long each profile runs')
+        parser.add_argument('--matches', type=int, default=63, help='Rows written per bracket save')
+        parser.add_argument('--profiles', nargs='+', help='Profiles to compare (default: all of SQLITE_PROFILES)')
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or list(settings.SQLITE_PROFILES)
+        unknown = [name for name in profiles if name not in settings.SQLITE_PROFILES]
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(unknown)}")
+
+        results = {}
+        for name in profiles:
+            saves, locked = self.run_profile(
+                settings.SQLITE_PROFILES[name], options['threads'], options['seconds'], options['matches']
+            )
+            results[name] = saves / options['seconds']
+            self.stdout.write(
+                f"{name:>12}: {results[name]:8.1f} saves/s, {locked} \"database is locked\" errors"
+            )
+
+        baseline = results.get('default')
+        if baseline:
+            for name, rate in results.items():
+                if name != 'default':
+                    self.stdout.write(self.style.SUCCESS(f"{name} is {rate / baseline:.1f}x the default profile"))
+
+    def run_profile(self, pragmas, threads, seconds, matches):
+        """Return (saves, locked errors) for one profile on a fresh scratch database"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'benchmark.sqlite3')
+            setup = sqlite3.connect(path)
+            for statement in SCHEMA:
+                setup.execute(statement)
+            setup.executemany("INSERT INTO bracket (id) VALUES (?)", [(idx,) for idx in range(threads)])
+            setup.commit()
+            setup.close()
+
+            counts = [0] * threads
+            locked = [0] * threads
+            deadline = time.perf_counter() + seconds
+            # Without pragmas, connect per save as CONN_MAX_AGE = 0 would; with them, keep one connection
+            persistent = bool(pragmas)
+
+            def connect():
+                connection = sqlite3.connect(path, timeout=pragmas.get('busy_timeout', 5000) / 1000)
+                apply_pragmas(connection.cursor(), pragmas)
+                return connection
+
+            def writer(idx):
+                connection = connect() if persistent else None
+                while time.perf_counter() < deadline:
+                    if not persistent:
+                        connection = connect()
+                    try:
+                        # Read then write in one transaction, like a bracket save
+                        connection.execute("SELECT num_matches FROM bracket WHERE id = ?", (idx,)).fetchone()
+                        connection.execute("DELETE FROM bracket_match WHERE bracket_id = ?", (idx,))
+                        connection.executemany(
+                            "INSERT INTO bracket_match (bracket_id, round_number, match_number, winner_name) VALUES (?, ?, ?, ?)",
+                            [(idx, number // 32, number % 32, f"Team {number}") for number in range(matches)]
+                        )
+                        connection.execute("UPDATE bracket SET num_matches = ? WHERE id = ?", (matches, idx))
+                        connection.commit()
+                        counts[idx] += 1
+                    except sqlite3.OperationalError:
+                        connection.rollback()
+                        locked[idx] += 1
+                    if not persistent:
+                        connection.close()
+                if persistent:
+                    connection.close()
+
+            workers = [threading.Thread(target=writer, args=(idx,)) for idx in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        return sum(counts), sum(locked)
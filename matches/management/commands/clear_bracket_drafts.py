@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from matches.models import BracketDraft
+
+
+class Command(BaseCommand):
+    help = "Delete bracket drafts that have not been updated recently"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Delete drafts untouched for this many days')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = BracketDraft.objects.filter(updated_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} bracket drafts"))
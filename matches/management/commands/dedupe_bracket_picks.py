@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from matches.models import PICK_BRACKET_TYPE, BracketMatch, PickSet, SavedBracket, Tournament, pick_set_for_matches
+
+
+class Command(BaseCommand):
+    help = "Move the picks of saved brackets into shared pick sets so identical brackets are stored once"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tournament', type=int, help='Only convert brackets of this tournament id')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        # Official brackets keep their own rows so results can be entered match by match
+        brackets = SavedBracket.objects.filter(pick_set__isnull=True, bracket_type=PICK_BRACKET_TYPE).exclude(
+            pk__in=Tournament.objects.filter(official_bracket__isnull=False).values('official_bracket')
+        ).only('id')
+        if options['tournament']:
+            brackets = brackets.filter(tournament_id=options['tournament'])
+
+        converted = 0
+        pick_sets = set()
+        for bracket in brackets.iterator(chunk_size=options['batch_size']):
+            matches = list(BracketMatch.objects.filter(saved_bracket=bracket).order_by('round_number', 'match_number'))
+            if any(match.team1_player_id or match.team2_player_id or match.winner_id for match in matches):
+                continue
+            for match in matches:
+                match.pk = None
+                match.saved_bracket = None
+            with transaction.atomic():
+                pick_set = pick_set_for_matches(matches, batch_size=options['batch_size'])
+                BracketMatch.objects.filter(saved_bracket=bracket).delete()
+                SavedBracket.objects.filter(pk=bracket.pk).update(pick_set=pick_set, snapshot=None)
+            converted += 1
+            pick_sets.add(pick_set.pk)
+
+        # Pick sets left behind by bracket deletes that did not release them
+        _, deleted = PickSet.objects.filter(brackets__isnull=True).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {converted} brackets into {len(pick_sets)} distinct pick sets, "
+            f"deleted {deleted.get('matches.PickSet', 0)} unused pick sets"
+        ))
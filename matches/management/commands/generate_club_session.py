@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from matches.matchmaking import create_session_matches, plan_session
+from matches.models import Tournament
+from players.models import Player
+
+
+class Command(BaseCommand):
+    help = "Create balanced doubles matches for a club session"
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument('--players', type=int, nargs='+', help='Ids of the players attending')
+        group.add_argument('--tournament', type=int, help='Use the active participants of this tournament')
+        parser.add_argument('--rounds', type=int, default=1)
+        parser.add_argument('--courts', type=int, help='Courts available (default: as many as the players fill)')
+        parser.add_argument('--mixed', action='store_true', help='Play mixed doubles where the numbers allow')
+        parser.add_argument('--seed', type=int, help='Random seed for choosing who sits out')
+        parser.add_argument('--dry-run', action='store_true', help='Print the plan without creating matches')
+
+    def handle(self, *args, **options):
+        if options['tournament'] is not None:
+            if not Tournament.objects.filter(pk=options['tournament']).exists():
+                raise CommandError(f"Tournament {options['tournament']} does not exist")
+            players = Player.objects.filter(
+                tournament_participations__tournament_id=options['tournament'],
+                tournament_participations__is_active=True
+            )
+        else:
+            players = Player.objects.filter(pk__in=options['players'])
+        players = list(players)
+        if len(players) < 4:
+            raise CommandError("At least four players are needed")
+
+        session = plan_session(
+            players, options['rounds'], courts=options['courts'], mixed=options['mixed'], seed=options['seed']
+        )
+        for number, round_matches in enumerate(session, start=1):
+            self.stdout.write(f"Round {number}")
+            for court, (team1, team2) in enumerate(round_matches, start=1):
+                names = [f"{player.first_name} {player.last_name}" for player in team1 + team2]
+                self.stdout.write(f"  Court {court}: {names[0]} & {names[1]} vs {names[2]} & {names[3]}")
+
+        if not options['dry_run']:
+            matches = create_session_matches(session)
+            self.stdout.write(self.style.SUCCESS(f"Created {len(matches)} matches"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from matches.participation import rebuild_match_participations
+
+
+class Command(BaseCommand):
+    help = "Rewrite the match participation index from the Match table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        rows = rebuild_match_participations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} participation rows"))
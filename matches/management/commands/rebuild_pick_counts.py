@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from matches.models import Tournament
+from matches.picks import rebuild_pick_counts
+
+
+class Command(BaseCommand):
+    help = "Recount the pick distribution of public brackets from their matches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tournament', type=int, help='Only rebuild this tournament id')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        tournaments = Tournament.objects.all()
+        if options['tournament']:
+            tournaments = tournaments.filter(pk=options['tournament'])
+            if not tournaments.exists():
+                raise CommandError(f"Tournament {options['tournament']} does not exist")
+
+        for tournament in tournaments:
+            rows = rebuild_pick_counts(tournament, batch_size=options['batch_size'])
+            self.stdout.write(f"{tournament.name}: {rows} pick counts")
+        self.stdout.write(self.style.SUCCESS("Pick counts rebuilt"))
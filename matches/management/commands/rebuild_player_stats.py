@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from matches.player_stats import rebuild_player_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute every player's match statistics from the Match table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        players = rebuild_player_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {players} players"))
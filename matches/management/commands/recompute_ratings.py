@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from matches.ratings import recompute_ratings
+
+
+class Command(BaseCommand):
+    help = "Rebuild every player's rating by replaying the full match history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        replayed = recompute_ratings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Replayed {replayed} matches in {time.perf_counter() - started:.1f}s"
+        ))
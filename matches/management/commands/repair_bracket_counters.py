@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from matches.models import SavedBracket
+
+
+class Command(BaseCommand):
+    help = "Audit the stored match counters on saved brackets and optionally repair any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Write corrected counters back to the database')
+        parser.add_argument('--tournament', type=int, help='Only check brackets for this tournament id')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per UPDATE when repairing')
+
+    def handle(self, *args, **options):
+        brackets = SavedBracket.objects.with_actual_counts().only('id', 'num_matches', 'num_completed_matches')
+        if options['tournament']:
+            brackets = brackets.filter(tournament_id=options['tournament'])
+
+        drifted = []
+        checked = 0
+        for bracket in brackets.iterator(chunk_size=options['batch_size']):
+            checked += 1
+            if (bracket.num_matches != bracket.actual_match_count
+                    or bracket.num_completed_matches != bracket.actual_completed_count):
+                self.stdout.write(
+                    f"Bracket {bracket.id}: stored {bracket.num_completed_matches}/{bracket.num_matches}, "
+                    f"actual {bracket.actual_completed_count}/{bracket.actual_match_count}"
+                )
+                bracket.num_matches = bracket.actual_match_count
+                bracket.num_completed_matches = bracket.actual_completed_count
+                drifted.append(bracket)
+
+        if drifted and options['repair']:
+            SavedBracket.objects.bulk_update(
+                drifted, ['num_matches', 'num_completed_matches'], batch_size=options['batch_size']
+            )
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(drifted)} of {checked} brackets"))
+        elif drifted:
+            self.stdout.write(self.style.WARNING(
+                f"{len(drifted)} of {checked} brackets have drifted counters; run with --repair to fix"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"All {checked} brackets have correct counters"))
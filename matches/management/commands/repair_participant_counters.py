@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from matches.models import Tournament, recount_participants
+
+
+class Command(BaseCommand):
+    help = "Audit the stored participant counters on tournaments and optionally repair any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Write corrected counters back to the database')
+        parser.add_argument('--tournament', type=int, help='Only check this tournament id')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per UPDATE when repairing')
+
+    def handle(self, *args, **options):
+        tournaments = Tournament.objects.with_stats().only('id', 'name', 'num_participants')
+        if options['tournament']:
+            tournaments = tournaments.filter(pk=options['tournament'])
+
+        drifted = []
+        checked = 0
+        for tournament in tournaments.iterator(chunk_size=options['batch_size']):
+            checked += 1
+            if tournament.num_participants != tournament.active_participant_count:
+                self.stdout.write(
+                    f"Tournament {tournament.id} ({tournament.name}): stored {tournament.num_participants}, "
+                    f"actual {tournament.active_participant_count}"
+                )
+                drifted.append(tournament)
+
+        if drifted and options['repair']:
+            # Recounted in the UPDATE itself, so registrations made since the audit are not lost
+            for start in range(0, len(drifted), options['batch_size']):
+                batch = drifted[start:start + options['batch_size']]
+                recount_participants(Tournament.objects.filter(pk__in=[tournament.pk for tournament in batch]))
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(drifted)} of {checked} tournaments"))
+        elif drifted:
+            self.stdout.write(self.style.WARNING(
+                f"{len(drifted)} of {checked} tournaments have drifted counters; run with --repair to fix"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"All {checked} tournaments have correct counters"))
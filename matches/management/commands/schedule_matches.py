@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+
+from matches.models import Tournament
+from matches.scheduling import schedule_bracket
+
+
+class Command(BaseCommand):
+    help = "Give every pending match of a tournament's official bracket a court and a start time"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_id', type=int)
+        parser.add_argument('--courts', type=int, required=True)
+        parser.add_argument('--start', help='Earliest start, e.g. 2024-05-01T09:00 (default: now)')
+        parser.add_argument('--match-minutes', type=int, help='Expected length of a match')
+        parser.add_argument('--rest-minutes', type=int, help='Minimum rest between two matches of a team')
+
+    def handle(self, *args, **options):
+        try:
+            tournament = Tournament.objects.select_related('official_bracket').get(pk=options['tournament_id'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f"Tournament {options['tournament_id']} does not exist")
+        if tournament.official_bracket is None:
+            raise CommandError("The tournament has no official bracket to schedule")
+
+        start = None
+        if options['start']:
+            start = parse_datetime(options['start'])
+            if start is None:
+                raise CommandError(f"Invalid --start {options['start']!r}")
+            if timezone.is_naive(start):
+                start = timezone.make_aware(start)
+
+        try:
+            planned = schedule_bracket(
+                tournament.official_bracket, options['courts'], start=start,
+                match_minutes=options['match_minutes'], rest_minutes=options['rest_minutes']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Scheduled {planned} matches for {tournament.name}"))
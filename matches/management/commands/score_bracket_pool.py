@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from matches.models import Tournament
+from matches.leaderboard import rebuild_leaderboard
+
+
+class Command(BaseCommand):
+    help = "Score every saved bracket of a tournament against its official bracket"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_id', type=int)
+        parser.add_argument(
+            '--points', type=int, nargs='+',
+            help='Points for a correct pick in each round, e.g. --points 1 2 4 8 16 32'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            tournament = Tournament.objects.get(pk=options['tournament_id'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f"Tournament {options['tournament_id']} does not exist")
+
+        try:
+            points = rebuild_leaderboard(tournament, points_per_round=options['points'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Scored {len(points)} brackets for {tournament.name}"))
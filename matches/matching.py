@@ -0,0 +1,462 @@
+"""
+Maximum-weight matching in general graphs (Edmonds' blossom algorithm).
+
+This is the primal-dual method of Galil, "Efficient algorithms for finding
+maximum matching in graphs" (1986), in the form popularised by Joris van
+Rantwijk's public domain mwmatching.py. It runs in O(n^3) time in the worst
+case. Two changes fit it to pairing rounds, where nearly every player can
+be paired with a neighbour in the ranking:
+
+- The largest matching is always preferred, and only then the weight.
+- The search starts from a greedy matching. Each vertex's dual starts at its
+  best edge weight, and edges made tight by lowering the duals of two single
+  vertices are matched, so only the vertices left over need augmenting
+  paths. The result is optimal whenever it is a perfect matching. For graphs
+  without one, the search is repeated from an empty matching.
+
+Weights must be integers; all arithmetic stays in integers.
+"""
+
+
+def max_weight_matching(edges):
+    """
+    Return mate, a list where mate[v] is the vertex matched to v or -1, for
+    a matching of maximum cardinality and, among those, maximum total weight.
+    edges is a list of (i, j, weight) with integer vertices from 0 and
+    integer weights; there is at most one edge between two vertices.
+    """
+    if not edges:
+        return []
+    mate = _blossom_matching(edges, warm_start=True)
+    if -1 in mate:
+        # A greedy start only guarantees the best weight for perfect matchings
+        mate = _blossom_matching(edges, warm_start=False)
+    return mate
+
+
+def _blossom_matching(edges, warm_start):
+    """Run the blossom algorithm, from a greedy matching or from an empty one"""
+    # Doubled weights keep every dual even at the start, so every dual step is an integer
+    edges = [(i, j, 2 * weight) for i, j, weight in edges]
+    nedge = len(edges)
+    nvertex = 1 + max(max(i, j) for i, j, _ in edges)
+
+    # endpoint[p] is the vertex at endpoint p; edge k has endpoints 2k and 2k + 1
+    endpoint = [edges[p // 2][p % 2] for p in range(2 * nedge)]
+    # neighbend[v] lists the remote endpoints of the edges at v
+    neighbend = [[] for _ in range(nvertex)]
+    for k, (i, j, _) in enumerate(edges):
+        neighbend[i].append(2 * k + 1)
+        neighbend[j].append(2 * k)
+
+    # mate[v] is the remote endpoint of v's matched edge, or -1
+    mate = [-1] * nvertex
+    # Labels of top-level blossoms and vertices: 0 free, 1 S (outer), 2 T (inner)
+    label = [0] * (2 * nvertex)
+    labelend = [-1] * (2 * nvertex)
+    inblossom = list(range(nvertex))
+    blossomparent = [-1] * (2 * nvertex)
+    blossomchilds = [None] * (2 * nvertex)
+    blossombase = list(range(nvertex)) + [-1] * nvertex
+    blossomendps = [None] * (2 * nvertex)
+    bestedge = [-1] * (2 * nvertex)
+    blossombestedges = [None] * (2 * nvertex)
+    unusedblossoms = list(range(nvertex, 2 * nvertex))
+    usedblossoms = set()
+    # Vertex duals start at the largest weight, or at each vertex's best edge
+    # weight for a greedy start; either way every slack is >= 0
+    dualvar = [0] * (2 * nvertex)
+    for i, j, weight in edges:
+        dualvar[i] = max(dualvar[i], weight)
+        dualvar[j] = max(dualvar[j], weight)
+    if not warm_start:
+        dualvar[:nvertex] = [max(dualvar[:nvertex])] * nvertex
+    allowedge = [False] * nedge
+    queue = []
+    # Vertices in this stage's trees, and vertices and blossoms with a best edge;
+    # supersets, so dual updates only visit the trees instead of the whole graph
+    treevertices = set()
+    bestedgeholders = set()
+
+    def slack(k):
+        i, j, weight = edges[k]
+        return dualvar[i] + dualvar[j] - 2 * weight
+
+    def min_slack(v):
+        return min(slack(p // 2) for p in neighbend[v])
+
+    if warm_start:
+        # Edges with zero slack are the best edge of both of their vertices
+        for k, (i, j, _) in enumerate(edges):
+            if mate[i] == -1 and mate[j] == -1 and slack(k) == 0:
+                mate[i] = 2 * k + 1
+                mate[j] = 2 * k
+        # Then lower the duals of two single neighbours until their edge is tight,
+        # as far as neither of them gets an edge with negative slack
+        for v in range(nvertex):
+            if mate[v] != -1 or not neighbend[v]:
+                continue
+            dualvar[v] -= min_slack(v)
+            for p in sorted(neighbend[v], key=lambda p: slack(p // 2)):
+                w = endpoint[p]
+                if mate[w] != -1:
+                    continue
+                needed = slack(p // 2)
+                if needed <= min_slack(w):
+                    dualvar[w] -= needed
+                    mate[v] = p
+                    mate[w] = p ^ 1
+                    break
+
+    def blossom_leaves(b):
+        """Yield the vertices inside blossom b"""
+        if b < nvertex:
+            yield b
+            return
+        stack = [iter(blossomchilds[b])]
+        while stack:
+            t = next(stack[-1], None)
+            if t is None:
+                stack.pop()
+            elif t < nvertex:
+                yield t
+            else:
+                stack.append(iter(blossomchilds[t]))
+
+    def assign_label(w, t, p):
+        """Label vertex w and its top-level blossom t, reached through endpoint p"""
+        while True:
+            b = inblossom[w]
+            label[w] = label[b] = t
+            labelend[w] = labelend[b] = p
+            bestedge[w] = bestedge[b] = -1
+            treevertices.update(blossom_leaves(b))
+            if t == 1:
+                queue.extend(blossom_leaves(b))
+                return
+            # b became a T-blossom: its mate becomes an S-blossom
+            base = blossombase[b]
+            w, t, p = endpoint[mate[base]], 1, mate[base] ^ 1
+
+    def scan_blossom(v, w):
+        """Trace back from S-vertices v and w: return the base of a new blossom, or -1 for an augmenting path"""
+        path = []
+        base = -1
+        while v != -1 or w != -1:
+            b = inblossom[v]
+            if label[b] & 4:
+                base = blossombase[b]
+                break
+            path.append(b)
+            label[b] = 5
+            if labelend[b] == -1:
+                # The base of b is single; stop tracing this path
+                v = -1
+            else:
+                v = endpoint[labelend[b]]
+                b = inblossom[v]
+                v = endpoint[labelend[b]]
+            if w != -1:
+                v, w = w, v
+        for b in path:
+            label[b] = 1
+        return base
+
+    def add_blossom(base, k):
+        """Make a new blossom from the cycle closed by edge k through the given base"""
+        v, w, _ = edges[k]
+        bb = inblossom[base]
+        bv = inblossom[v]
+        bw = inblossom[w]
+        b = unusedblossoms.pop()
+        usedblossoms.add(b)
+        blossombase[b] = base
+        blossomparent[b] = -1
+        blossomparent[bb] = b
+        blossomchilds[b] = path = []
+        blossomendps[b] = endps = []
+        while bv != bb:
+            blossomparent[bv] = b
+            path.append(bv)
+            endps.append(labelend[bv])
+            v = endpoint[labelend[bv]]
+            bv = inblossom[v]
+        path.append(bb)
+        path.reverse()
+        endps.reverse()
+        endps.append(2 * k)
+        while bw != bb:
+            blossomparent[bw] = b
+            path.append(bw)
+            endps.append(labelend[bw] ^ 1)
+            w = endpoint[labelend[bw]]
+            bw = inblossom[w]
+        label[b] = 1
+        labelend[b] = labelend[bb]
+        dualvar[b] = 0
+        for v in blossom_leaves(b):
+            if label[inblossom[v]] == 2:
+                # Former T-vertices are now S-vertices and need scanning
+                queue.append(v)
+            inblossom[v] = b
+
+        # Keep the least-slack edge from the new blossom to each other S-blossom
+        bestedgeto = {}
+        for bv in path:
+            if blossombestedges[bv] is None:
+                nblists = [[p // 2 for p in neighbend[v]] for v in blossom_leaves(bv)]
+            else:
+                nblists = [blossombestedges[bv]]
+            for nblist in nblists:
+                for k in nblist:
+                    i, j, _ = edges[k]
+                    if inblossom[j] == b:
+                        i, j = j, i
+                    bj = inblossom[j]
+                    if (bj != b and label[bj] == 1
+                            and (bj not in bestedgeto or slack(k) < slack(bestedgeto[bj]))):
+                        bestedgeto[bj] = k
+            blossombestedges[bv] = None
+            bestedge[bv] = -1
+        blossombestedges[b] = list(bestedgeto.values())
+        bestedge[b] = -1
+        for k in blossombestedges[b]:
+            if bestedge[b] == -1 or slack(k) < slack(bestedge[b]):
+                bestedge[b] = k
+        bestedgeholders.add(b)
+
+    def expand_blossom(b, endstage):
+        """Turn the children of blossom b back into top-level blossoms"""
+        for s in blossomchilds[b]:
+            blossomparent[s] = -1
+            if s < nvertex:
+                inblossom[s] = s
+            elif endstage and dualvar[s] == 0:
+                expand_blossom(s, endstage)
+            else:
+                for v in blossom_leaves(s):
+                    inblossom[v] = s
+        if not endstage and label[b] == 2:
+            # Relabel the children along the even path from the entry child to the base
+            entrychild = inblossom[endpoint[labelend[b] ^ 1]]
+            j = blossomchilds[b].index(entrychild)
+            if j & 1:
+                j -= len(blossomchilds[b])
+                jstep = 1
+                endptrick = 0
+            else:
+                jstep = -1
+                endptrick = 1
+            p = labelend[b]
+            while j != 0:
+                label[endpoint[p ^ 1]] = 0
+                label[endpoint[blossomendps[b][j - endptrick] ^ endptrick ^ 1]] = 0
+                assign_label(endpoint[p ^ 1], 2, p)
+                allowedge[blossomendps[b][j - endptrick] // 2] = True
+                j += jstep
+                p = blossomendps[b][j - endptrick] ^ endptrick
+                allowedge[p // 2] = True
+                j += jstep
+            bv = blossomchilds[b][j]
+            label[endpoint[p ^ 1]] = label[bv] = 2
+            labelend[endpoint[p ^ 1]] = labelend[bv] = p
+            bestedge[bv] = -1
+            j += jstep
+            # Children on the odd path keep a T-label only if reached from outside
+            while blossomchilds[b][j] != entrychild:
+                bv = blossomchilds[b][j]
+                if label[bv] == 1:
+                    j += jstep
+                    continue
+                for v in blossom_leaves(bv):
+                    if label[v] != 0:
+                        break
+                if label[v] != 0:
+                    label[v] = 0
+                    label[endpoint[mate[blossombase[bv]]]] = 0
+                    assign_label(v, 2, labelend[v])
+                j += jstep
+        label[b] = labelend[b] = -1
+        blossomchilds[b] = blossomendps[b] = None
+        blossombase[b] = -1
+        blossombestedges[b] = None
+        bestedge[b] = -1
+        unusedblossoms.append(b)
+        usedblossoms.discard(b)
+
+    def augment_blossom(b, v):
+        """Swap matched and unmatched edges inside blossom b so that vertex v becomes its base"""
+        t = v
+        while blossomparent[t] != b:
+            t = blossomparent[t]
+        if t >= nvertex:
+            augment_blossom(t, v)
+        i = j = blossomchilds[b].index(t)
+        if i & 1:
+            j -= len(blossomchilds[b])
+            jstep = 1
+            endptrick = 0
+        else:
+            jstep = -1
+            endptrick = 1
+        while j != 0:
+            j += jstep
+            t = blossomchilds[b][j]
+            p = blossomendps[b][j - endptrick] ^ endptrick
+            if t >= nvertex:
+                augment_blossom(t, endpoint[p])
+            j += jstep
+            t = blossomchilds[b][j]
+            if t >= nvertex:
+                augment_blossom(t, endpoint[p ^ 1])
+            mate[endpoint[p]] = p ^ 1
+            mate[endpoint[p ^ 1]] = p
+        blossomchilds[b] = blossomchilds[b][i:] + blossomchilds[b][:i]
+        blossomendps[b] = blossomendps[b][i:] + blossomendps[b][:i]
+        blossombase[b] = blossombase[blossomchilds[b][0]]
+
+    def augment_matching(k):
+        """Swap matched and unmatched edges along the augmenting path through edge k"""
+        v, w, _ = edges[k]
+        for s, p in ((v, 2 * k + 1), (w, 2 * k)):
+            while True:
+                bs = inblossom[s]
+                if bs >= nvertex:
+                    augment_blossom(bs, s)
+                mate[s] = p
+                if labelend[bs] == -1:
+                    # Reached a single vertex; this side of the path is done
+                    break
+                t = endpoint[labelend[bs]]
+                bt = inblossom[t]
+                s = endpoint[labelend[bt]]
+                j = endpoint[labelend[bt] ^ 1]
+                if bt >= nvertex:
+                    augment_blossom(bt, j)
+                mate[j] = labelend[bt]
+                p = labelend[bt] ^ 1
+
+    # Each stage grows alternating trees from all single vertices and augments once
+    for _ in range(nvertex):
+        label[:] = [0] * (2 * nvertex)
+        labelend[:] = [-1] * (2 * nvertex)
+        bestedge[:] = [-1] * (2 * nvertex)
+        blossombestedges[nvertex:] = [None] * nvertex
+        allowedge[:] = [False] * nedge
+        queue[:] = []
+        treevertices.clear()
+        bestedgeholders.clear()
+        for v in range(nvertex):
+            if mate[v] == -1 and label[inblossom[v]] == 0:
+                assign_label(v, 1, -1)
+                if warm_start:
+                    # Grow one tree at a time, so a stage only visits the neighbourhood of one vertex
+                    break
+        if not queue:
+            break
+
+        augmented = False
+        while True:
+            while queue and not augmented:
+                v = queue.pop()
+                for p in neighbend[v]:
+                    k = p // 2
+                    w = endpoint[p]
+                    if inblossom[v] == inblossom[w]:
+                        continue
+                    if not allowedge[k]:
+                        kslack = slack(k)
+                        if kslack <= 0:
+                            allowedge[k] = True
+                    if allowedge[k]:
+                        if label[inblossom[w]] == 0:
+                            if mate[blossombase[inblossom[w]]] == -1:
+                                # A single vertex outside the tree ends an augmenting path
+                                augment_matching(k)
+                                augmented = True
+                                break
+                            assign_label(w, 2, p ^ 1)
+                        elif label[inblossom[w]] == 1:
+                            base = scan_blossom(v, w)
+                            if base >= 0:
+                                add_blossom(base, k)
+                            else:
+                                augment_matching(k)
+                                augmented = True
+                                break
+                        elif label[w] == 0:
+                            # w is inside a T-blossom but not yet reached itself
+                            label[w] = 2
+                            labelend[w] = p ^ 1
+                    elif label[inblossom[w]] == 1:
+                        b = inblossom[v]
+                        if bestedge[b] == -1 or kslack < slack(bestedge[b]):
+                            bestedge[b] = k
+                            bestedgeholders.add(b)
+                    elif label[w] == 0:
+                        if bestedge[w] == -1 or kslack < slack(bestedge[w]):
+                            bestedge[w] = k
+                            bestedgeholders.add(w)
+            if augmented:
+                break
+
+            # No tight edge left to follow: move the duals by the largest safe step
+            deltatype = -1
+            delta = deltaedge = deltablossom = None
+            for v in bestedgeholders:
+                if v < nvertex and label[inblossom[v]] == 0 and bestedge[v] != -1:
+                    d = slack(bestedge[v])
+                    if deltatype == -1 or d < delta:
+                        delta = d
+                        deltatype = 2
+                        deltaedge = bestedge[v]
+            for b in bestedgeholders:
+                if blossomparent[b] == -1 and label[b] == 1 and bestedge[b] != -1:
+                    d = slack(bestedge[b]) // 2
+                    if deltatype == -1 or d < delta:
+                        delta = d
+                        deltatype = 3
+                        deltaedge = bestedge[b]
+            for b in usedblossoms:
+                if (blossombase[b] >= 0 and blossomparent[b] == -1 and label[b] == 2
+                        and (deltatype == -1 or dualvar[b] < delta)):
+                    delta = dualvar[b]
+                    deltatype = 4
+                    deltablossom = b
+            if deltatype == -1:
+                # No augmenting path exists: the matching has maximum cardinality
+                break
+
+            for v in treevertices:
+                if label[inblossom[v]] == 1:
+                    dualvar[v] -= delta
+                elif label[inblossom[v]] == 2:
+                    dualvar[v] += delta
+            for b in usedblossoms:
+                if blossomparent[b] == -1:
+                    if label[b] == 1:
+                        dualvar[b] += delta
+                    elif label[b] == 2:
+                        dualvar[b] -= delta
+
+            if deltatype == 2:
+                allowedge[deltaedge] = True
+                i, j, _ = edges[deltaedge]
+                if label[inblossom[i]] == 0:
+                    i, j = j, i
+                queue.append(i)
+            elif deltatype == 3:
+                allowedge[deltaedge] = True
+                i, j, _ = edges[deltaedge]
+                queue.append(i)
+            else:
+                expand_blossom(deltablossom, False)
+
+        if not augmented:
+            break
+        # Expand S-blossoms whose dual dropped to zero
+        for b in list(usedblossoms):
+            if blossomparent[b] == -1 and blossombase[b] >= 0 and label[b] == 1 and dualvar[b] == 0:
+                expand_blossom(b, True)
+
+    return [endpoint[p] if p >= 0 else -1 for p in mate]
@@ -0,0 +1,226 @@
+"""
+Doubles matchmaking for club sessions.
+
+Each round picks who plays (fewest games so far tonight first), builds
+teams by pairing strong players with weaker ones (a man and a woman per
+team for mixed doubles), then puts teams of similar strength against
+each other. A randomized local search over partner swaps between teams
+of nearby rating, and a few passes of neighbour swaps between matches,
+then trade a little balance for fewer repeat partners and opponents,
+counted from recent history and from earlier rounds of the same session.
+Every swap only looks at two teams, so a 200-player round takes a few
+tens of milliseconds.
+"""
+import random
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from players.models import Player
+from .models import Match, MatchParticipation, PlayerRating
+
+# Rating points one repeat is worth when comparing candidate pairings
+REPEAT_PARTNER_PENALTY = 150
+REPEAT_OPPONENT_PENALTY = 60
+IMPROVEMENT_PASSES = 3
+# Partner swaps are tried between teams up to this many places apart, in random order
+PARTNER_SWAP_WINDOW = 8
+PARTNER_SEARCH_PASSES = 10
+
+
+def _pair(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+class SessionPlanner:
+    """Plans the rounds of one session; keeps the partner and opponent counts between rounds"""
+
+    def __init__(self, players, ratings, partner_counts=None, opponent_counts=None, mixed=False, seed=None):
+        self.players = list(players)
+        self.ratings = ratings
+        self.partner_counts = partner_counts if partner_counts is not None else Counter()
+        self.opponent_counts = opponent_counts if opponent_counts is not None else Counter()
+        self.mixed = mixed
+        self.games_played = Counter()
+        self.random = random.Random(seed)
+
+    def rating(self, player):
+        return self.ratings.get(player.id, getattr(settings, 'RATING_INITIAL', 1500.0))
+
+    def team_rating(self, team):
+        return self.rating(team[0]) + self.rating(team[1])
+
+    def partner_cost(self, team):
+        return REPEAT_PARTNER_PENALTY * self.partner_counts[_pair(team[0].id, team[1].id)]
+
+    def match_cost(self, team1, team2):
+        """Strength gap plus repeat penalties for one match"""
+        repeats = sum(self.opponent_counts[_pair(a.id, b.id)] for a in team1 for b in team2)
+        return (abs(self.team_rating(team1) - self.team_rating(team2))
+                + REPEAT_OPPONENT_PENALTY * repeats
+                + self.partner_cost(team1) + self.partner_cost(team2))
+
+    def _by_priority(self, players):
+        """Order players so those who have played least tonight come first"""
+        keyed = [(self.games_played[player.id], self.random.random(), player) for player in players]
+        keyed.sort(key=lambda item: item[:2])
+        return [player for _, _, player in keyed]
+
+    def _select(self, courts):
+        """Return (mixed_players, level_groups) for the players on court this round"""
+        if not self.mixed:
+            chosen = self._by_priority(self.players)[:min(courts, len(self.players) // 4) * 4]
+            return [], [chosen] if chosen else []
+
+        men = self._by_priority([player for player in self.players if player.gender == Player.Gender.MALE])
+        women = self._by_priority([player for player in self.players if player.gender == Player.Gender.FEMALE])
+        mixed_courts = min(courts, len(men) // 2, len(women) // 2)
+        mixed_players = men[:2 * mixed_courts] + women[:2 * mixed_courts]
+        # Courts the mixed games cannot fill go to level doubles among the players left over
+        groups = []
+        free_courts = courts - mixed_courts
+        for leftover in sorted((men[2 * mixed_courts:], women[2 * mixed_courts:]), key=len, reverse=True):
+            take = min(free_courts, len(leftover) // 4)
+            if take:
+                groups.append(leftover[:take * 4])
+                free_courts -= take
+        return mixed_players, groups
+
+    def _make_teams(self, players, mixed):
+        """Pair strong with weak (men with women when mixed), then swap partners to avoid repeats"""
+        if mixed:
+            men = sorted((p for p in players if p.gender == Player.Gender.MALE), key=self.rating, reverse=True)
+            women = sorted((p for p in players if p.gender == Player.Gender.FEMALE), key=self.rating)
+            teams = [list(team) for team in zip(men, women)]
+        else:
+            ranked = sorted(players, key=self.rating, reverse=True)
+            half = len(ranked) // 2
+            teams = [[ranked[idx], ranked[-1 - idx]] for idx in range(half)]
+
+        target = sum(self.team_rating(team) for team in teams) / len(teams) if teams else 0
+        cost = lambda team: abs(self.team_rating(team) - target) + self.partner_cost(team)
+        # Teams are in rating order, so swapping within a window keeps the balance while finding new partners
+        candidates = [
+            (first, second)
+            for first in range(len(teams))
+            for second in range(first + 1, min(len(teams), first + 1 + PARTNER_SWAP_WINDOW))
+        ]
+        for _ in range(PARTNER_SEARCH_PASSES):
+            improved = False
+            self.random.shuffle(candidates)
+            for idx, other in candidates:
+                first, second = teams[idx], teams[other]
+                current = cost(first) + cost(second)
+                # Exchange the second members (the women in mixed teams); level teams may also swap the first with the second
+                options = [([first[0], second[1]], [second[0], first[1]])]
+                if not mixed:
+                    options.append(([first[0], second[0]], [first[1], second[1]]))
+                for swapped in options:
+                    if cost(swapped[0]) + cost(swapped[1]) < current:
+                        teams[idx], teams[other] = swapped
+                        improved = True
+                        break
+            if not improved:
+                break
+        return [tuple(team) for team in teams]
+
+    def _make_matches(self, teams):
+        """Put teams of similar strength against each other, then swap to avoid repeat opponents"""
+        teams = sorted(teams, key=self.team_rating, reverse=True)
+        for _ in range(IMPROVEMENT_PASSES):
+            improved = False
+            for idx in range(1, len(teams) - 2, 2):
+                # Matches (idx - 1, idx) and (idx + 1, idx + 2): try exchanging the middle teams
+                a, b, c, d = teams[idx - 1:idx + 3]
+                if self.match_cost(a, c) + self.match_cost(b, d) < self.match_cost(a, b) + self.match_cost(c, d):
+                    teams[idx], teams[idx + 1] = c, b
+                    improved = True
+            if not improved:
+                break
+        return [(teams[idx], teams[idx + 1]) for idx in range(0, len(teams) - 1, 2)]
+
+    def plan_round(self, courts):
+        """Return one round as a list of ((player, player), (player, player)) matches"""
+        mixed_players, groups = self._select(courts)
+        matches = []
+        if mixed_players:
+            matches += self._make_matches(self._make_teams(mixed_players, mixed=True))
+        for group in groups:
+            matches += self._make_matches(self._make_teams(group, mixed=False))
+
+        for team1, team2 in matches:
+            for team in (team1, team2):
+                self.partner_counts[_pair(team[0].id, team[1].id)] += 1
+            for a in team1:
+                for b in team2:
+                    self.opponent_counts[_pair(a.id, b.id)] += 1
+            for player in team1 + team2:
+                self.games_played[player.id] += 1
+        return matches
+
+
+def recent_pairings(player_ids, history=500):
+    """
+    Count how often each pair of players partnered or faced each other in
+    the last `history` matches, read from the participation index.
+    """
+    partner_counts = Counter()
+    opponent_counts = Counter()
+    latest = Match.objects.aggregate(latest=Max('id'))['latest']
+    if latest is None:
+        return partner_counts, opponent_counts
+
+    rows = MatchParticipation.objects.filter(
+        player_id__in=player_ids, match_id__gt=latest - history
+    ).order_by('match_id').values_list('match_id', 'player_id', 'team', 'partner_id')
+    current_match = None
+    sides = {1: [], 2: []}
+    for match_id, player_id, team, partner_id in list(rows) + [(None, None, None, None)]:
+        if match_id != current_match:
+            for a in sides[1]:
+                for b in sides[2]:
+                    opponent_counts[_pair(a, b)] += 1
+            current_match = match_id
+            sides = {1: [], 2: []}
+        if match_id is None:
+            break
+        sides[team].append(player_id)
+        if player_id < partner_id:
+            partner_counts[(player_id, partner_id)] += 1
+    return partner_counts, opponent_counts
+
+
+def plan_session(players, rounds, courts=None, mixed=False, history=500, seed=None):
+    """
+    Plan a club session. Returns a list of rounds, each a list of
+    ((player, player), (player, player)) matches in court order.
+    """
+    players = list(players)
+    if courts is None:
+        courts = len(players) // 4
+    ratings = dict(PlayerRating.objects.filter(player__in=players).values_list('player_id', 'rating'))
+    partner_counts, opponent_counts = recent_pairings([player.id for player in players], history)
+    planner = SessionPlanner(players, ratings, partner_counts, opponent_counts, mixed=mixed, seed=seed)
+    return [planner.plan_round(courts) for _ in range(rounds)]
+
+
+def create_session_matches(session, batch_size=None):
+    """Write a planned session as Match rows (and their participation rows) with bulk inserts"""
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+    matches = [
+        Match(
+            team1player1=team1[0], team1player2=team1[1],
+            team2player1=team2[0], team2player2=team2[1]
+        )
+        for round_matches in session
+        for team1, team2 in round_matches
+    ]
+    with transaction.atomic():
+        Match.objects.bulk_create(matches, batch_size=batch_size)
+        MatchParticipation.objects.bulk_create(
+            [row for match in matches for row in match.build_participations()], batch_size=batch_size
+        )
+    return matches
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:15
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_match_counters(apps, schema_editor):
+    SavedBracket = apps.get_model('matches', 'SavedBracket')
+    BracketMatch = apps.get_model('matches', 'BracketMatch')
+    matches = BracketMatch.objects.filter(saved_bracket=OuterRef('pk')).order_by().values('saved_bracket')
+    SavedBracket.objects.update(
+        num_matches=Coalesce(Subquery(matches.annotate(n=Count('id')).values('n'), output_field=IntegerField()), 0),
+        num_completed_matches=Coalesce(Subquery(
+            matches.filter(Q(winner__isnull=False) | Q(winner_name__gt='')).annotate(n=Count('id')).values('n'),
+            output_field=IntegerField()
+        ), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0004_tournament_savedbracket_tournamentresult_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedbracket',
+            name='num_completed_matches',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='savedbracket',
+            name='num_matches',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_match_counters, migrations.RunPython.noop),
+    ]
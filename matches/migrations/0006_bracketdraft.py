@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('matches', '0005_savedbracket_num_completed_matches_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BracketDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('num_participants', models.PositiveIntegerField(default=0)),
+                ('data', models.JSONField(default=dict)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bracket_drafts', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0006_bracketdraft'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedbracket',
+            name='snapshot',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='savedbracket',
+            name='snapshot_format',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+    ]
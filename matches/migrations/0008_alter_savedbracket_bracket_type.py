@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0007_savedbracket_snapshot_savedbracket_snapshot_format'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='savedbracket',
+            name='bracket_type',
+            field=models.CharField(choices=[('single_elimination', 'Single Elimination'), ('double_elimination', 'Double Elimination'), ('round_robin', 'Round Robin'), ('swiss', 'Swiss')], default='single_elimination', max_length=20),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0008_alter_savedbracket_bracket_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='official_bracket',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='matches.savedbracket'),
+        ),
+    ]
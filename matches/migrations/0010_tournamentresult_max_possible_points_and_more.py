@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0009_tournament_official_bracket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournamentresult',
+            name='max_possible_points',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='tournamentresult',
+            index=models.Index(fields=['tournament', '-points_earned', '-max_possible_points'], name='result_leaderboard_idx'),
+        ),
+    ]
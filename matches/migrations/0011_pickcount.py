@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0010_tournamentresult_max_possible_points_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.PositiveIntegerField()),
+                ('match_number', models.PositiveIntegerField()),
+                ('team_name', models.CharField(max_length=200)),
+                ('count', models.IntegerField(default=0)),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pick_counts', to='matches.tournament')),
+            ],
+            options={
+                'unique_together': {('tournament', 'round_number', 'match_number', 'team_name')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0011_pickcount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('num_matches', models.PositiveIntegerField(default=0)),
+                ('num_completed_matches', models.PositiveIntegerField(default=0)),
+                ('snapshot', models.BinaryField(blank=True, null=True)),
+                ('snapshot_format', models.PositiveSmallIntegerField(default=0, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='bracketmatch',
+            name='saved_bracket',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='matches.savedbracket'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='bracketmatch',
+            unique_together={('saved_bracket', 'round_number', 'match_number')},
+        ),
+        migrations.AddField(
+            model_name='bracketmatch',
+            name='pick_set',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='matches.pickset'),
+        ),
+        migrations.AddField(
+            model_name='savedbracket',
+            name='pick_set',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='brackets', to='matches.pickset'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='bracketmatch',
+            unique_together={('pick_set', 'round_number', 'match_number'), ('saved_bracket', 'round_number', 'match_number')},
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0002_alter_player_gender'),
+        ('matches', '0012_pickset_alter_bracketmatch_saved_bracket_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='is_rated',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='PlayerRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.FloatField()),
+                ('matches_rated', models.PositiveIntegerField(default=0)),
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating', to='players.player')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-rating'], name='player_rating_idx')],
+            },
+        ),
+    ]
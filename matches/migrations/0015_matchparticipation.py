@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_participations(apps, schema_editor):
+    Match = apps.get_model('matches', 'Match')
+    MatchParticipation = apps.get_model('matches', 'MatchParticipation')
+    rows = []
+    for match in Match.objects.order_by('id').iterator(chunk_size=2000):
+        for team, player1, player2, points_for, points_against in (
+            (1, match.team1player1_id, match.team1player2_id, match.team1_game_score, match.team2_game_score),
+            (2, match.team2player1_id, match.team2player2_id, match.team2_game_score, match.team1_game_score),
+        ):
+            for player_id, partner_id in ((player1, player2), (player2, player1)):
+                rows.append(MatchParticipation(
+                    match_id=match.id, player_id=player_id, team=team, partner_id=partner_id,
+                    points_for=points_for, points_against=points_against
+                ))
+        if len(rows) >= 2000:
+            MatchParticipation.objects.bulk_create(rows)
+            rows = []
+    MatchParticipation.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0002_alter_player_gender'),
+        ('matches', '0014_playerstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchParticipation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('team', models.PositiveSmallIntegerField()),
+                ('points_for', models.IntegerField(blank=True, null=True)),
+                ('points_against', models.IntegerField(blank=True, null=True)),
+                ('match', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='matches.match')),
+                ('partner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='players.player')),
+                ('player', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='match_participations', to='players.player')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['player', '-match'], name='participation_history_idx'), models.Index(fields=['player', 'partner'], name='participation_partner_idx'), models.Index(fields=['match', 'player'], name='participation_match_idx')],
+            },
+        ),
+        migrations.RunPython(populate_participations, migrations.RunPython.noop),
+    ]
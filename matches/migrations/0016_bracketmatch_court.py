@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0015_matchparticipation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bracketmatch',
+            name='court',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:44
+
+from django.db import migrations, models
+
+
+def count_participants(apps, schema_editor):
+    Tournament = apps.get_model('matches', 'Tournament')
+    TournamentParticipant = apps.get_model('matches', 'TournamentParticipant')
+    counts = TournamentParticipant.objects.filter(is_active=True).values('tournament').annotate(total=models.Count('id'))
+    for row in counts:
+        Tournament.objects.filter(pk=row['tournament']).update(num_participants=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0016_bracketmatch_court'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='num_participants',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_participants, migrations.RunPython.noop),
+    ]
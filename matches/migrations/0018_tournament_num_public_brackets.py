@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:59
+
+from django.db import migrations, models
+
+
+def count_public_brackets(apps, schema_editor):
+    Tournament = apps.get_model('matches', 'Tournament')
+    SavedBracket = apps.get_model('matches', 'SavedBracket')
+    counts = SavedBracket.objects.filter(is_public=True, bracket_type='single_elimination').values(
+        'tournament'
+    ).annotate(total=models.Count('id'))
+    for row in counts:
+        Tournament.objects.filter(pk=row['tournament']).update(num_public_brackets=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0017_tournament_num_participants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='num_public_brackets',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_public_brackets, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,13 @@
-from django.db import models
+import hashlib
+import json
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce, Concat, Substr
 from django.contrib.auth.models import User
+from django.utils import timezone
 from players.models import Player
 
 
@@ -12,6 +20,181 @@ class Match(models.Model):
     team2player1 = models.ForeignKey(Player, related_name='matches_as_team2player1', on_delete=models.CASCADE)
     team2player2 = models.ForeignKey(Player, related_name='matches_as_team2player2', on_delete=models.CASCADE)
     team2_game_score = models.IntegerField(blank=True, null=True)
+    # Set once the result has been applied to the players' ratings
+    is_rated = models.BooleanField(default=False, editable=False)
+    
+    @property
+    def has_result(self):
+        """Check if both game scores are recorded"""
+        return self.team1_game_score is not None and self.team2_game_score is not None
+    
+    def result_key(self):
+        """Return (players..., team1_score, team2_score) for a match with a result, else None"""
+        if not self.has_result:
+            return None
+        return (
+            self.team1player1_id, self.team1player2_id, self.team2player1_id, self.team2player2_id,
+            self.team1_game_score, self.team2_game_score
+        )
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored result so save() and the delete receiver can adjust player stats
+        if not set(MATCH_RESULT_FIELDS) - set(field_names):
+            instance._stats_result = instance.result_key()
+            instance._loaded_values = instance.result_values()
+        return instance
+    
+    def result_values(self):
+        """Return the current values of MATCH_RESULT_FIELDS"""
+        return tuple(getattr(self, field) for field in MATCH_RESULT_FIELDS)
+    
+    def build_participations(self):
+        """Return the four unsaved MatchParticipation rows for this match"""
+        teams = (
+            (1, self.team1player1_id, self.team1player2_id, self.team1_game_score, self.team2_game_score),
+            (2, self.team2player1_id, self.team2player2_id, self.team2_game_score, self.team1_game_score),
+        )
+        return [
+            MatchParticipation(
+                match=self, player_id=player_id, team=team, partner_id=partner_id,
+                points_for=points_for, points_against=points_against
+            )
+            for team, player1, player2, points_for, points_against in teams
+            for player_id, partner_id in ((player1, player2), (player2, player1))
+        ]
+    
+    def sync_participations(self):
+        """Rewrite this match's MatchParticipation rows from its player and score columns"""
+        MatchParticipation.objects.filter(match=self).delete()
+        MatchParticipation.objects.bulk_create(self.build_participations())
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        old_result = None if adding else getattr(self, '_stats_result', MATCH_RESULT_UNKNOWN)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding or getattr(self, '_loaded_values', None) != self.result_values():
+                self.sync_participations()
+            if self.has_result and not self.is_rated:
+                apply_match_rating(self)
+            new_result = self.result_key()
+            if old_result is not MATCH_RESULT_UNKNOWN and old_result != new_result:
+                if old_result is not None:
+                    adjust_player_stats(old_result, -1)
+                if new_result is not None:
+                    # A new match is the newest for its players; anything else may sit further back in their form
+                    adjust_player_stats(new_result, 1, update_form=adding)
+                if not adding:
+                    refresh_recent_form(set((old_result or ())[:4]) | set((new_result or ())[:4]))
+        self._stats_result = self.result_key()
+        self._loaded_values = self.result_values()
+    
+
+
+def match_deleted(sender, instance, **kwargs):
+    """
+    post_delete receiver taking a deleted match's result out of its players'
+    stats and ratings. Also runs for queryset deletes and cascades from
+    deleted players, which skip Match.delete().
+    """
+    result = getattr(instance, '_stats_result', instance.result_key())
+    if result is None:
+        return
+    adjust_player_stats(result, -1)
+    refresh_recent_form(result[:4])
+    if instance.is_rated:
+        revert_match_rating(result)
+
+
+# Match fields that make up a result, and a marker for instances whose stored result is not known
+MATCH_RESULT_FIELDS = [
+    'team1player1_id', 'team1player2_id', 'team2player1_id', 'team2player2_id', 'team1_game_score', 'team2_game_score'
+]
+MATCH_RESULT_UNKNOWN = object()
+
+
+class PlayerRating(models.Model):
+    """A player's doubles rating, updated as match results come in"""
+    player = models.OneToOneField(Player, on_delete=models.CASCADE, related_name='rating')
+    rating = models.FloatField()
+    matches_rated = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        indexes = [models.Index(fields=['-rating'], name='player_rating_idx')]
+    
+    def __str__(self):
+        return f"{self.player.first_name} {self.player.last_name}: {self.rating:.0f}"
+
+
+class MatchParticipation(models.Model):
+    """
+    One row per player per Match, with their team, partner and the score
+    from their side. Player history, partner and opponent records and
+    head-to-head lookups read this table through one indexed player column
+    instead of OR-ing the four player columns of Match.
+    """
+    # Covered by the composite indexes below
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='participations', db_index=False)
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='match_participations', db_index=False)
+    team = models.PositiveSmallIntegerField()  # 1 or 2
+    partner = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='+')
+    points_for = models.IntegerField(null=True, blank=True)
+    points_against = models.IntegerField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['player', '-match'], name='participation_history_idx'),
+            models.Index(fields=['player', 'partner'], name='participation_partner_idx'),
+            models.Index(fields=['match', 'player'], name='participation_match_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Match {self.match_id}: player {self.player_id} (team {self.team})"
+
+
+class PlayerStats(models.Model):
+    """
+    Running totals of a player's Match results, kept up to date as matches
+    are saved and deleted so profiles and leaderboards read one row per player.
+    """
+    player = models.OneToOneField(Player, on_delete=models.CASCADE, related_name='stats')
+    matches_played = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    draws = models.PositiveIntegerField(default=0)
+    points_for = models.PositiveIntegerField(default=0)
+    points_against = models.PositiveIntegerField(default=0)
+    # Results of the latest matches, newest first, e.g. "WWLDW"
+    recent_form = models.CharField(max_length=10, blank=True)
+    
+    class Meta:
+        verbose_name_plural = "player stats"
+        indexes = [models.Index(fields=['-wins', 'losses'], name='player_stats_leaderboard_idx')]
+    
+    def __str__(self):
+        return f"{self.player.first_name} {self.player.last_name}: {self.wins}-{self.losses}-{self.draws}"
+    
+    @property
+    def win_percentage(self):
+        """Return the percentage of matches won"""
+        if self.matches_played == 0:
+            return 0
+        return (self.wins / self.matches_played) * 100
+    
+    @property
+    def point_difference(self):
+        """Return points scored minus points conceded"""
+        return self.points_for - self.points_against
+
+
+class TournamentQuerySet(models.QuerySet):
+    def with_stats(self):
+        """Annotate each tournament with its number of active participants"""
+        return self.annotate(
+            active_participant_count=models.Count('participants', filter=models.Q(participants__is_active=True))
+        )
 
 
 class Tournament(models.Model):
@@ -33,9 +216,19 @@ class Tournament(models.Model):
         default='upcoming'
     )
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_tournaments')
+    # Bracket holding the real results, used to score everyone's picks
+    official_bracket = models.ForeignKey(
+        'SavedBracket', on_delete=models.SET_NULL, related_name='+', null=True, blank=True
+    )
+    # Active participants, kept by TournamentParticipant.save()/delete() and checked against max_participants
+    num_participants = models.PositiveIntegerField(default=0, editable=False)
+    # Public single-elimination brackets, the denominator of the PickCount percentages
+    num_public_brackets = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TournamentQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
     
@@ -45,7 +238,11 @@ class Tournament(models.Model):
     @property
     def participant_count(self):
         """Return the number of registered participants"""
-        return self.participants.filter(is_active=True).count()
+        # Use the with_stats() annotation when present, otherwise the stored counter
+        count = getattr(self, 'active_participant_count', None)
+        if count is None:
+            count = self.num_participants
+        return count
     
     @property
     def spots_remaining(self):
@@ -88,6 +285,87 @@ class TournamentParticipant(models.Model):
     
     def __str__(self):
         return f"{self.player.first_name} {self.player.last_name} - {self.tournament.name}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so save() can adjust the tournament's counter
+        if 'is_active' in field_names:
+            instance._was_active = instance.is_active
+        return instance
+    
+    def save(self, *args, **kwargs):
+        was_active = False if self._state.adding else getattr(self, '_was_active', None)
+        with transaction.atomic():
+            if was_active is not None and self.is_active != was_active:
+                if self.is_active:
+                    reserve_tournament_spots(self.tournament_id, 1)
+                else:
+                    Tournament.objects.filter(pk=self.tournament_id).update(
+                        num_participants=models.F('num_participants') - 1
+                    )
+            super().save(*args, **kwargs)
+        self._was_active = self.is_active
+
+
+def participant_deleted(sender, instance, **kwargs):
+    """
+    post_delete receiver giving a deleted participant's spot back. Also runs
+    for queryset deletes and cascades, which skip TournamentParticipant.delete().
+    """
+    if getattr(instance, '_was_active', instance.is_active):
+        Tournament.objects.filter(pk=instance.tournament_id).update(
+            num_participants=models.F('num_participants') - 1
+        )
+
+
+# A match counts as completed once it has a winner player or a winner name
+COMPLETED_MATCH_Q = models.Q(winner__isnull=False) | models.Q(winner_name__gt='')
+
+
+class SavedBracketQuerySet(models.QuerySet):
+    def with_actual_counts(self):
+        """Annotate each bracket with match counts computed from its BracketMatch rows"""
+        # A bracket has either its own rows or a shared pick set, so only one join returns rows
+        return self.annotate(
+            actual_match_count=models.Count('matches', distinct=True) + models.Count('pick_set__matches', distinct=True),
+            actual_completed_count=models.Count(
+                'matches',
+                filter=models.Q(matches__winner__isnull=False) | models.Q(matches__winner_name__gt=''),
+                distinct=True
+            ) + models.Count(
+                'pick_set__matches',
+                filter=models.Q(pick_set__matches__winner__isnull=False) | models.Q(pick_set__matches__winner_name__gt=''),
+                distinct=True
+            )
+        )
+
+
+class PickSet(models.Model):
+    """
+    An immutable set of bracket picks stored once and shared by every saved
+    bracket with exactly the same picks. Looked up by a hash of its matches;
+    editing a bracket points it at another pick set instead of changing this one.
+    """
+    digest = models.CharField(max_length=64, unique=True)
+    num_matches = models.PositiveIntegerField(default=0)
+    num_completed_matches = models.PositiveIntegerField(default=0)
+    snapshot = models.BinaryField(null=True, blank=True, editable=False)
+    snapshot_format = models.PositiveSmallIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Pick set {self.digest[:12]}"
+    
+    def get_session_data(self):
+        """Return the picks in session data format"""
+        if self.snapshot is not None and self.snapshot_format == BRACKET_SNAPSHOT_FORMAT:
+            return decode_bracket_snapshot(self.snapshot)
+        bracket_data = _session_data_from_matches(self.matches.order_by('round_number', 'match_number'))
+        self.snapshot = encode_bracket_snapshot(bracket_data)
+        self.snapshot_format = BRACKET_SNAPSHOT_FORMAT
+        PickSet.objects.filter(pk=self.pk).update(snapshot=self.snapshot, snapshot_format=self.snapshot_format)
+        return bracket_data
 
 
 class SavedBracket(models.Model):
@@ -99,14 +377,25 @@ class SavedBracket(models.Model):
         choices=[
             ('single_elimination', 'Single Elimination'),
             ('double_elimination', 'Double Elimination'),
-            ('round_robin', 'Round Robin')
+            ('round_robin', 'Round Robin'),
+            ('swiss', 'Swiss')
         ],
         default='single_elimination'
     )
     is_public = models.BooleanField(default=False)
+    # Shared picks; when set, the bracket has no BracketMatch rows of its own
+    pick_set = models.ForeignKey(PickSet, on_delete=models.PROTECT, related_name='brackets', null=True, blank=True)
+    # Denormalized counters, kept in step with the bracket's matches
+    num_matches = models.PositiveIntegerField(default=0)
+    num_completed_matches = models.PositiveIntegerField(default=0)
+    # Compressed copy of the whole bracket for fast loads; NULL when it needs rebuilding
+    snapshot = models.BinaryField(null=True, blank=True, editable=False)
+    snapshot_format = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = SavedBracketQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['tournament', 'user']  # One bracket per user per tournament
     
@@ -116,12 +405,12 @@ class SavedBracket(models.Model):
     @property
     def match_count(self):
         """Return the total number of matches in this bracket"""
-        return self.matches.count()
+        return self.num_matches
     
     @property
     def completed_matches(self):
         """Return the number of completed matches"""
-        return self.matches.exclude(winner__isnull=True).exclude(winner_name__isnull=True).exclude(winner_name='').count()
+        return self.num_completed_matches
     
     @property
     def completion_percentage(self):
@@ -135,10 +424,99 @@ class SavedBracket(models.Model):
         """Check if the bracket is complete"""
         return self.completed_matches == self.match_count
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored visibility so save() can keep the pick counts in step
+        if 'is_public' in field_names:
+            instance._was_public = instance.is_public
+        return instance
+    
+    def save(self, *args, **kwargs):
+        was_public = False if self._state.adding else getattr(self, '_was_public', None)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'is_public' not in update_fields:
+            was_public = None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if was_public is not None and was_public != self.is_public and self.bracket_type == PICK_BRACKET_TYPE:
+                picks = pick_deltas(self.pick_matches().exclude(winner_name='').only(
+                    'round_number', 'match_number', 'winner_name'
+                ), 1 if self.is_public else -1)
+                adjust_pick_counts(self.tournament_id, picks)
+                Tournament.objects.filter(pk=self.tournament_id).update(
+                    num_public_brackets=models.F('num_public_brackets') + (1 if self.is_public else -1)
+                )
+        if was_public is not None:
+            self._was_public = self.is_public
+    
+    def pick_matches(self):
+        """Return the bracket's BracketMatch rows, whether its own or from its shared pick set"""
+        if self.pick_set_id is not None:
+            return BracketMatch.objects.filter(pick_set_id=self.pick_set_id)
+        return BracketMatch.objects.filter(saved_bracket_id=self.pk)
+    
+    def detach_pick_set(self, batch_size=None):
+        """
+        Give the bracket its own copy of its shared picks so its matches can
+        be edited one by one (copy-on-write). Does nothing if it has none.
+        """
+        if self.pick_set_id is None:
+            return
+        if batch_size is None:
+            batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+        with transaction.atomic():
+            pick_set = self.pick_set
+            matches = list(pick_set.matches.all())
+            for match in matches:
+                match.pk = None
+                match.pick_set = None
+                match.saved_bracket = self
+            BracketMatch.objects.bulk_create(matches, batch_size=batch_size)
+            self.pick_set = None
+            self.snapshot = pick_set.snapshot
+            self.snapshot_format = pick_set.snapshot_format
+            self.save(update_fields=['pick_set', 'snapshot', 'snapshot_format'])
+            release_pick_set(pick_set.pk)
+    
+    def refresh_match_counters(self, save=True):
+        """Recount matches from the database and store the counters"""
+        counts = self.pick_matches().aggregate(
+            total=models.Count('id'),
+            completed=models.Count('id', filter=COMPLETED_MATCH_Q)
+        )
+        self.num_matches = counts['total']
+        self.num_completed_matches = counts['completed']
+        if save:
+            self.save(update_fields=['num_matches', 'num_completed_matches'])
+    
+    def get_session_data(self):
+        """
+        Return the bracket in session data format. Reads the snapshot when it
+        is current, otherwise rebuilds it from the BracketMatch rows.
+        """
+        if self.pick_set_id is not None:
+            return self.pick_set.get_session_data()
+        if self.snapshot is not None and self.snapshot_format == BRACKET_SNAPSHOT_FORMAT:
+            return decode_bracket_snapshot(self.snapshot)
+        bracket_data = convert_bracket_to_session_data(self)
+        self.set_snapshot(bracket_data)
+        SavedBracket.objects.filter(pk=self.pk).update(snapshot=self.snapshot, snapshot_format=self.snapshot_format)
+        return bracket_data
+    
+    def set_snapshot(self, bracket_data):
+        """Encode bracket data into the snapshot fields without saving"""
+        self.snapshot = encode_bracket_snapshot(bracket_data)
+        self.snapshot_format = BRACKET_SNAPSHOT_FORMAT
+    
+    def get_matches(self):
+        """Return all matches in round order with their players loaded in the same query"""
+        return self.pick_matches().select_related('team1_player', 'team2_player', 'winner').order_by('round_number', 'match_number')
+    
     def get_rounds(self):
         """Return matches organized by rounds"""
         rounds = {}
-        for match in self.matches.all():
+        for match in self.get_matches():
             if match.round_number not in rounds:
                 rounds[match.round_number] = []
             rounds[match.round_number].append(match)
@@ -146,14 +524,37 @@ class SavedBracket(models.Model):
     
     def get_final_winner(self):
         """Get the final winner of the bracket"""
-        final_round = self.matches.filter(round_number=self.matches.aggregate(max_round=models.Max('round_number'))['max_round']).first()
+        matches = self.pick_matches()
+        final_round = matches.filter(round_number=matches.aggregate(max_round=models.Max('round_number'))['max_round']).first()
         if final_round:
             return final_round.winner or final_round.winner_name
         return None
 
 
+def saved_bracket_deleting(sender, instance, **kwargs):
+    """
+    pre_delete receiver taking a public bracket's picks out of the pick counts
+    while its matches can still be read. Also runs for queryset deletes and
+    cascades from deleted users and tournaments.
+    """
+    if getattr(instance, '_was_public', instance.is_public) and instance.bracket_type == PICK_BRACKET_TYPE:
+        adjust_pick_counts(instance.tournament_id, pick_deltas(instance.pick_matches().exclude(winner_name='').only(
+            'round_number', 'match_number', 'winner_name'
+        ), -1))
+        Tournament.objects.filter(pk=instance.tournament_id).update(
+            num_public_brackets=models.F('num_public_brackets') - 1
+        )
+
+
+def saved_bracket_deleted(sender, instance, **kwargs):
+    """post_delete receiver deleting the bracket's pick set once no other bracket shares it"""
+    release_pick_set(instance.pick_set_id)
+
+
 class BracketMatch(models.Model):
-    saved_bracket = models.ForeignKey(SavedBracket, on_delete=models.CASCADE, related_name='matches')
+    # Each match belongs either to one saved bracket or to a shared pick set
+    saved_bracket = models.ForeignKey(SavedBracket, on_delete=models.CASCADE, related_name='matches', null=True, blank=True)
+    pick_set = models.ForeignKey(PickSet, on_delete=models.CASCADE, related_name='matches', null=True, blank=True)
     round_number = models.PositiveIntegerField()
     match_number = models.PositiveIntegerField()  # Position within the round
     team1_player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='bracket_matches_team1', null=True, blank=True)
@@ -166,9 +567,10 @@ class BracketMatch(models.Model):
     winner_name = models.CharField(max_length=200, blank=True)  # For custom team names
     is_bye = models.BooleanField(default=False)
     match_date = models.DateTimeField(null=True, blank=True)
+    court = models.PositiveSmallIntegerField(null=True, blank=True)  # Set by the scheduler with match_date
     
     class Meta:
-        unique_together = ['saved_bracket', 'round_number', 'match_number']
+        unique_together = [['saved_bracket', 'round_number', 'match_number'], ['pick_set', 'round_number', 'match_number']]
         ordering = ['round_number', 'match_number']
     
     def __str__(self):
@@ -206,7 +608,7 @@ class BracketMatch(models.Model):
     @property
     def is_completed(self):
         """Check if the match is completed"""
-        return bool(self.winner or self.winner_name)
+        return bool(self.winner_id or self.winner_name)
     
     @property
     def has_scores(self):
@@ -222,6 +624,56 @@ class BracketMatch(models.Model):
             self.winner_name = winner_name
             self.winner = None
         self.save()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored completion state so save() can adjust the bracket counters
+        if 'winner_id' in field_names and 'winner_name' in field_names:
+            instance._was_completed = instance.is_completed
+        if 'winner_name' in field_names:
+            instance._loaded_winner_name = instance.winner_name
+        return instance
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if self.pick_set_id is not None and not adding:
+            raise ValueError("Matches of a shared pick set cannot be changed; detach the bracket first")
+        was_completed = False if adding else getattr(self, '_was_completed', None)
+        old_pick = '' if adding else getattr(self, '_loaded_winner_name', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_pick is not None and old_pick != self.winner_name:
+                picks = pick_deltas([self], 1)
+                if old_pick:
+                    picks[(self.round_number, self.match_number, old_pick)] -= 1
+                adjust_bracket_pick_counts(self.saved_bracket_id, picks)
+            match_delta = 1 if adding else 0
+            completed_delta = 0
+            if was_completed is not None:
+                completed_delta = int(self.is_completed) - int(was_completed)
+            # The bracket snapshot no longer matches the rows
+            SavedBracket.objects.filter(pk=self.saved_bracket_id).update(
+                num_matches=models.F('num_matches') + match_delta,
+                num_completed_matches=models.F('num_completed_matches') + completed_delta,
+                snapshot=None
+            )
+        self._was_completed = self.is_completed
+        self._loaded_winner_name = self.winner_name
+    
+    def delete(self, *args, **kwargs):
+        if self.pick_set_id is not None:
+            raise ValueError("Matches of a shared pick set cannot be changed; detach the bracket first")
+        was_completed = getattr(self, '_was_completed', self.is_completed)
+        with transaction.atomic():
+            adjust_bracket_pick_counts(self.saved_bracket_id, pick_deltas([self], -1))
+            result = super().delete(*args, **kwargs)
+            SavedBracket.objects.filter(pk=self.saved_bracket_id).update(
+                num_matches=models.F('num_matches') - 1,
+                num_completed_matches=models.F('num_completed_matches') - int(was_completed),
+                snapshot=None
+            )
+        return result
 
 
 class TournamentResult(models.Model):
@@ -229,66 +681,657 @@ class TournamentResult(models.Model):
     saved_bracket = models.ForeignKey(SavedBracket, on_delete=models.CASCADE, related_name='tournament_result')
     final_position = models.PositiveIntegerField()  # 1st, 2nd, 3rd, etc.
     points_earned = models.PositiveIntegerField(default=0)
+    max_possible_points = models.PositiveIntegerField(default=0)  # Points still reachable with live picks
     prize_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     is_final = models.BooleanField(default=False)
     
     class Meta:
         unique_together = ['tournament', 'saved_bracket']
+        indexes = [
+            # Leaderboard order, used for top-N and rank lookups
+            models.Index(fields=['tournament', '-points_earned', '-max_possible_points'], name='result_leaderboard_idx'),
+        ]
     
     def __str__(self):
         return f"{self.tournament.name} - {self.saved_bracket.name} - Position {self.final_position}"
 
 
-# Utility functions for bracket management
-def create_bracket_from_session_data(tournament, user, bracket_data, bracket_name="My Bracket"):
+class PickCount(models.Model):
+    """
+    Number of public brackets in a tournament that picked a team to win a
+    given slot. Kept up to date as public brackets are saved, so pick
+    percentages never need a scan of BracketMatch.
+    """
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='pick_counts')
+    round_number = models.PositiveIntegerField()
+    match_number = models.PositiveIntegerField()
+    team_name = models.CharField(max_length=200)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['tournament', 'round_number', 'match_number', 'team_name']
+    
+    def __str__(self):
+        return f"{self.tournament.name} - Round {self.round_number}, Match {self.match_number}: {self.team_name} ({self.count})"
+
+
+class BracketDraft(models.Model):
+    """
+    A bracket being edited on the brackets page. The session only holds the
+    draft id; the bracket itself is stored here in the compact format
+    produced by pack_bracket_data.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bracket_drafts', null=True, blank=True)
+    num_participants = models.PositiveIntegerField(default=0)
+    data = models.JSONField(default=dict)
+    version = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Bracket draft {self.id} (v{self.version})"
+    
+    @property
+    def total_slots(self):
+        """Return the number of first-round matches"""
+        rounds = self.data.get('rounds') or []
+        return len(rounds[0]['t1']) if rounds else 0
+    
+    def get_bracket_data(self):
+        """Return the bracket in the session list-of-dicts format"""
+        return unpack_bracket_data(self.data)
+    
+    def store(self, bracket_data):
+        """
+        Write new bracket data and bump the version. Returns False without
+        writing if the draft was changed since it was loaded.
+        """
+        packed = pack_bracket_data(bracket_data)
+        updated = BracketDraft.objects.filter(pk=self.pk, version=self.version).update(
+            data=packed,
+            version=models.F('version') + 1,
+            updated_at=timezone.now()
+        )
+        if updated:
+            self.data = packed
+            self.version += 1
+        return bool(updated)
+
+
+# Utility functions for tournament registration
+def reserve_tournament_spots(tournament_id, count, upcoming_only=False):
     """
-    Create a SavedBracket and BracketMatch objects from session bracket data
+    Take count spots of a tournament with one conditional UPDATE, which
+    only matches while enough spots are left. Raises ValueError when full.
     """
-    # Create the saved bracket
-    saved_bracket = SavedBracket.objects.create(
-        tournament=tournament,
-        user=user,
-        name=bracket_name,
-        bracket_type='single_elimination'
+    tournaments = Tournament.objects.filter(
+        pk=tournament_id, num_participants__lte=models.F('max_participants') - count
     )
+    if upcoming_only:
+        tournaments = tournaments.filter(status='upcoming')
+    if not tournaments.update(num_participants=models.F('num_participants') + count):
+        if upcoming_only:
+            raise ValueError("Registration for this tournament is closed or full")
+        raise ValueError("The tournament is full" if count == 1 else f"The tournament has fewer than {count} spots left")
+
+
+def recount_participants(tournaments):
+    """
+    Reset num_participants of a Tournament queryset from its active
+    participant rows, in one UPDATE. Returns the number of tournaments.
+    """
+    active = TournamentParticipant.objects.filter(
+        tournament=models.OuterRef('pk'), is_active=True
+    ).order_by().values('tournament').annotate(total=models.Count('id')).values('total')
+    return tournaments.update(num_participants=Coalesce(models.Subquery(active), 0))
+
+
+def register_participant(tournament, player):
+    """
+    Register a player for an upcoming tournament without overfilling it.
+    Returns (participant, created); registering twice returns the existing
+    registration. Raises ValueError when the tournament is full or closed.
+    """
+    existing = TournamentParticipant.objects.filter(tournament=tournament, player=player).first()
+    if existing is not None and existing.is_active:
+        return existing, False
+
+    with transaction.atomic():
+        # The spot is taken first, so the transaction holds the write lock from its first statement
+        try:
+            reserve_tournament_spots(tournament.pk, 1, upcoming_only=True)
+        except ValueError:
+            # The last spot may have gone to this same player from another request
+            if TournamentParticipant.objects.filter(tournament=tournament, player=player, is_active=True).exists():
+                return TournamentParticipant.objects.get(tournament=tournament, player=player), False
+            raise
+        try:
+            with transaction.atomic():
+                if existing is None:
+                    participant = TournamentParticipant(tournament=tournament, player=player)
+                    # Inserted directly: save() would take the spot a second time
+                    TournamentParticipant.objects.bulk_create([participant])
+                    participant._was_active = True
+                    return participant, True
+                if TournamentParticipant.objects.filter(pk=existing.pk, is_active=False).update(is_active=True):
+                    existing.is_active = existing._was_active = True
+                    return existing, True
+        except IntegrityError:
+            pass
+        # A concurrent request registered the same player first, so give our spot back
+        Tournament.objects.filter(pk=tournament.pk).update(num_participants=models.F('num_participants') - 1)
+    return TournamentParticipant.objects.get(tournament=tournament, player=player), False
+
+
+# Utility functions for player ratings
+def expected_score(team_rating, opponent_rating):
+    """Return the expected score (0 to 1) of a team against an opponent"""
+    return 1 / (1 + 10 ** ((opponent_rating - team_rating) / 400))
+
+
+def rating_change(team1_rating, team2_rating, team1_score, team2_score, k_factor):
+    """
+    Return how much each team1 player's rating moves after a match (team2
+    players move by the opposite amount). Team ratings are the average of
+    the two players' ratings; a tied score counts as half a win.
+    """
+    if team1_score > team2_score:
+        result = 1.0
+    elif team1_score < team2_score:
+        result = 0.0
+    else:
+        result = 0.5
+    return k_factor * (result - expected_score(team1_rating, team2_rating))
+
+
+def apply_match_rating(match):
+    """
+    Apply one match result to the four players' ratings: one read, then
+    relative updates so concurrent results for the same players add up.
+    """
+    initial = getattr(settings, 'RATING_INITIAL', 1500.0)
+    team1 = [match.team1player1_id, match.team1player2_id]
+    team2 = [match.team2player1_id, match.team2player2_id]
     
-    # Create matches from bracket data
+    with transaction.atomic():
+        PlayerRating.objects.bulk_create(
+            [PlayerRating(player_id=player_id, rating=initial) for player_id in team1 + team2],
+            ignore_conflicts=True
+        )
+        ratings = dict(PlayerRating.objects.filter(player_id__in=team1 + team2).values_list('player_id', 'rating'))
+        delta = rating_change(
+            (ratings[team1[0]] + ratings[team1[1]]) / 2,
+            (ratings[team2[0]] + ratings[team2[1]]) / 2,
+            match.team1_game_score,
+            match.team2_game_score,
+            getattr(settings, 'RATING_K_FACTOR', 32.0)
+        )
+        for player_ids, player_delta in ((team1, delta), (team2, -delta)):
+            PlayerRating.objects.filter(player_id__in=player_ids).update(
+                rating=models.F('rating') + player_delta,
+                matches_rated=models.F('matches_rated') + 1
+            )
+        Match.objects.filter(pk=match.pk).update(is_rated=True)
+    match.is_rated = True
+
+
+# Fixed-point steps used to solve a match's rating change back from the ratings after it
+RATING_REVERT_STEPS = 20
+
+
+def revert_match_rating(result):
+    """
+    Take one rated result back out of the players' ratings. The change is
+    solved from the current ratings, so it is exact while this was the
+    players' latest match; recompute_ratings() replays the full history.
+    """
+    player1, player2, player3, player4, score1, score2 = result
+    k_factor = getattr(settings, 'RATING_K_FACTOR', 32.0)
+    with transaction.atomic():
+        ratings = dict(PlayerRating.objects.filter(
+            player_id__in=[player1, player2, player3, player4]
+        ).values_list('player_id', 'rating'))
+        if not {player1, player2, player3, player4} <= set(ratings):
+            return
+        team1_rating = (ratings[player1] + ratings[player2]) / 2
+        team2_rating = (ratings[player3] + ratings[player4]) / 2
+        # The change depends on the ratings before the match; with the usual K factors each step gains a digit
+        delta = 0.0
+        for _ in range(RATING_REVERT_STEPS):
+            delta = rating_change(team1_rating - delta, team2_rating + delta, score1, score2, k_factor)
+        for player_ids, player_delta in (((player1, player2), delta), ((player3, player4), -delta)):
+            PlayerRating.objects.filter(player_id__in=player_ids).update(
+                rating=models.F('rating') - player_delta,
+                matches_rated=models.F('matches_rated') - 1
+            )
+
+
+# Utility functions for player stats
+RECENT_FORM_LENGTH = 10
+OUTCOME_FIELDS = {'W': 'wins', 'L': 'losses', 'D': 'draws'}
+
+
+def match_outcome(score, opponent_score):
+    """Return 'W', 'L' or 'D' for one side of a match"""
+    if score > opponent_score:
+        return 'W'
+    if score < opponent_score:
+        return 'L'
+    return 'D'
+
+
+def adjust_player_stats(result, sign, update_form=False):
+    """
+    Add (sign=1) or remove (sign=-1) one match result from the four players'
+    stats with relative UPDATEs. With update_form, the outcome is also
+    pushed onto the front of each player's recent form.
+    """
+    player1, player2, player3, player4, score1, score2 = result
+    if sign > 0:
+        # Removing a result never creates rows, so a player deleted in the same cascade stays gone
+        PlayerStats.objects.bulk_create(
+            [PlayerStats(player_id=player_id) for player_id in (player1, player2, player3, player4)],
+            ignore_conflicts=True
+        )
+    for player_ids, scored, conceded in (((player1, player2), score1, score2), ((player3, player4), score2, score1)):
+        outcome = match_outcome(scored, conceded)
+        changes = {
+            'matches_played': models.F('matches_played') + sign,
+            'points_for': models.F('points_for') + sign * scored,
+            'points_against': models.F('points_against') + sign * conceded,
+            OUTCOME_FIELDS[outcome]: models.F(OUTCOME_FIELDS[outcome]) + sign,
+        }
+        if update_form:
+            changes['recent_form'] = Substr(
+                Concat(models.Value(outcome), models.F('recent_form'), output_field=models.CharField()), 1, RECENT_FORM_LENGTH
+            )
+        PlayerStats.objects.filter(player_id__in=player_ids).update(**changes)
+
+
+def refresh_recent_form(player_ids):
+    """Recompute the recent form of a few players from their latest matches"""
+    for player_id in set(player_ids):
+        latest = MatchParticipation.objects.filter(
+            player_id=player_id, points_for__isnull=False, points_against__isnull=False
+        ).order_by('-match_id').values_list('points_for', 'points_against')
+        form = ''.join(match_outcome(points_for, points_against) for points_for, points_against in latest[:RECENT_FORM_LENGTH])
+        PlayerStats.objects.filter(player_id=player_id).update(recent_form=form)
+
+
+# Utility functions for bracket management
+def _build_bracket_matches(saved_bracket, bracket_data):
+    """Build unsaved BracketMatch instances from session bracket data"""
+    matches = []
     for round_idx, round_matches in enumerate(bracket_data):
         for match_idx, match_data in enumerate(round_matches):
-            BracketMatch.objects.create(
+            team1 = match_data.get('team1') or ''
+            team2 = match_data.get('team2') or ''
+            matches.append(BracketMatch(
                 saved_bracket=saved_bracket,
                 round_number=round_idx,
                 match_number=match_idx,
-                team1_name=match_data.get('team1', ''),
-                team2_name=match_data.get('team2', ''),
+                team1_name=team1,
+                team2_name=team2,
                 team1_score=match_data.get('score1'),
                 team2_score=match_data.get('score2'),
-                winner_name=match_data.get('winner', ''),
-                is_bye=match_data.get('team1') == 'BYE' or match_data.get('team2') == 'BYE'
+                winner_name=match_data.get('winner') or '',
+                is_bye=team1 == 'BYE' or team2 == 'BYE'
+            ))
+    return matches
+
+
+def pick_set_digest(matches):
+    """Return the content hash of a list of unsaved BracketMatch picks"""
+    content = json.dumps([
+        [match.round_number, match.match_number, match.team1_name, match.team2_name,
+         match.team1_score, match.team2_score, match.winner_name]
+        for match in matches
+    ], separators=(',', ':'))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def get_or_create_pick_set(bracket_data, batch_size=None):
+    """
+    Return the PickSet holding exactly these picks, storing it first if no
+    bracket has made them before.
+    """
+    return pick_set_for_matches(_build_bracket_matches(None, bracket_data), batch_size=batch_size)
+
+
+def pick_set_for_matches(matches, batch_size=None):
+    """Same as get_or_create_pick_set, for a list of unsaved BracketMatch objects in round order"""
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+    digest = pick_set_digest(matches)
+    
+    pick_set = PickSet.objects.filter(digest=digest).first()
+    if pick_set is not None:
+        return pick_set
+    try:
+        with transaction.atomic():
+            pick_set = PickSet.objects.create(
+                digest=digest,
+                num_matches=len(matches),
+                num_completed_matches=sum(1 for match in matches if match.is_completed),
+                snapshot=encode_bracket_snapshot(_session_data_from_matches(matches)),
+                snapshot_format=BRACKET_SNAPSHOT_FORMAT
             )
+            for match in matches:
+                match.pick_set = pick_set
+            BracketMatch.objects.bulk_create(matches, batch_size=batch_size)
+    except IntegrityError:
+        # Someone stored the same picks at the same time
+        pick_set = PickSet.objects.get(digest=digest)
+    return pick_set
+
+
+def release_pick_set(pick_set_id):
+    """Delete a pick set once no saved bracket points at it any more"""
+    if pick_set_id is not None:
+        PickSet.objects.filter(pk=pick_set_id, brackets__isnull=True).delete()
+
+
+def create_bracket_from_session_data(tournament, user, bracket_data, bracket_name="My Bracket", batch_size=None):
+    """
+    Create a SavedBracket from session bracket data.
+
+    The picks are stored as a shared PickSet: a bracket identical to one
+    already saved reuses its rows instead of writing new ones.
+    """
+    with transaction.atomic():
+        pick_set = get_or_create_pick_set(bracket_data, batch_size=batch_size)
+        saved_bracket = SavedBracket.objects.create(
+            tournament=tournament,
+            user=user,
+            name=bracket_name,
+            bracket_type='single_elimination',
+            pick_set=pick_set,
+            num_matches=pick_set.num_matches,
+            num_completed_matches=pick_set.num_completed_matches
+        )
+    
+    return saved_bracket
+
+
+# Fields of BracketMatch that are derived from session bracket data
+BRACKET_MATCH_SESSION_FIELDS = ['team1_name', 'team2_name', 'team1_score', 'team2_score', 'winner_name', 'is_bye']
+
+
+def update_bracket_from_session_data(saved_bracket, bracket_data, bracket_name=None, batch_size=None):
+    """
+    Update an existing SavedBracket from session bracket data.
+
+    Shared picks are never changed in place (copy-on-write): the bracket is
+    pointed at the pick set for its new picks, which is created if needed,
+    and the old one is deleted when nothing else uses it. A bracket that
+    owns its matches keeps them and only the changed rows are written. The
+    SavedBracket row itself is kept, so its id, created_at and any linked
+    TournamentResult survive the save.
+
+    Only prediction brackets can be saved this way; the session data holds
+    team names only and would drop the players and results of the others.
+    """
+    if saved_bracket.bracket_type != PICK_BRACKET_TYPE:
+        raise ValueError(f"{saved_bracket.get_bracket_type_display()} brackets cannot be saved from the bracket editor")
+    
+    with transaction.atomic():
+        update_fields = ['updated_at']
+        if bracket_name is not None:
+            saved_bracket.name = bracket_name
+            update_fields.append('name')
+        
+        if saved_bracket.pick_set_id is None:
+            _update_bracket_matches(saved_bracket, bracket_data, batch_size=batch_size)
+            saved_bracket.save(update_fields=update_fields + ['num_matches', 'num_completed_matches', 'snapshot'])
+            return saved_bracket
+        
+        pick_set = get_or_create_pick_set(bracket_data, batch_size=batch_size)
+        old_pick_set_id = saved_bracket.pick_set_id
+        if pick_set.pk != old_pick_set_id:
+            if saved_bracket.is_public:
+                picks = pick_deltas(BracketMatch.objects.filter(pick_set=pick_set).exclude(winner_name='').only(
+                    'round_number', 'match_number', 'winner_name'
+                ), 1)
+                picks.update(pick_deltas(saved_bracket.pick_matches().exclude(winner_name='').only(
+                    'round_number', 'match_number', 'winner_name'
+                ), -1))
+                adjust_pick_counts(saved_bracket.tournament_id, picks, batch_size=batch_size)
+            saved_bracket.pick_set = pick_set
+            saved_bracket.num_matches = pick_set.num_matches
+            saved_bracket.num_completed_matches = pick_set.num_completed_matches
+            saved_bracket.snapshot = None
+            update_fields += ['pick_set', 'num_matches', 'num_completed_matches', 'snapshot']
+        saved_bracket.save(update_fields=update_fields)
+        release_pick_set(old_pick_set_id if old_pick_set_id != pick_set.pk else None)
     
     return saved_bracket
 
 
+def _update_bracket_matches(saved_bracket, bracket_data, batch_size=None):
+    """
+    Write session bracket data over the matches a bracket owns, comparing
+    them by (round_number, match_number) and writing only rows that changed.
+    Sets the bracket's counters and clears its snapshot without saving it.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+    
+    existing = {
+        (match.round_number, match.match_number): match
+        for match in BracketMatch.objects.filter(saved_bracket=saved_bracket).only(
+            'id', 'round_number', 'match_number', 'winner_id', *BRACKET_MATCH_SESSION_FIELDS
+        )
+    }
+    picks = pick_deltas(existing.values(), -1)
+    
+    to_create = []
+    to_update = []
+    kept = []
+    for new_match in _build_bracket_matches(saved_bracket, bracket_data):
+        key = (new_match.round_number, new_match.match_number)
+        old_match = existing.pop(key, None)
+        if old_match is None:
+            to_create.append(new_match)
+            continue
+        changed = False
+        for field in BRACKET_MATCH_SESSION_FIELDS:
+            value = getattr(new_match, field)
+            if getattr(old_match, field) != value:
+                setattr(old_match, field, value)
+                changed = True
+        if changed:
+            to_update.append(old_match)
+        kept.append(old_match)
+    picks.update(pick_deltas(kept + to_create, 1))
+    
+    if existing:
+        # Matches that no longer exist in the session bracket
+        BracketMatch.objects.filter(id__in=[match.id for match in existing.values()]).delete()
+    if to_update:
+        BracketMatch.objects.bulk_update(to_update, BRACKET_MATCH_SESSION_FIELDS, batch_size=batch_size)
+    if to_create:
+        BracketMatch.objects.bulk_create(to_create, batch_size=batch_size)
+    if saved_bracket.is_public:
+        adjust_pick_counts(saved_bracket.tournament_id, picks, batch_size=batch_size)
+    
+    saved_bracket.num_matches = len(kept) + len(to_create)
+    saved_bracket.num_completed_matches = sum(1 for match in kept + to_create if match.is_completed)
+    saved_bracket.snapshot = None
+
+
+def save_bracket_from_session_data(tournament, user, bracket_data, bracket_name="My Bracket", batch_size=None):
+    """
+    Create the user's bracket for a tournament, or update it in place if one
+    already exists. Returns a (saved_bracket, created) tuple.
+    """
+    # Imported here because the leaderboard module imports these models
+    from .leaderboard import rescore_bracket
+    
+    with transaction.atomic():
+        saved_bracket = SavedBracket.objects.filter(tournament=tournament, user=user).first()
+        created = saved_bracket is None
+        if created:
+            saved_bracket = create_bracket_from_session_data(
+                tournament, user, bracket_data, bracket_name=bracket_name, batch_size=batch_size
+            )
+        else:
+            update_bracket_from_session_data(saved_bracket, bracket_data, bracket_name=bracket_name, batch_size=batch_size)
+        # Once the pool is being scored, the new picks are scored right away
+        rescore_bracket(saved_bracket)
+    return saved_bracket, created
+
+
+# Only single-elimination brackets are predictions; pick counts ignore the other types
+PICK_BRACKET_TYPE = 'single_elimination'
+
+
+def pick_deltas(matches, sign):
+    """Return a Counter of {(round_number, match_number, team_name): sign} for the picks in matches"""
+    deltas = Counter()
+    for match in matches:
+        if match.winner_name:
+            deltas[(match.round_number, match.match_number, match.winner_name)] += sign
+    return deltas
+
+
+def adjust_pick_counts(tournament_id, deltas, batch_size=None):
+    """
+    Apply pick count changes for a tournament. Missing rows are inserted,
+    then counts move with one UPDATE per distinct delta (usually +1 and -1),
+    so concurrent saves of different brackets do not overwrite each other.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+    
+    PickCount.objects.bulk_create([
+        PickCount(tournament_id=tournament_id, round_number=round_number, match_number=match_number, team_name=team)
+        for round_number, match_number, team in deltas
+    ], batch_size=batch_size, ignore_conflicts=True)
+    rows = PickCount.objects.filter(
+        tournament_id=tournament_id,
+        round_number__in={key[0] for key in deltas},
+        team_name__in={key[2] for key in deltas}
+    ).values_list('id', 'round_number', 'match_number', 'team_name')
+    ids_by_delta = {}
+    for pick_id, round_number, match_number, team in rows:
+        delta = deltas.get((round_number, match_number, team))
+        if delta:
+            ids_by_delta.setdefault(delta, []).append(pick_id)
+    for delta, ids in ids_by_delta.items():
+        PickCount.objects.filter(id__in=ids).update(count=models.F('count') + delta)
+
+
+def adjust_bracket_pick_counts(saved_bracket_id, deltas):
+    """Apply pick count changes for one bracket if it is a public prediction"""
+    if not any(deltas.values()):
+        return
+    tournament_id = SavedBracket.objects.filter(
+        pk=saved_bracket_id, is_public=True, bracket_type=PICK_BRACKET_TYPE
+    ).values_list('tournament_id', flat=True).first()
+    if tournament_id is not None:
+        adjust_pick_counts(tournament_id, deltas)
+
+
 def convert_bracket_to_session_data(saved_bracket):
     """
     Convert a SavedBracket back to session data format for compatibility
     """
+    # One query for all matches and their players, already in round order
+    return _session_data_from_matches(saved_bracket.get_matches())
+
+
+def _session_data_from_matches(matches):
+    """Build session bracket data from BracketMatch objects sorted by round and match number"""
     bracket_data = []
-    rounds = saved_bracket.get_rounds()
+    round_matches = None
+    current_round = None
     
-    for round_num in sorted(rounds.keys()):
+    for match in matches:
+        if match.round_number != current_round:
+            current_round = match.round_number
+            round_matches = []
+            bracket_data.append(round_matches)
+        round_matches.append({
+            'team1': match.team1_display_name,
+            'team2': match.team2_display_name,
+            'score1': match.team1_score,
+            'score2': match.team2_score,
+            'winner': match.winner_display_name,
+            'match_id': f"match_{current_round}_{match.match_number}"
+        })
+    
+    return bracket_data
+
+
+# Keys of a session match dict and the column each one is packed into
+_PACKED_NAME_COLUMNS = (('team1', 't1'), ('team2', 't2'), ('winner', 'w'))
+_PACKED_SCORE_COLUMNS = (('score1', 's1'), ('score2', 's2'))
+
+
+def pack_bracket_data(bracket_data):
+    """
+    Pack session bracket data into a compact, JSON-serializable form.
+
+    Team and winner names are interned into a single string table and each
+    round is stored as parallel arrays of indexes into it (-1 for None), so
+    repeated names and the per-match dict keys are not stored again for every
+    match. Match ids are implied by position.
+    """
+    names = []
+    name_index = {}
+    rounds = []
+    for round_matches in bracket_data:
+        packed_round = {column: [] for _, column in _PACKED_NAME_COLUMNS + _PACKED_SCORE_COLUMNS}
+        for match in round_matches:
+            for key, column in _PACKED_NAME_COLUMNS:
+                value = match.get(key)
+                if value is None:
+                    packed_round[column].append(-1)
+                    continue
+                idx = name_index.get(value)
+                if idx is None:
+                    idx = name_index[value] = len(names)
+                    names.append(value)
+                packed_round[column].append(idx)
+            for key, column in _PACKED_SCORE_COLUMNS:
+                packed_round[column].append(match.get(key))
+        rounds.append(packed_round)
+    return {'format': 1, 'names': names, 'rounds': rounds}
+
+
+def unpack_bracket_data(packed):
+    """Rebuild session bracket data from the output of pack_bracket_data"""
+    names = packed.get('names', [])
+    bracket_data = []
+    for round_idx, packed_round in enumerate(packed.get('rounds', [])):
         round_matches = []
-        for match in rounds[round_num]:
-            match_data = {
-                'team1': match.team1_display_name,
-                'team2': match.team2_display_name,
-                'score1': match.team1_score,
-                'score2': match.team2_score,
-                'winner': match.winner_display_name,
-                'match_id': f"match_{round_num}_{match.match_number}"
-            }
-            round_matches.append(match_data)
+        columns = zip(packed_round['t1'], packed_round['t2'], packed_round['w'], packed_round['s1'], packed_round['s2'])
+        for match_idx, (team1, team2, winner, score1, score2) in enumerate(columns):
+            round_matches.append({
+                'team1': names[team1] if team1 >= 0 else None,
+                'team2': names[team2] if team2 >= 0 else None,
+                'winner': names[winner] if winner >= 0 else None,
+                'score1': score1,
+                'score2': score2,
+                'match_id': f"match_{round_idx}_{match_idx}"
+            })
         bracket_data.append(round_matches)
-    
     return bracket_data
+
+
+# Bump when the snapshot encoding changes; older snapshots are rebuilt on read
+BRACKET_SNAPSHOT_FORMAT = 1
+
+
+def encode_bracket_snapshot(bracket_data):
+    """Encode session bracket data as zlib-compressed packed JSON"""
+    packed = json.dumps(pack_bracket_data(bracket_data), separators=(',', ':'))
+    return zlib.compress(packed.encode('utf-8'))
+
+
+def decode_bracket_snapshot(snapshot):
+    """Decode a snapshot written by encode_bracket_snapshot"""
+    return unpack_bracket_data(json.loads(zlib.decompress(bytes(snapshot)).decode('utf-8')))
@@ -0,0 +1,101 @@
+"""
+Player history, partner and opponent records and head-to-head results,
+read from MatchParticipation (one row per player per match). Every lookup
+starts from the (player, ...) indexes; opponents are found through the
+(match, player) index instead of the four player columns of Match.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+
+from .models import Match, MatchParticipation
+
+PLAYED_Q = Q(points_for__isnull=False, points_against__isnull=False)
+
+
+def _record():
+    """Return the aggregate expressions for a win/loss record from the player's side"""
+    return {
+        'played': Count('id', filter=PLAYED_Q),
+        'wins': Count('id', filter=PLAYED_Q & Q(points_for__gt=F('points_against'))),
+        'losses': Count('id', filter=PLAYED_Q & Q(points_for__lt=F('points_against'))),
+        'draws': Count('id', filter=PLAYED_Q & Q(points_for=F('points_against'))),
+        'scored': Sum('points_for'),
+        'conceded': Sum('points_against'),
+    }
+
+
+def _against(player):
+    """Condition for participations on the other team of a match the player took part in"""
+    return Exists(MatchParticipation.objects.filter(
+        match_id=OuterRef('match_id'), player=player
+    ).exclude(team=OuterRef('team')))
+
+
+def player_history(player, limit=None):
+    """Return the player's participations, newest match first, with the match and partner loaded"""
+    history = MatchParticipation.objects.filter(player=player).select_related(
+        'match', 'partner'
+    ).order_by('-match_id')
+    return history[:limit] if limit else history
+
+
+def partner_records(player):
+    """Return the player's record with each partner, most matches first"""
+    return MatchParticipation.objects.filter(player=player).values('partner').annotate(
+        **_record()
+    ).order_by('-played', 'partner')
+
+
+def opponent_records(player):
+    """
+    Return the player's record against each opponent, most matches first.
+    Counted from the opponents' rows, so their losses are the player's wins.
+    """
+    return MatchParticipation.objects.filter(_against(player)).values('player').annotate(
+        played=Count('id', filter=PLAYED_Q),
+        wins=Count('id', filter=PLAYED_Q & Q(points_for__lt=F('points_against'))),
+        losses=Count('id', filter=PLAYED_Q & Q(points_for__gt=F('points_against'))),
+        draws=Count('id', filter=PLAYED_Q & Q(points_for=F('points_against'))),
+        scored=Sum('points_against'),
+        conceded=Sum('points_for'),
+    ).order_by('-played', 'player')
+
+
+def head_to_head(player, opponent):
+    """Return (record, participations) for player's matches against opponent, newest first"""
+    matches = MatchParticipation.objects.filter(player=player).filter(_against(opponent))
+    return matches.aggregate(**_record()), matches.select_related('match', 'partner').order_by('-match_id')
+
+
+def rebuild_match_participations(batch_size=None, chunk_size=10000):
+    """Rewrite the whole participation table from Match. Returns the number of rows written"""
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+
+    matches = Match.objects.order_by('id').values_list(
+        'id', 'team1player1_id', 'team1player2_id', 'team2player1_id', 'team2player2_id',
+        'team1_game_score', 'team2_game_score'
+    )
+    written = 0
+    with transaction.atomic():
+        MatchParticipation.objects.all().delete()
+        pending = []
+        for match_id, player1, player2, player3, player4, score1, score2 in matches.iterator(chunk_size=chunk_size):
+            pending += [
+                MatchParticipation(match_id=match_id, player_id=player1, team=1, partner_id=player2,
+                                   points_for=score1, points_against=score2),
+                MatchParticipation(match_id=match_id, player_id=player2, team=1, partner_id=player1,
+                                   points_for=score1, points_against=score2),
+                MatchParticipation(match_id=match_id, player_id=player3, team=2, partner_id=player4,
+                                   points_for=score2, points_against=score1),
+                MatchParticipation(match_id=match_id, player_id=player4, team=2, partner_id=player3,
+                                   points_for=score2, points_against=score1),
+            ]
+            if len(pending) >= chunk_size:
+                MatchParticipation.objects.bulk_create(pending, batch_size=batch_size)
+                written += len(pending)
+                pending = []
+        MatchParticipation.objects.bulk_create(pending, batch_size=batch_size)
+        written += len(pending)
+    return written
@@ -0,0 +1,76 @@
+"""
+Pick distribution across the public brackets of a tournament.
+
+PickCount rows are maintained incrementally by the bracket save paths in
+models.py; this module reads them and can rebuild them from scratch.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import PICK_BRACKET_TYPE, BracketMatch, PickCount, SavedBracket, Tournament
+
+
+def pick_distribution(tournament, round_number=None):
+    """
+    Return {(round_number, match_number): [(team_name, count, percentage), ...]}
+    with the most popular pick first. Percentages are of all the public
+    single-elimination brackets of the tournament, so a slot that many
+    brackets left undecided adds up to less than 100.
+    """
+    public_brackets = Tournament.objects.filter(pk=tournament.pk).values_list('num_public_brackets', flat=True).first() or 0
+    rows = PickCount.objects.filter(tournament=tournament, count__gt=0)
+    if round_number is not None:
+        rows = rows.filter(round_number=round_number)
+
+    slots = {}
+    for slot_round, slot_match, team, count in rows.values_list('round_number', 'match_number', 'team_name', 'count'):
+        slots.setdefault((slot_round, slot_match), []).append((team, count))
+
+    distribution = {}
+    for slot, picks in sorted(slots.items()):
+        # Never below the picks themselves, in case the counter has drifted
+        total = max(public_brackets, sum(count for _, count in picks))
+        picks.sort(key=lambda pick: (-pick[1], pick[0]))
+        distribution[slot] = [(team, count, count * 100 / total) for team, count in picks]
+    return distribution
+
+
+def rebuild_pick_counts(tournament, batch_size=None):
+    """
+    Recount the picks of every public bracket of a tournament: one grouped
+    query for brackets with their own rows, and one for shared pick sets
+    weighted by how many public brackets use each set. Also resets the
+    tournament's count of public brackets.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+
+    public = SavedBracket.objects.filter(tournament=tournament, is_public=True, bracket_type=PICK_BRACKET_TYPE)
+    counts = Counter()
+    own_rows = BracketMatch.objects.filter(saved_bracket__in=public.filter(pick_set__isnull=True)).exclude(
+        winner_name=''
+    ).order_by().values('round_number', 'match_number', 'winner_name').annotate(count=Count('id'))
+    for row in own_rows:
+        counts[(row['round_number'], row['match_number'], row['winner_name'])] += row['count']
+
+    users_per_set = dict(public.filter(pick_set__isnull=False).order_by().values('pick_set').annotate(
+        count=Count('id')
+    ).values_list('pick_set', 'count'))
+    shared_rows = BracketMatch.objects.filter(pick_set__in=users_per_set).exclude(winner_name='').values_list(
+        'pick_set', 'round_number', 'match_number', 'winner_name'
+    )
+    for pick_set_id, round_number, match_number, team in shared_rows:
+        counts[(round_number, match_number, team)] += users_per_set[pick_set_id]
+
+    rows = [
+        PickCount(tournament=tournament, round_number=round_number, match_number=match_number, team_name=team, count=count)
+        for (round_number, match_number, team), count in counts.items()
+    ]
+    with transaction.atomic():
+        PickCount.objects.filter(tournament=tournament).delete()
+        PickCount.objects.bulk_create(rows, batch_size=batch_size)
+        Tournament.objects.filter(pk=tournament.pk).update(num_public_brackets=public.count())
+    return len(rows)
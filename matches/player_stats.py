@@ -0,0 +1,79 @@
+"""
+Rebuilding PlayerStats from the Match table.
+
+Totals come from one grouped query per player column of Match, so the
+database does the counting. Recent form is filled from a single pass over
+the newest matches that stops once every player has a full form string.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import RECENT_FORM_LENGTH, Match, PlayerStats, match_outcome
+
+# (player column, own score column, opponent score column)
+PLAYER_COLUMNS = (
+    ('team1player1', 'team1_game_score', 'team2_game_score'),
+    ('team1player2', 'team1_game_score', 'team2_game_score'),
+    ('team2player1', 'team2_game_score', 'team1_game_score'),
+    ('team2player2', 'team2_game_score', 'team1_game_score'),
+)
+
+STAT_FIELDS = ['matches_played', 'wins', 'losses', 'draws', 'points_for', 'points_against']
+
+
+def player_totals():
+    """Return {player_id: {stat: value}} summed over every match with a result"""
+    scored = Match.objects.filter(team1_game_score__isnull=False, team2_game_score__isnull=False).order_by()
+    totals = {}
+    for column, own, other in PLAYER_COLUMNS:
+        rows = scored.values(column).annotate(
+            matches_played=Count('id'),
+            wins=Count('id', filter=Q(**{f'{own}__gt': F(other)})),
+            losses=Count('id', filter=Q(**{f'{own}__lt': F(other)})),
+            draws=Count('id', filter=Q(**{own: F(other)})),
+            points_for=Sum(own),
+            points_against=Sum(other)
+        )
+        for row in rows:
+            stats = totals.setdefault(row[column], dict.fromkeys(STAT_FIELDS, 0))
+            for field in STAT_FIELDS:
+                stats[field] += row[field]
+    return totals
+
+
+def recent_forms(player_ids, chunk_size=10000):
+    """Return {player_id: form} from the newest matches, reading only as far back as needed"""
+    forms = {player_id: [] for player_id in player_ids}
+    remaining = len(forms)
+    latest = Match.objects.filter(team1_game_score__isnull=False, team2_game_score__isnull=False).order_by(
+        '-id'
+    ).values_list('team1player1_id', 'team1player2_id', 'team2player1_id', 'team2player2_id',
+                  'team1_game_score', 'team2_game_score')
+    for player1, player2, player3, player4, score1, score2 in latest.iterator(chunk_size=chunk_size):
+        for player_id, outcome in ((player1, match_outcome(score1, score2)), (player2, match_outcome(score1, score2)),
+                                   (player3, match_outcome(score2, score1)), (player4, match_outcome(score2, score1))):
+            form = forms.get(player_id)
+            if form is not None and len(form) < RECENT_FORM_LENGTH:
+                form.append(outcome)
+                if len(form) == RECENT_FORM_LENGTH:
+                    remaining -= 1
+        if remaining == 0:
+            break
+    return {player_id: ''.join(form) for player_id, form in forms.items()}
+
+
+def rebuild_player_stats(batch_size=None):
+    """Replace every PlayerStats row with totals recomputed from Match. Returns the number of players"""
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+
+    with transaction.atomic():
+        totals = player_totals()
+        forms = recent_forms(totals)
+        PlayerStats.objects.all().delete()
+        PlayerStats.objects.bulk_create([
+            PlayerStats(player_id=player_id, recent_form=forms[player_id], **stats)
+            for player_id, stats in totals.items()
+        ], batch_size=batch_size)
+    return len(totals)
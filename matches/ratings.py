@@ -0,0 +1,73 @@
+"""
+Player ratings from doubles Match results.
+
+New results are applied one at a time by Match.save() (see
+apply_match_rating in models.py). recompute_ratings() replays the whole
+match history in id order: results are streamed as plain tuples and
+ratings kept in dicts, so a million matches take seconds, then everything
+is written back with bulk inserts.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .models import Match, PlayerRating, rating_change
+
+
+def replay_ratings(results, initial=None, k_factor=None):
+    """
+    Replay (team1player1, team1player2, team2player1, team2player2,
+    team1_score, team2_score) tuples in order. Returns
+    ({player_id: rating}, {player_id: matches_rated}).
+    """
+    if initial is None:
+        initial = getattr(settings, 'RATING_INITIAL', 1500.0)
+    if k_factor is None:
+        k_factor = getattr(settings, 'RATING_K_FACTOR', 32.0)
+
+    ratings = {}
+    counts = {}
+    rating = ratings.get
+    count = counts.get
+    for player1, player2, player3, player4, score1, score2 in results:
+        rating1 = rating(player1, initial)
+        rating2 = rating(player2, initial)
+        rating3 = rating(player3, initial)
+        rating4 = rating(player4, initial)
+        delta = rating_change((rating1 + rating2) / 2, (rating3 + rating4) / 2, score1, score2, k_factor)
+        ratings[player1] = rating1 + delta
+        ratings[player2] = rating2 + delta
+        ratings[player3] = rating3 - delta
+        ratings[player4] = rating4 - delta
+        counts[player1] = count(player1, 0) + 1
+        counts[player2] = count(player2, 0) + 1
+        counts[player3] = count(player3, 0) + 1
+        counts[player4] = count(player4, 0) + 1
+    return ratings, counts
+
+
+def recompute_ratings(batch_size=None, chunk_size=10000):
+    """Rebuild every PlayerRating from the full match history. Returns the number of matches replayed"""
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+
+    scored = Match.objects.filter(team1_game_score__isnull=False, team2_game_score__isnull=False)
+    with transaction.atomic():
+        results = scored.order_by('id').values_list(
+            'team1player1_id', 'team1player2_id', 'team2player1_id', 'team2player2_id',
+            'team1_game_score', 'team2_game_score'
+        )
+        ratings, counts = replay_ratings(results.iterator(chunk_size=chunk_size))
+
+        PlayerRating.objects.all().delete()
+        PlayerRating.objects.bulk_create([
+            PlayerRating(player_id=player_id, rating=rating, matches_rated=counts[player_id])
+            for player_id, rating in ratings.items()
+        ], batch_size=batch_size)
+        replayed = scored.update(is_rated=True)
+        Match.objects.exclude(pk__in=scored.values('pk')).update(is_rated=False)
+    return replayed
+
+
+def top_rated_players(limit=25):
+    """Return the highest-rated players, best first"""
+    return PlayerRating.objects.select_related('player').order_by('-rating')[:limit]
@@ -0,0 +1,151 @@
+"""
+Bulk registration of a roster of players for a tournament.
+
+register_roster() checks the whole roster against one prefetched set of
+existing registrations, takes all the spots it needs with a single
+conditional UPDATE and writes the participants with bulk_create, so a
+roster of hundreds of players costs a handful of queries.
+"""
+import csv
+import io
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from players.models import Player
+from .models import TournamentParticipant, reserve_tournament_spots
+
+PLAYER_COLUMNS = ('player_id', 'player', 'id')
+SEED_COLUMNS = ('seed_position', 'seed')
+
+
+def parse_roster_csv(text):
+    """
+    Parse a CSV roster into [(player_id, seed_position or None), ...]. Rows
+    are player_id[,seed_position]; a header row naming the columns is optional.
+    """
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    player_column, seed_column = 0, 1
+    if rows and not rows[0][0].strip().isdigit():
+        header = [cell.strip().lower() for cell in rows.pop(0)]
+        player_column = next((header.index(name) for name in PLAYER_COLUMNS if name in header), None)
+        if player_column is None:
+            raise ValueError("The roster needs a player_id column")
+        seed_column = next((header.index(name) for name in SEED_COLUMNS if name in header), None)
+
+    entries = []
+    for line, row in enumerate(rows, start=1):
+        try:
+            player_id = int(row[player_column])
+            seed = row[seed_column].strip() if seed_column is not None and seed_column < len(row) else ''
+            entries.append((player_id, int(seed) if seed else None))
+        except (ValueError, IndexError):
+            raise ValueError(f"Row {line} of the roster is not player_id[,seed_position]: {','.join(row)}")
+    return entries
+
+
+def register_roster(tournament, entries, assign_seeds=False, batch_size=None):
+    """
+    Register [(player_id, seed_position or None), ...] for a tournament in
+    one transaction. With assign_seeds, players without a seed are seeded in
+    roster order after the highest seed given or already held. Players
+    already registered are skipped (their seed is updated when one is given)
+    and inactive registrations are reactivated. Raises ValueError, registering
+    nobody, for unknown players, repeated players, seeds below 1, seeds
+    repeated or held by another registered player, or too few spots.
+    Returns {'created': n, 'reactivated': n, 'already_registered': n}.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+
+    player_ids = [player_id for player_id, _ in entries]
+    if len(set(player_ids)) != len(player_ids):
+        raise ValueError("The roster lists a player more than once")
+    seeds = [seed for _, seed in entries if seed is not None]
+    if any(seed < 1 for seed in seeds):
+        raise ValueError("Seed positions start at 1")
+    if len(set(seeds)) != len(seeds):
+        raise ValueError("The roster gives the same seed position twice")
+
+    known = set(Player.objects.filter(pk__in=player_ids).values_list('pk', flat=True))
+    unknown = [player_id for player_id in player_ids if player_id not in known]
+    if unknown:
+        raise ValueError(f"Unknown player ids: {', '.join(map(str, unknown[:20]))}")
+
+    # Seeds held by other active participants, and by roster players who keep theirs
+    roster_seeds = dict(entries)
+    held_seeds = {}
+    returning = {}
+    for player_id, seed, is_active in TournamentParticipant.objects.filter(
+        tournament=tournament, seed_position__isnull=False
+    ).values_list('player_id', 'seed_position', 'is_active'):
+        if player_id not in roster_seeds:
+            if is_active:
+                held_seeds[player_id] = seed
+        elif roster_seeds[player_id] is None:
+            if is_active:
+                held_seeds[player_id] = seed
+            else:
+                returning[player_id] = seed
+    taken = sorted(set(held_seeds.values()).intersection(seeds))
+    if taken:
+        raise ValueError(f"Seed positions already held by registered players: {', '.join(map(str, taken[:20]))}")
+    # A reactivated player gets their old seed back unless someone else has it now
+    in_use = set(held_seeds.values()).union(seeds)
+    for player_id, seed in returning.items():
+        if seed not in in_use:
+            held_seeds[player_id] = seed
+            in_use.add(seed)
+        elif not assign_seeds:
+            raise ValueError(f"Player {player_id} would be reactivated with seed {seed}, which is now taken; give them a seed")
+    if assign_seeds:
+        next_seed = max([*seeds, *held_seeds.values()], default=0) + 1
+        seeded = []
+        for player_id, seed in entries:
+            if seed is None and player_id not in held_seeds:
+                seed, next_seed = next_seed, next_seed + 1
+            seeded.append((player_id, seed))
+        entries = seeded
+
+    try:
+        with transaction.atomic():
+            return _register_entries(tournament, entries, batch_size)
+    except IntegrityError:
+        raise ValueError("Some of these players registered while the roster was being saved; try again")
+
+
+def _register_entries(tournament, entries, batch_size):
+    """Write a validated roster against one prefetched set of existing registrations"""
+    existing = {
+        participant.player_id: participant
+        for participant in TournamentParticipant.objects.filter(
+            tournament=tournament, player_id__in=[player_id for player_id, _ in entries]
+        )
+    }
+    new = []
+    changed = []
+    reactivated = 0
+    for player_id, seed in entries:
+        participant = existing.get(player_id)
+        if participant is None:
+            new.append(TournamentParticipant(tournament=tournament, player_id=player_id, seed_position=seed))
+            continue
+        if not participant.is_active:
+            participant.is_active = True
+            reactivated += 1
+        elif seed is None or seed == participant.seed_position:
+            continue
+        if seed is not None:
+            participant.seed_position = seed
+        changed.append(participant)
+
+    # One conditional UPDATE takes every spot, or none when the tournament is too full
+    if new or reactivated:
+        reserve_tournament_spots(tournament.pk, len(new) + reactivated)
+    TournamentParticipant.objects.bulk_create(new, batch_size=batch_size)
+    TournamentParticipant.objects.bulk_update(changed, ['is_active', 'seed_position'], batch_size=batch_size)
+    return {
+        'created': len(new),
+        'reactivated': reactivated,
+        'already_registered': len(existing) - reactivated,
+    }
@@ -0,0 +1,145 @@
+"""
+Round-robin schedules stored as SavedBracket/BracketMatch rows.
+
+Rounds are produced lazily with the circle method, so even very large
+leagues only ever hold one round of pairings in memory while they are
+written out in batches.
+"""
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from players.models import Player
+from .models import BracketMatch, SavedBracket
+
+
+def round_robin_rounds(entrants):
+    """
+    Yield the rounds of a single round robin, one list of (team1, team2)
+    pairs at a time. With an odd number of entrants one of them sits out
+    each round.
+    """
+    entrants = list(entrants)
+    if len(entrants) < 2:
+        return
+    if len(entrants) % 2:
+        entrants.append(None)  # Sits-out marker
+
+    num_entrants = len(entrants)
+    fixed = entrants[0]
+    rotating = deque(entrants[1:])
+    for round_idx in range(num_entrants - 1):
+        ring = [fixed]
+        ring.extend(rotating)
+        pairs = []
+        for i in range(num_entrants // 2):
+            team1, team2 = ring[i], ring[num_entrants - 1 - i]
+            if team1 is None or team2 is None:
+                continue
+            # Alternate sides for the fixed entrant so it isn't always team1
+            if i == 0 and round_idx % 2:
+                team1, team2 = team2, team1
+            pairs.append((team1, team2))
+        yield pairs
+        rotating.rotate(1)
+
+
+def _entrant_fields(entrant, side):
+    """Return the BracketMatch fields for one side of a match"""
+    if isinstance(entrant, Player):
+        return {f'{side}_player': entrant}
+    return {f'{side}_name': str(entrant)}
+
+
+def create_round_robin_bracket(tournament, user, entrants, bracket_name="My Bracket", batch_size=None):
+    """
+    Create a round-robin SavedBracket for a list of entrants, which can be
+    Player instances or team names. Matches are streamed round by round and
+    written with batched inserts inside one transaction.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+
+    with transaction.atomic():
+        saved_bracket = SavedBracket.objects.create(
+            tournament=tournament,
+            user=user,
+            name=bracket_name,
+            bracket_type='round_robin'
+        )
+
+        pending = []
+        num_matches = 0
+        for round_idx, pairs in enumerate(round_robin_rounds(entrants)):
+            for match_idx, (team1, team2) in enumerate(pairs):
+                pending.append(BracketMatch(
+                    saved_bracket=saved_bracket,
+                    round_number=round_idx,
+                    match_number=match_idx,
+                    **_entrant_fields(team1, 'team1'),
+                    **_entrant_fields(team2, 'team2')
+                ))
+            if len(pending) >= batch_size:
+                BracketMatch.objects.bulk_create(pending, batch_size=batch_size)
+                num_matches += len(pending)
+                pending = []
+        if pending:
+            BracketMatch.objects.bulk_create(pending, batch_size=batch_size)
+            num_matches += len(pending)
+
+        saved_bracket.num_matches = num_matches
+        saved_bracket.save(update_fields=['num_matches'])
+
+    return saved_bracket
+
+
+def round_robin_standings(saved_bracket):
+    """
+    Return standings for a round-robin bracket, best first, computed from
+    the recorded scores with two grouped aggregate queries.
+    """
+    scored = BracketMatch.objects.filter(
+        saved_bracket=saved_bracket, team1_score__isnull=False, team2_score__isnull=False
+    ).order_by()
+
+    standings = {}
+    for side, other in (('team1', 'team2'), ('team2', 'team1')):
+        rows = scored.values(f'{side}_player', f'{side}_name').annotate(
+            played=Count('id'),
+            wins=Count('id', filter=Q(**{f'{side}_score__gt': F(f'{other}_score')})),
+            draws=Count('id', filter=Q(**{f'{side}_score': F(f'{other}_score')})),
+            points_for=Sum(f'{side}_score'),
+            points_against=Sum(f'{other}_score'),
+        )
+        for row in rows:
+            key = (row[f'{side}_player'], row[f'{side}_name'])
+            entry = standings.setdefault(key, {
+                'player_id': row[f'{side}_player'],
+                'name': row[f'{side}_name'],
+                'played': 0, 'wins': 0, 'draws': 0, 'points_for': 0, 'points_against': 0,
+            })
+            for field in ('played', 'wins', 'draws', 'points_for', 'points_against'):
+                entry[field] += row[field]
+
+    # Fill in display names for player entrants
+    player_ids = [entry['player_id'] for entry in standings.values() if entry['player_id']]
+    if player_ids:
+        names = {
+            player_id: f"{first_name} {last_name}"
+            for player_id, first_name, last_name in Player.objects.filter(id__in=player_ids).values_list(
+                'id', 'first_name', 'last_name'
+            )
+        }
+        for entry in standings.values():
+            if entry['player_id']:
+                entry['name'] = names.get(entry['player_id'], entry['name'])
+
+    results = []
+    for entry in standings.values():
+        entry['losses'] = entry['played'] - entry['wins'] - entry['draws']
+        entry['point_diff'] = entry['points_for'] - entry['points_against']
+        results.append(entry)
+    results.sort(key=lambda entry: (-entry['wins'], -entry['draws'], -entry['point_diff'], -entry['points_for'], entry['name']))
+    return results
@@ -0,0 +1,189 @@
+"""
+Court and start-time scheduling for the matches of a bracket.
+
+plan_schedule() is an event-driven list scheduler: a heap of courts keyed
+by when each court frees up and a heap of matches keyed by the earliest
+time they may start. A match becomes ready once every feeder match is
+planned, at the feeder's end plus the rest gap, and is pushed back if one
+of its teams got booked elsewhere in the meantime. Each match costs a few
+heap operations, so a 1,000-match event plans in milliseconds.
+
+schedule_bracket() loads a bracket, plans every pending match and writes
+match_date/court for the rows that changed. Matches that already started
+keep their slot, so running it again after a match overruns only moves
+what is still to be played.
+"""
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .double_elimination import layout_for_bracket
+from .models import BracketMatch
+
+
+def plan_schedule(pending, feeders, courts, start, duration, rest, ready_at=None, court_free=None, team_free=None):
+    """
+    Plan start times and courts.
+
+    pending is a list of (key, teams) for the matches to plan, where teams
+    holds the keys of the teams already known to play in it. feeders maps a
+    key to the keys of the matches whose teams move on into it. ready_at,
+    court_free and team_free give times that matches, courts (numbered from
+    1) and teams are already held up to. Returns {key: (court, start_time)}.
+    """
+    ready_at = dict(ready_at or {})
+    court_free = court_free or {}
+    team_free = dict(team_free or {})
+    teams = dict(pending)
+
+    waiting = dict.fromkeys(teams, 0)
+    dependents = defaultdict(list)
+    for key in teams:
+        for feeder in feeders.get(key, ()):
+            if feeder in teams:
+                waiting[key] += 1
+                dependents[feeder].append(key)
+
+    court_heap = [(max(start, court_free.get(court, start)), court) for court in range(1, courts + 1)]
+    heapq.heapify(court_heap)
+    ready = [(max(start, ready_at.get(key, start)), key) for key, count in waiting.items() if count == 0]
+    heapq.heapify(ready)
+
+    schedule = {}
+    while ready:
+        earliest, key = heapq.heappop(ready)
+        # A team may have been booked since this match became ready
+        held_until = max((team_free[team] + rest for team in teams[key] if team in team_free), default=earliest)
+        if held_until > earliest:
+            heapq.heappush(ready, (held_until, key))
+            continue
+
+        free_at, court = heapq.heappop(court_heap)
+        begin = max(earliest, free_at)
+        end = begin + duration
+        heapq.heappush(court_heap, (end, court))
+        schedule[key] = (court, begin)
+
+        for team in teams[key]:
+            team_free[team] = end
+        for dependent in dependents[key]:
+            ready_at[dependent] = max(ready_at.get(dependent, start), end + rest)
+            waiting[dependent] -= 1
+            if not waiting[dependent]:
+                heapq.heappush(ready, (ready_at[dependent], dependent))
+    return schedule
+
+
+def bracket_feeders(saved_bracket, keys):
+    """
+    Return {(round_number, match_number): [feeder keys]} for a bracket.
+    Round-robin and Swiss matches have no feeders.
+    """
+    feeders = defaultdict(list)
+    if saved_bracket.bracket_type == 'single_elimination':
+        for round_number, match_number in keys:
+            if round_number:
+                feeders[(round_number, match_number)] = [
+                    (round_number - 1, 2 * match_number), (round_number - 1, 2 * match_number + 1)
+                ]
+    elif saved_bracket.bracket_type == 'double_elimination':
+        layout = layout_for_bracket(saved_bracket)
+        for key in keys:
+            for target in (layout.winner_target(*key), layout.loser_target(*key)):
+                if target is not None:
+                    feeders[target[:2]].append(key)
+    return feeders
+
+
+def _match_teams(match):
+    """Return the keys of the teams already placed in a match"""
+    teams = []
+    for player_id, name in ((match.team1_player_id, match.team1_name), (match.team2_player_id, match.team2_name)):
+        if player_id is not None:
+            teams.append(('player', player_id))
+        elif name and name != 'BYE':
+            teams.append(('name', name))
+    return tuple(teams)
+
+
+def schedule_bracket(saved_bracket, courts, start=None, match_minutes=None, rest_minutes=None, overruns=None,
+                     now=None, batch_size=None):
+    """
+    Give every pending match of a bracket a court and a start time, no
+    earlier than start (default: now).
+
+    Matches scheduled to start before now keep their slot and hold their
+    court and teams until they are expected to end; overruns maps
+    (round_number, match_number) to a later expected end for matches running
+    long. Only rows whose time or court changes are written. Returns the
+    number of matches planned.
+    """
+    if courts < 1:
+        raise ValueError("At least one court is needed")
+    now = now or timezone.now()
+    start = max(start or now, now)
+    if match_minutes is None:
+        match_minutes = getattr(settings, 'SCHEDULE_MATCH_MINUTES', 30)
+    if rest_minutes is None:
+        rest_minutes = getattr(settings, 'SCHEDULE_REST_MINUTES', 10)
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+    duration = timedelta(minutes=match_minutes)
+    rest = timedelta(minutes=rest_minutes)
+    overruns = overruns or {}
+
+    with transaction.atomic():
+        # Times are written into the bracket's own rows
+        saved_bracket.detach_pick_set()
+        matches = {
+            (match.round_number, match.match_number): match
+            for match in BracketMatch.objects.filter(saved_bracket=saved_bracket).only(
+                'id', 'round_number', 'match_number', 'team1_player_id', 'team2_player_id',
+                'team1_name', 'team2_name', 'winner_id', 'winner_name', 'is_bye', 'match_date', 'court'
+            )
+        }
+
+        pending = []
+        finished_at = {}
+        court_free = {}
+        team_free = {}
+        for key, match in matches.items():
+            done = match.is_bye or match.winner_id is not None or match.winner_name or 'BYE' in (match.team1_name, match.team2_name)
+            if not done and (match.match_date is None or match.match_date >= now):
+                pending.append((key, _match_teams(match)))
+                continue
+            if match.match_date is None:
+                continue
+            # Played or in progress: holds its court and teams until it ends
+            end = overruns.get(key, match.match_date + duration)
+            if done:
+                end = min(end, now)
+            finished_at[key] = end
+            if match.court is not None:
+                court_free[match.court] = max(court_free.get(match.court, start), end)
+            for team in _match_teams(match):
+                team_free[team] = max(team_free.get(team, end), end)
+
+        # Pending matches fed by played ones wait for them to finish
+        feeders = bracket_feeders(saved_bracket, matches.keys())
+        ready_at = {}
+        for key, _ in pending:
+            ends = [finished_at[feeder] for feeder in feeders.get(key, ()) if feeder in finished_at]
+            if ends:
+                ready_at[key] = max(ends) + rest
+
+        schedule = plan_schedule(pending, feeders, courts, start, duration, rest, ready_at, court_free, team_free)
+
+        changed = []
+        for key, (court, begin) in schedule.items():
+            match = matches[key]
+            if match.court != court or match.match_date != begin:
+                match.court = court
+                match.match_date = begin
+                changed.append(match)
+        BracketMatch.objects.bulk_update(changed, ['match_date', 'court'], batch_size=batch_size)
+    return len(schedule)
@@ -0,0 +1,151 @@
+"""
+Bracket-pool scoring: every saved bracket in a tournament is compared with
+the tournament's official bracket and earns points for each correct pick.
+Brackets with identical picks share a PickSet, which is scored only once.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Exists, IntegerField, Max, OuterRef, Sum, Value, When
+
+from .models import BracketMatch, SavedBracket, TournamentResult
+
+
+def round_points_table(num_rounds, points_per_round=None):
+    """
+    Return a list with the points for a correct pick in each round. Defaults
+    to the BRACKET_POOL_ROUND_POINTS setting, or doubling points per round.
+    Rounds past the end of a short table use its last value.
+    """
+    if points_per_round is None:
+        points_per_round = getattr(settings, 'BRACKET_POOL_ROUND_POINTS', None)
+    if not points_per_round:
+        return [2 ** round_number for round_number in range(num_rounds)]
+    points = list(points_per_round)[:num_rounds]
+    return points + [points[-1]] * (num_rounds - len(points))
+
+
+def round_points_case(points):
+    """Return an expression giving the points of a pick's round"""
+    return Case(
+        *[When(round_number=round_number, then=Value(value)) for round_number, value in enumerate(points)],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+
+def pool_brackets(tournament, official):
+    """Return the brackets scored against the official bracket"""
+    return SavedBracket.objects.filter(tournament=tournament, bracket_type=official.bracket_type).exclude(pk=official.pk)
+
+
+def pool_pick_points(tournament, official, points, *conditions):
+    """
+    Sum the round points of every pool pick matching conditions. Returns
+    (points_by_bracket, points_by_pick_set): brackets with their own rows
+    are grouped by bracket, shared pick sets are evaluated once each.
+    """
+    brackets = pool_brackets(tournament, official)
+    picks = BracketMatch.objects.exclude(winner_name='').filter(*conditions).order_by()
+    round_points = round_points_case(points)
+
+    by_bracket = picks.filter(saved_bracket__in=brackets.filter(pick_set__isnull=True)).values(
+        'saved_bracket'
+    ).annotate(points=Sum(round_points))
+    by_pick_set = picks.filter(pick_set__in=brackets.values('pick_set')).values(
+        'pick_set'
+    ).annotate(points=Sum(round_points))
+    return (
+        {row['saved_bracket']: row['points'] for row in by_bracket},
+        {row['pick_set']: row['points'] for row in by_pick_set}
+    )
+
+
+def fan_out_points(tournament, official, by_bracket, by_pick_set):
+    """Merge per-pick-set points into {saved_bracket_id: points}"""
+    points_by_bracket = dict(by_bracket)
+    if by_pick_set:
+        brackets = pool_brackets(tournament, official).filter(pick_set__isnull=False)
+        for bracket_id, pick_set_id in brackets.values_list('id', 'pick_set'):
+            if pick_set_id in by_pick_set:
+                points_by_bracket[bracket_id] = by_pick_set[pick_set_id]
+    return points_by_bracket
+
+
+def bracket_pool_points(tournament, official, points):
+    """
+    Return {saved_bracket_id: points} for every bracket with at least one
+    correct pick. Each pick is matched to the official result for the same
+    slot through the (round_number, match_number) unique index, and
+    identical brackets sharing a pick set are scored only once.
+    """
+    official_result = official.pick_matches().filter(
+        round_number=OuterRef('round_number'),
+        match_number=OuterRef('match_number'),
+        winner_name=OuterRef('winner_name')
+    )
+    by_bracket, by_pick_set = pool_pick_points(tournament, official, points, Exists(official_result))
+    return fan_out_points(tournament, official, by_bracket, by_pick_set)
+
+
+def rank_points(points_by_bracket):
+    """Return {saved_bracket_id: position} with standard competition ranking (1, 2, 2, 4)"""
+    positions = {}
+    previous_points = None
+    position = 0
+    for idx, (bracket_id, points) in enumerate(sorted(points_by_bracket.items(), key=lambda item: (-item[1], item[0]))):
+        if points != previous_points:
+            position = idx + 1
+            previous_points = points
+        positions[bracket_id] = position
+    return positions
+
+
+def write_tournament_results(tournament, points_by_bracket, batch_size=None):
+    """Store points and positions in TournamentResult rows with bulk writes"""
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+    positions = rank_points(points_by_bracket)
+
+    with transaction.atomic():
+        existing = {
+            result.saved_bracket_id: result
+            for result in TournamentResult.objects.filter(tournament=tournament).only(
+                'id', 'saved_bracket_id', 'points_earned', 'final_position'
+            )
+        }
+        to_update = []
+        to_create = []
+        for bracket_id, points in points_by_bracket.items():
+            result = existing.get(bracket_id)
+            if result is None:
+                to_create.append(TournamentResult(
+                    tournament=tournament,
+                    saved_bracket_id=bracket_id,
+                    points_earned=points,
+                    final_position=positions[bracket_id]
+                ))
+            elif result.points_earned != points or result.final_position != positions[bracket_id]:
+                result.points_earned = points
+                result.final_position = positions[bracket_id]
+                to_update.append(result)
+        TournamentResult.objects.bulk_update(to_update, ['points_earned', 'final_position'], batch_size=batch_size)
+        TournamentResult.objects.bulk_create(to_create, batch_size=batch_size)
+    return len(to_create), len(to_update)
+
+
+def score_tournament_brackets(tournament, points_per_round=None, batch_size=None):
+    """
+    Score every saved bracket of a tournament against its official bracket
+    and store the results. Returns {saved_bracket_id: points}.
+    """
+    official = tournament.official_bracket
+    if official is None:
+        raise ValueError("The tournament has no official bracket to score against")
+
+    num_rounds = (official.pick_matches().aggregate(max_round=Max('round_number'))['max_round'] or 0) + 1
+    points = round_points_table(num_rounds, points_per_round)
+
+    points_by_bracket = dict.fromkeys(pool_brackets(tournament, official).values_list('id', flat=True), 0)
+    points_by_bracket.update(bracket_pool_points(tournament, official, points))
+    write_tournament_results(tournament, points_by_bracket, batch_size=batch_size)
+    return points_by_bracket
@@ -0,0 +1,63 @@
+"""
+Seeded single-elimination brackets built from a tournament's participants.
+"""
+import math
+from functools import lru_cache
+
+from django.db.models import F
+
+from .topology import get_bracket_topology
+
+
+@lru_cache(maxsize=32)
+def standard_seed_order(bracket_size):
+    """
+    Return seed numbers in first-round slot order for a power-of-two bracket,
+    e.g. (1, 8, 4, 5, 2, 7, 3, 6) for 8 slots. Seed s always meets seed
+    bracket_size + 1 - s in the first round, so the top seeds get the BYEs.
+    """
+    order = [1]
+    while len(order) < bracket_size:
+        total = len(order) * 2 + 1
+        order = [seed for s in order for seed in (s, total - s)]
+    return tuple(order)
+
+
+def seeded_participant_names(tournament):
+    """
+    Return the display names of a tournament's active participants in seed
+    order. Participants without a seed_position follow the seeded ones in
+    registration order.
+    """
+    participants = tournament.participants.filter(is_active=True).order_by(
+        F('seed_position').asc(nulls_last=True), 'registration_date', 'id'
+    ).values_list('player__first_name', 'player__last_name')
+    return [f"{first_name} {last_name}" for first_name, last_name in participants]
+
+
+def generate_seeded_bracket(names):
+    """
+    Generate a single-elimination bracket with names placed by seed, where
+    names[0] is the top seed. BYE matches are decided and their winners
+    already advanced to the second round.
+    """
+    num_participants = len(names)
+    bracket_size = max(2, 2 ** math.ceil(math.log2(num_participants)))
+    topology = get_bracket_topology(bracket_size)
+    bracket = topology.new_bracket()
+    order = standard_seed_order(bracket_size)
+
+    for match_idx, match in enumerate(bracket[0]):
+        seed1, seed2 = order[2 * match_idx], order[2 * match_idx + 1]
+        match['team1'] = names[seed1 - 1]
+        if seed2 <= num_participants:
+            match['team2'] = names[seed2 - 1]
+            continue
+        match['team2'] = 'BYE'
+        match['winner'] = match['team1']
+        target = topology.advance_target(0, match_idx)
+        if target is not None:
+            next_round_idx, next_match_idx, side = target
+            bracket[next_round_idx][next_match_idx][side] = match['winner']
+
+    return bracket
@@ -0,0 +1,27 @@
+"""
+Per-connection SQLite tuning.
+
+Django 4.2 has no setting for SQLite pragmas, so configure_connection() is
+connected to connection_created in MatchesConfig.ready() and runs the
+pragmas of settings.SQLITE_PRAGMAS on each new SQLite connection. With
+CONN_MAX_AGE that happens once per persistent connection, not per request.
+"""
+from django.conf import settings
+
+
+def apply_pragmas(cursor, pragmas):
+    """Run PRAGMA name = value for each item of pragmas on a DB-API cursor"""
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """connection_created receiver applying settings.SQLITE_PRAGMAS"""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    # WAL cannot be enabled on an in-memory database, such as a test database
+    if connection.is_in_memory_db():
+        pragmas = {name: value for name, value in pragmas.items() if name not in ('journal_mode', 'mmap_size')}
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
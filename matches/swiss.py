@@ -0,0 +1,186 @@
+"""
+Swiss-system events stored as SavedBracket/BracketMatch rows.
+
+Each round is one round_number. A round is paired with a minimum-cost
+perfect matching (matches.matching) between players close in the ranking.
+Rematches cost more than any score gaps, and score gaps cost more than
+distance in the ranking. So a rematch is only paired when no rematch-free
+pairing exists, and players meet others in their own score group where
+possible. All prior results are read with a single query per round.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from players.models import Player
+from .matching import max_weight_matching
+from .models import BracketMatch, SavedBracket
+
+WIN_POINTS = 1.0
+DRAW_POINTS = 0.5
+BYE_POINTS = 1.0
+# Fewest ranks apart a player's candidate opponents reach; widened while rematches remain
+MIN_PAIRING_WINDOW = 8
+
+
+def swiss_players(tournament):
+    """Return the tournament's active players in seed order"""
+    return list(Player.objects.filter(
+        tournament_participations__tournament=tournament,
+        tournament_participations__is_active=True
+    ).order_by(
+        F('tournament_participations__seed_position').asc(nulls_last=True),
+        'tournament_participations__registration_date'
+    ))
+
+
+def swiss_results(saved_bracket):
+    """
+    Read every recorded match of a Swiss bracket in one query. Returns
+    (scores, opponents, byes, rounds_played, unfinished), keyed by player id.
+    """
+    scores = {}
+    opponents = {}
+    byes = set()
+    rounds_played = 0
+    unfinished = 0
+
+    matches = BracketMatch.objects.filter(saved_bracket=saved_bracket).order_by().values_list(
+        'round_number', 'team1_player', 'team2_player', 'team1_score', 'team2_score', 'winner', 'is_bye'
+    )
+    for round_number, player1, player2, score1, score2, winner, is_bye in matches:
+        rounds_played = max(rounds_played, round_number + 1)
+        if is_bye:
+            scores[player1] = scores.get(player1, 0) + BYE_POINTS
+            byes.add(player1)
+            continue
+        opponents.setdefault(player1, set()).add(player2)
+        opponents.setdefault(player2, set()).add(player1)
+        if score1 is not None and score2 is not None and score1 == score2:
+            scores[player1] = scores.get(player1, 0) + DRAW_POINTS
+            scores[player2] = scores.get(player2, 0) + DRAW_POINTS
+        elif score1 is not None and score2 is not None:
+            winner = player1 if score1 > score2 else player2
+            scores[winner] = scores.get(winner, 0) + WIN_POINTS
+        elif winner:
+            scores[winner] = scores.get(winner, 0) + WIN_POINTS
+        else:
+            unfinished += 1
+    return scores, opponents, byes, rounds_played, unfinished
+
+
+def pair_swiss_round(player_ids, scores, opponents, byes):
+    """
+    Pair one Swiss round. player_ids must be in seed order; it is re-sorted
+    by score, keeping seed order within each score group. Returns
+    (pairs, bye_player_id) where bye_player_id is None for an even field.
+    """
+    seed_rank = {player_id: rank for rank, player_id in enumerate(player_ids)}
+    ranked = sorted(player_ids, key=lambda player_id: (-scores.get(player_id, 0), seed_rank[player_id]))
+
+    bye_player = None
+    if len(ranked) % 2:
+        # Lowest-ranked player who has not had a bye yet
+        for player_id in reversed(ranked):
+            if player_id not in byes:
+                bye_player = player_id
+                break
+        else:
+            bye_player = ranked[-1]
+        ranked.remove(bye_player)
+
+    return _pair_ranked(ranked, scores, opponents), bye_player
+
+
+def _pair_ranked(ranked, scores, opponents):
+    """
+    Pair an even list of ranked players with a minimum-cost perfect matching.
+    Only opponents within a window of ranks are considered. The window starts
+    wide enough for every player to have unmet opponents on both sides, and
+    is doubled up to the whole field while the best pairing has a rematch.
+    """
+    count = len(ranked)
+    if not count:
+        return []
+    most_met = max(len(opponents.get(player_id, ())) for player_id in ranked)
+    window = min(count - 1, max(MIN_PAIRING_WINDOW, 2 * most_met + 2))
+
+    # Costs in half points of score gap; every tier outweighs all of the cheaper ones together
+    halves = [round(2 * scores.get(player_id, 0)) for player_id in ranked]
+    gap_cost = count * count
+    rematch_cost = count * ((halves[0] - halves[-1]) ** 2 * gap_cost + count) + 1
+    top_cost = rematch_cost + (halves[0] - halves[-1]) ** 2 * gap_cost + count
+    while True:
+        edges = []
+        rematches = set()
+        for a in range(count):
+            met = opponents.get(ranked[a], ())
+            for b in range(a + 1, min(count, a + window + 1)):
+                cost = (halves[a] - halves[b]) ** 2 * gap_cost + b - a
+                if ranked[b] in met:
+                    cost += rematch_cost
+                    rematches.add((a, b))
+                edges.append((a, b, top_cost - cost))
+        mate = max_weight_matching(edges)
+        pairs = [(a, mate[a]) for a in range(count) if mate[a] > a]
+        if window == count - 1 or not rematches.intersection(pairs):
+            return [(ranked[a], ranked[b]) for a, b in pairs]
+        window = min(count - 1, 2 * window)
+
+
+def create_swiss_bracket(tournament, user, bracket_name="My Bracket"):
+    """Create an empty Swiss bracket; rounds are added with create_next_swiss_round"""
+    return SavedBracket.objects.create(
+        tournament=tournament,
+        user=user,
+        name=bracket_name,
+        bracket_type='swiss'
+    )
+
+
+def create_next_swiss_round(saved_bracket, batch_size=None):
+    """
+    Pair and store the next round of a Swiss bracket. Raises ValueError if
+    the current round still has matches without a result.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'BRACKET_SAVE_BATCH_SIZE', 500)
+
+    scores, opponents, byes, rounds_played, unfinished = swiss_results(saved_bracket)
+    if unfinished:
+        raise ValueError(f"{unfinished} matches of round {rounds_played} still need a result")
+
+    player_ids = [player.id for player in swiss_players(saved_bracket.tournament)]
+    if len(player_ids) < 2:
+        raise ValueError("A Swiss round needs at least two players")
+    pairs, bye_player = pair_swiss_round(player_ids, scores, opponents, byes)
+
+    matches = [
+        BracketMatch(
+            saved_bracket=saved_bracket,
+            round_number=rounds_played,
+            match_number=match_idx,
+            team1_player_id=player1,
+            team2_player_id=player2
+        )
+        for match_idx, (player1, player2) in enumerate(pairs)
+    ]
+    if bye_player is not None:
+        matches.append(BracketMatch(
+            saved_bracket=saved_bracket,
+            round_number=rounds_played,
+            match_number=len(pairs),
+            team1_player_id=bye_player,
+            team2_name='BYE',
+            winner_id=bye_player,
+            is_bye=True
+        ))
+
+    with transaction.atomic():
+        BracketMatch.objects.bulk_create(matches, batch_size=batch_size)
+        SavedBracket.objects.filter(pk=saved_bracket.pk).update(
+            num_matches=F('num_matches') + len(matches),
+            num_completed_matches=F('num_completed_matches') + (1 if bye_player is not None else 0),
+            snapshot=None
+        )
+    return matches
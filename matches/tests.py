@@ -1,3 +1,293 @@
-from django.test import TestCase
+import random
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from pages.views import generate_empty_bracket
+from players.models import Player
+from .matching import max_weight_matching
+from .matchmaking import SessionPlanner
+from .models import (
+    Match, PickCount, PickSet, PlayerRating, PlayerStats, SavedBracket, Tournament, TournamentParticipant,
+    create_bracket_from_session_data, register_participant
+)
+from .player_stats import rebuild_player_stats
+from .ratings import recompute_ratings
+from .swiss import pair_swiss_round
+
+
+class ConcurrentRegistrationTests(TransactionTestCase):
+    """Registration bursts must never overfill a tournament"""
+
+    NUM_PLAYERS = 200
+    CAPACITY = 64
+
+    def setUp(self):
+        organizer = User.objects.create(username='organizer')
+        self.tournament = Tournament.objects.create(
+            name='Open',
+            start_date=timezone.now() + timedelta(days=7),
+            end_date=timezone.now() + timedelta(days=8),
+            max_participants=self.CAPACITY,
+            created_by=organizer
+        )
+        users = User.objects.bulk_create([User(username=f'player{idx}') for idx in range(self.NUM_PLAYERS)])
+        self.players = Player.objects.bulk_create([
+            Player(user=user, first_name='Player', last_name=str(idx), email='', gender=Player.Gender.MALE)
+            for idx, user in enumerate(users)
+        ])
+
+    def _register_all(self, players):
+        """Register every player from its own thread, all released at once"""
+        start = threading.Barrier(len(players))
+        outcomes = []
+        errors = []
+
+        def register(player):
+            try:
+                start.wait()
+                # No retries: waiting for the write lock is left to the busy timeout
+                outcomes.append(register_participant(self.tournament, player)[1])
+            except ValueError:
+                outcomes.append(None)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=register, args=(player,)) for player in players]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return outcomes
+
+    def assert_capacity_respected(self):
+        self.tournament.refresh_from_db()
+        active = TournamentParticipant.objects.filter(tournament=self.tournament, is_active=True).count()
+        self.assertEqual(active, self.CAPACITY)
+        self.assertEqual(self.tournament.num_participants, active)
+
+    def test_burst_of_registrations_fills_exactly_to_capacity(self):
+        outcomes = self._register_all(self.players)
+        self.assertEqual(outcomes.count(True), self.CAPACITY)
+        self.assertEqual(outcomes.count(None), self.NUM_PLAYERS - self.CAPACITY)
+        self.assert_capacity_respected()
+
+    def test_duplicate_registrations_are_idempotent(self):
+        # Every player of the first half registers four times at once
+        players = self.players[:self.CAPACITY // 2] * 4 + self.players[self.CAPACITY // 2:self.CAPACITY]
+        outcomes = self._register_all(players)
+        self.assertEqual(outcomes.count(True), self.CAPACITY)
+        self.assertNotIn(None, outcomes)
+        self.assert_capacity_respected()
+
+    def test_deactivating_a_participant_frees_a_spot(self):
+        self._register_all(self.players[:self.CAPACITY])
+        with self.assertRaises(ValueError):
+            register_participant(self.tournament, self.players[-1])
+
+        participant = TournamentParticipant.objects.get(tournament=self.tournament, player=self.players[0])
+        participant.is_active = False
+        participant.save()
+        self.assertEqual(register_participant(self.tournament, self.players[-1])[1], True)
+        # The old registration cannot come back while the tournament is full again
+        with self.assertRaises(ValueError):
+            register_participant(self.tournament, self.players[0])
+        self.assert_capacity_respected()
+
+    def test_bulk_deletes_free_spots(self):
+        self._register_all(self.players[:self.CAPACITY])
+        TournamentParticipant.objects.filter(tournament=self.tournament, player__in=self.players[:4]).delete()
+        self.players[4].delete()
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.num_participants, self.CAPACITY - 5)
+        self._register_all(self.players[-5:])
+        self.assert_capacity_respected()
+
+
+class BracketDeleteTests(TestCase):
+    """Deleted public brackets must leave the pick counts, however they are deleted"""
+
+    def setUp(self):
+        organizer = User.objects.create(username='organizer')
+        self.tournament = Tournament.objects.create(
+            name='Open', start_date=timezone.now(), end_date=timezone.now(), max_participants=8, created_by=organizer
+        )
+        self.users = User.objects.bulk_create([User(username=f'picker{idx}') for idx in range(3)])
+        bracket_data = generate_empty_bracket(2)
+        bracket_data[0][0].update(team1='Aces', team2='Kings', winner='Aces')
+        for user in self.users:
+            bracket = create_bracket_from_session_data(self.tournament, user, bracket_data)
+            bracket.is_public = True
+            bracket.save()
+
+    def assert_public_brackets(self, count):
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.num_public_brackets, count)
+        self.assertEqual(PickCount.objects.get(tournament=self.tournament, team_name='Aces').count, count)
+
+    def test_queryset_and_cascade_deletes_remove_picks(self):
+        self.assert_public_brackets(3)
+        SavedBracket.objects.filter(user=self.users[0]).delete()
+        self.assert_public_brackets(2)
+        self.users[1].delete()
+        self.assert_public_brackets(1)
+        # The shared pick set goes with the last bracket using it
+        self.assertEqual(PickSet.objects.count(), 1)
+        SavedBracket.objects.filter(tournament=self.tournament).delete()
+        self.assert_public_brackets(0)
+        self.assertFalse(PickSet.objects.exists())
+
+
+class MatchDeleteTests(TestCase):
+    """Deleted matches must leave player stats and ratings, however they are deleted"""
+
+    def setUp(self):
+        users = User.objects.bulk_create([User(username=f'player{idx}') for idx in range(8)])
+        self.players = Player.objects.bulk_create([
+            Player(user=user, first_name='Player', last_name=str(idx), email='', gender=Player.Gender.MALE)
+            for idx, user in enumerate(users)
+        ])
+        rng = random.Random(7)
+        for _ in range(30):
+            player1, player2, player3, player4 = rng.sample(self.players, 4)
+            Match.objects.create(
+                team1player1=player1, team1player2=player2, team2player1=player3, team2player2=player4,
+                team1_game_score=rng.randint(0, 21), team2_game_score=rng.randint(0, 21)
+            )
+
+    def snapshot(self):
+        return (
+            sorted(PlayerStats.objects.values_list(
+                'player_id', 'matches_played', 'wins', 'losses', 'draws', 'points_for', 'points_against', 'recent_form'
+            )),
+            sorted((player_id, round(rating, 6), rated) for player_id, rating, rated in PlayerRating.objects.values_list(
+                'player_id', 'rating', 'matches_rated'
+            ))
+        )
+
+    def assert_matches_rebuild(self, ratings=True):
+        incremental = self.snapshot()
+        rebuild_player_stats()
+        recompute_ratings()
+        rebuilt = self.snapshot()
+        self.assertEqual(incremental[0], rebuilt[0])
+        if ratings:
+            self.assertEqual(incremental[1], rebuilt[1])
+
+    def test_queryset_delete_of_the_latest_match(self):
+        Match.objects.filter(pk=Match.objects.latest('pk').pk).delete()
+        self.assert_matches_rebuild()
+
+    def test_player_cascade(self):
+        # Ratings of older matches are only approximated until recompute_ratings() runs
+        self.players[0].delete()
+        self.assert_matches_rebuild(ratings=False)
+        self.assertFalse(PlayerStats.objects.filter(player_id=self.players[0].pk).exists())
+
+
+class SessionPlannerTests(SimpleTestCase):
+    def test_players_rarely_repeat_partners(self):
+        rng = random.Random(0)
+        players = [Player(id=idx, gender=Player.Gender.MALE) for idx in range(1, 201)]
+        ratings = {player.id: rng.gauss(1500, 200) for player in players}
+        planner = SessionPlanner(players, ratings, seed=0)
+        for _ in range(8):
+            planner.plan_round(50)
+        repeated = [count for count in planner.partner_counts.values() if count > 1]
+        self.assertLessEqual(max(planner.partner_counts.values()), 2)
+        self.assertLess(len(repeated), 10)
+
+
+class SwissPairingTests(SimpleTestCase):
+    """Swiss rounds are paired without rematches whenever that is possible"""
+
+    def assert_no_rematches(self, pairs, opponents):
+        rematches = [(a, b) for a, b in pairs if b in opponents.get(a, ())]
+        self.assertEqual(rematches, [])
+
+    def test_avoids_rematches_that_closest_rank_pairing_would_force(self):
+        # Pairing 0 with 1, then 2 with 3, leaves 4-7, 5-6 and so on only as rematches
+        met = [(0, 4), (0, 5), (0, 7), (1, 3), (1, 5), (1, 7), (2, 4), (2, 6),
+               (3, 5), (3, 6), (4, 6), (4, 7), (5, 6), (6, 7)]
+        opponents = {}
+        for a, b in met:
+            opponents.setdefault(a, set()).add(b)
+            opponents.setdefault(b, set()).add(a)
+        pairs, bye = pair_swiss_round(list(range(8)), {}, opponents, set())
+        self.assertIsNone(bye)
+        self.assertEqual(sorted(player for pair in pairs for player in pair), list(range(8)))
+        self.assert_no_rematches(pairs, opponents)
+
+    def test_pairs_the_bottom_of_the_field_with_the_top(self):
+        # Each of the bottom three has met everyone except one of the top three
+        opponents = {}
+        for low, high in ((13, 0), (14, 1), (15, 2)):
+            for other in range(16):
+                if other not in (low, high):
+                    opponents.setdefault(low, set()).add(other)
+                    opponents.setdefault(other, set()).add(low)
+        pairs, bye = pair_swiss_round(list(range(16)), {}, opponents, set())
+        self.assertIsNone(bye)
+        self.assert_no_rematches(pairs, opponents)
+        self.assertEqual(sorted(pairs), [(0, 13), (1, 14), (2, 15), (3, 4), (5, 6), (7, 8), (9, 10), (11, 12)])
+
+    def test_thousand_player_event_has_no_rematches(self):
+        rng = random.Random(13)
+        player_ids = list(range(1, 1002))
+        scores, opponents, byes = {}, {}, set()
+        for _ in range(10):
+            pairs, bye = pair_swiss_round(player_ids, scores, opponents, byes)
+            self.assert_no_rematches(pairs, opponents)
+            self.assertEqual(len(pairs), 500)
+
+            byes.add(bye)
+            scores[bye] = scores.get(bye, 0) + 1
+            for a, b in pairs:
+                opponents.setdefault(a, set()).add(b)
+                opponents.setdefault(b, set()).add(a)
+                winner = a if rng.random() < 0.5 else b
+                scores[winner] = scores.get(winner, 0) + 1
+
+
+class MaxWeightMatchingTests(SimpleTestCase):
+    """The blossom matching agrees with an exhaustive search on small graphs"""
+
+    def best_by_search(self, vertices, weights):
+        """Return the (cardinality, weight) of the best matching by trying every one"""
+        if not vertices:
+            return 0, 0
+        first, rest = vertices[0], vertices[1:]
+        best = self.best_by_search(rest, weights)
+        for idx, other in enumerate(rest):
+            if (first, other) in weights:
+                cardinality, weight = self.best_by_search(rest[:idx] + rest[idx + 1:], weights)
+                best = max(best, (cardinality + 1, weight + weights[(first, other)]))
+        return best
+
+    def test_matches_exhaustive_search(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            count = rng.randint(2, 9)
+            density = rng.random()
+            edges = [
+                (a, b, rng.randint(0, 20))
+                for a in range(count) for b in range(a + 1, count) if rng.random() < density
+            ]
+            if not edges:
+                continue
+            weights = {}
+            for a, b, weight in edges:
+                weights[(a, b)] = weights[(b, a)] = weight
+            mate = max_weight_matching(edges)
+            pairs = [(a, b) for a, b in enumerate(mate) if b > a]
+            for a, b in pairs:
+                self.assertEqual(mate[b], a)
+            result = (len(pairs), sum(weights[pair] for pair in pairs))
+            self.assertEqual(result, self.best_by_search(list(range(len(mate))), weights))
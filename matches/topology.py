@@ -0,0 +1,146 @@
+"""
+Precomputed single-elimination bracket layouts.
+
+A bracket's shape only depends on its number of participants, so the round
+structure, BYE positions and winner routing are computed once per size and
+shared by every bracket of that size.
+"""
+import math
+from array import array
+from functools import lru_cache
+
+from django.conf import settings
+
+
+class BracketTopology:
+    """
+    Layout of a single-elimination bracket for a given number of participants.
+
+    Matches are numbered in one flat sequence, round by round. For each flat
+    index, next_match holds the flat index of the match its winner advances
+    to (-1 for the final) and next_side holds 0 for team1 or 1 for team2.
+    """
+
+    def __init__(self, num_participants):
+        self.num_participants = num_participants
+        self.total_slots = 2 ** math.ceil(math.log2(num_participants))
+        self.bye_positions = frozenset(_bye_positions(self.total_slots, num_participants))
+
+        # Round sizes and the flat index at which each round starts
+        round_sizes = [len(range(0, self.total_slots, 2))]
+        while round_sizes[-1] > 1:
+            round_sizes.append((round_sizes[-1] + 1) // 2)
+        self.round_sizes = tuple(round_sizes)
+        self.num_rounds = len(round_sizes)
+        offsets = [0]
+        for size in round_sizes[:-1]:
+            offsets.append(offsets[-1] + size)
+        self.round_offsets = tuple(offsets)
+        self.num_matches = sum(round_sizes)
+
+        self.next_match = array('l', [-1]) * self.num_matches
+        self.next_side = array('b', [0]) * self.num_matches
+        for round_idx in range(self.num_rounds - 1):
+            offset = self.round_offsets[round_idx]
+            next_offset = self.round_offsets[round_idx + 1]
+            for match_idx in range(self.round_sizes[round_idx]):
+                self.next_match[offset + match_idx] = next_offset + match_idx // 2
+                self.next_side[offset + match_idx] = match_idx % 2
+
+        self._template = self._build_template()
+
+    def _build_template(self):
+        """Build the empty bracket in the session list-of-dicts format"""
+        first_round = []
+        for match_idx, pos1 in enumerate(range(0, self.total_slots, 2)):
+            if pos1 in self.bye_positions:
+                team1, team2, winner = 'BYE', '', ''
+            elif pos1 + 1 in self.bye_positions:
+                team1, team2, winner = '', 'BYE', ''
+            else:
+                # No auto-winner for non-BYE matches
+                team1, team2, winner = '', '', None
+            first_round.append({
+                'team1': team1,
+                'team2': team2,
+                'winner': winner,
+                'score1': None,
+                'score2': None,
+                'match_id': f"match_0_{match_idx}"
+            })
+
+        rounds = [tuple(first_round)]
+        for round_num in range(1, self.num_rounds):
+            rounds.append(tuple(
+                {
+                    'team1': None,  # Filled from previous round winners
+                    'team2': None,
+                    'winner': None,
+                    'score1': None,
+                    'score2': None,
+                    'match_id': f"match_{round_num}_{match_idx}"
+                }
+                for match_idx in range(self.round_sizes[round_num])
+            ))
+        return tuple(rounds)
+
+    def new_bracket(self):
+        """Return a fresh, mutable copy of the empty bracket"""
+        return [[match.copy() for match in round_matches] for round_matches in self._template]
+
+    def flat_index(self, round_idx, match_idx):
+        """Return the flat index of a match"""
+        return self.round_offsets[round_idx] + match_idx
+
+    def position(self, flat_idx):
+        """Return the (round_idx, match_idx) of a flat index"""
+        round_idx = self.num_rounds - 1
+        while self.round_offsets[round_idx] > flat_idx:
+            round_idx -= 1
+        return round_idx, flat_idx - self.round_offsets[round_idx]
+
+    def advance_target(self, round_idx, match_idx):
+        """
+        Return (next_round_idx, next_match_idx, side) for the winner of a
+        match, where side is 'team1' or 'team2', or None for the final.
+        """
+        flat_idx = self.round_offsets[round_idx] + match_idx
+        next_flat = self.next_match[flat_idx]
+        if next_flat < 0:
+            return None
+        side = 'team2' if self.next_side[flat_idx] else 'team1'
+        return round_idx + 1, next_flat - self.round_offsets[round_idx + 1], side
+
+
+def _bye_positions(total_slots, num_participants):
+    """Distribute BYEs evenly across the four quarters of the first round"""
+    byes_needed = total_slots - num_participants
+    byes_per_quarter = byes_needed // 4
+    extra_byes = byes_needed % 4
+    quarter_size = total_slots // 4
+
+    bye_positions = []
+    for quarter in range(4):
+        quarter_byes = byes_per_quarter + (1 if quarter < extra_byes else 0)
+        start_pos = quarter * quarter_size
+        for i in range(quarter_byes):
+            bye_pos = start_pos + (i * 2) + 1
+            if bye_pos < start_pos + quarter_size:
+                bye_positions.append(bye_pos)
+    return bye_positions
+
+
+@lru_cache(maxsize=getattr(settings, 'BRACKET_TOPOLOGY_CACHE_SIZE', 32))
+def get_bracket_topology(num_participants):
+    """Return the shared BracketTopology for a number of participants"""
+    return BracketTopology(num_participants)
+
+
+def get_bracket_topology_for_data(bracket_data):
+    """
+    Return the topology matching the shape of session bracket data.
+
+    Winner routing only depends on the number of first-round slots, so a
+    full bracket of that size is used.
+    """
+    return get_bracket_topology(len(bracket_data[0]) * 2)
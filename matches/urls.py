@@ -8,6 +8,18 @@ urlpatterns = [
     path('tournaments/<int:tournament_id>/register/', views.register_tournament, name='register_tournament'),
     path('tournaments/<int:tournament_id>/save-bracket/', views.save_bracket, name='save_bracket'),
     path('tournaments/<int:tournament_id>/load-bracket/', views.load_bracket, name='load_bracket'),
+    path('tournaments/<int:tournament_id>/seed-bracket/', views.seed_bracket, name='seed_bracket'),
+    path('tournaments/<int:tournament_id>/round-robin/', views.create_round_robin, name='create_round_robin'),
+    path('tournaments/<int:tournament_id>/double-elimination/', views.create_double_elimination, name='create_double_elimination'),
+    path('tournaments/<int:tournament_id>/swiss/', views.create_swiss, name='create_swiss'),
+    path('tournaments/<int:tournament_id>/swiss/next-round/', views.swiss_next_round, name='swiss_next_round'),
     path('my-brackets/', views.user_brackets, name='user_brackets'),
     path('api/tournaments/<int:tournament_id>/participants/', views.tournament_participants_api, name='tournament_participants_api'),
+    path('api/tournaments/<int:tournament_id>/roster/', views.tournament_roster_api, name='tournament_roster_api'),
+    path('api/tournaments/<int:tournament_id>/leaderboard/', views.tournament_leaderboard_api, name='tournament_leaderboard_api'),
+    path('api/tournaments/<int:tournament_id>/picks/', views.tournament_picks_api, name='tournament_picks_api'),
+    path('api/tournaments/<int:tournament_id>/official-results/', views.official_result_api, name='official_result_api'),
+    path('api/tournaments/<int:tournament_id>/schedule/', views.tournament_schedule_api, name='tournament_schedule_api'),
+    path('api/brackets/<int:bracket_id>/standings/', views.bracket_standings_api, name='bracket_standings_api'),
+    path('api/brackets/<int:bracket_id>/results/', views.bracket_result_api, name='bracket_result_api'),
 ]
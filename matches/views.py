@@ -1,17 +1,31 @@
+import json
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import OperationalError, transaction
+from django.db.models import F
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
-from .models import Tournament, TournamentParticipant, SavedBracket, BracketMatch
-from .models import create_bracket_from_session_data, convert_bracket_to_session_data
+from django.utils.dateparse import parse_datetime
+from .models import Tournament, SavedBracket, BracketMatch, TournamentResult
+from .models import register_participant, save_bracket_from_session_data
+from .drafts import get_session_draft, start_session_draft
+from .double_elimination import create_double_elimination_bracket, record_double_elimination_result
+from .leaderboard import leaderboard_rank, leaderboard_top, record_official_result
+from .picks import pick_distribution
+from .roster import parse_roster_csv, register_roster
+from .round_robin import create_round_robin_bracket, round_robin_standings
+from .scheduling import schedule_bracket
+from .seeding import generate_seeded_bracket, seeded_participant_names
+from .swiss import create_next_swiss_round, create_swiss_bracket
 from players.models import Player
 
 
 def tournament_list(request):
     """Display a list of all tournaments"""
-    tournaments = Tournament.objects.all()
+    tournaments = Tournament.objects.with_stats()
     context = {
         'tournaments': tournaments,
         'user': request.user
@@ -21,23 +35,26 @@ def tournament_list(request):
 
 def tournament_detail(request, tournament_id):
     """Display tournament details and allow bracket creation"""
-    tournament = get_object_or_404(Tournament, id=tournament_id)
+    tournament = get_object_or_404(Tournament.objects.with_stats(), id=tournament_id)
     
     # Check if user has a saved bracket for this tournament
     user_bracket = None
+    is_registered = False
     if request.user.is_authenticated:
         try:
-            user_bracket = SavedBracket.objects.get(tournament=tournament, user=request.user)
+            user_bracket = SavedBracket.objects.defer('snapshot').get(tournament=tournament, user=request.user)
         except SavedBracket.DoesNotExist:
             pass
+        is_registered = tournament.participants.filter(player__user=request.user, is_active=True).exists()
     
     # Get participants
-    participants = tournament.participants.filter(is_active=True)
+    participants = tournament.participants.filter(is_active=True).select_related('player')
     
     context = {
         'tournament': tournament,
         'participants': participants,
         'user_bracket': user_bracket,
+        'is_registered': is_registered,
         'can_register': tournament.can_user_register(request.user) if request.user.is_authenticated else False
     }
     return render(request, 'matches/tournament_detail.html', context)
@@ -79,21 +96,24 @@ def register_tournament(request, tournament_id):
     """Register user for a tournament"""
     tournament = get_object_or_404(Tournament, id=tournament_id)
     
-    if not tournament.can_user_register(request.user):
-        messages.error(request, 'Cannot register for this tournament.')
-        return redirect('tournament_detail', tournament_id=tournament_id)
-    
     try:
         player = request.user.player
-        TournamentParticipant.objects.create(
-            tournament=tournament,
-            player=player
-        )
-        messages.success(request, f'Successfully registered for "{tournament.name}"!')
     except Player.DoesNotExist:
         messages.error(request, 'You need to create a player profile first.')
-    except Exception as e:
-        messages.error(request, f'Registration failed: {str(e)}')
+        return redirect('tournament_detail', tournament_id=tournament_id)
+    
+    try:
+        _, created = register_participant(tournament, player)
+    except ValueError as e:
+        messages.error(request, f'{e}.')
+    except OperationalError:
+        # The database stayed locked past the busy timeout during a registration rush
+        messages.error(request, 'Registration is busy right now, please try again in a moment.')
+    else:
+        if created:
+            messages.success(request, f'Successfully registered for "{tournament.name}"!')
+        else:
+            messages.info(request, f'You are already registered for "{tournament.name}".')
     
     return redirect('tournament_detail', tournament_id=tournament_id)
 
@@ -105,18 +125,16 @@ def save_bracket(request, tournament_id):
     
     if request.method == 'POST':
         bracket_name = request.POST.get('bracket_name', 'My Bracket')
-        bracket_data = request.session.get('bracket_data', [])
+        draft = get_session_draft(request)
+        bracket_data = draft.get_bracket_data() if draft else []
         
         if not bracket_data:
             messages.error(request, 'No bracket data to save.')
             return redirect('brackets_view')
         
         try:
-            # Delete existing bracket if it exists
-            SavedBracket.objects.filter(tournament=tournament, user=request.user).delete()
-            
-            # Create new bracket
-            saved_bracket = create_bracket_from_session_data(
+            # Create the bracket, or update the existing one without replacing its row
+            saved_bracket, created = save_bracket_from_session_data(
                 tournament=tournament,
                 user=request.user,
                 bracket_data=bracket_data,
@@ -138,13 +156,11 @@ def load_bracket(request, tournament_id):
     tournament = get_object_or_404(Tournament, id=tournament_id)
     
     try:
-        saved_bracket = SavedBracket.objects.get(tournament=tournament, user=request.user)
-        bracket_data = convert_bracket_to_session_data(saved_bracket)
+        saved_bracket = SavedBracket.objects.select_related('pick_set').get(tournament=tournament, user=request.user)
+        bracket_data = saved_bracket.get_session_data()
         
-        # Store in session
-        request.session['bracket_data'] = bracket_data
-        request.session['num_participants'] = tournament.participant_count
-        request.session['total_slots'] = len(bracket_data[0]) if bracket_data else 0
+        # Make it the session's bracket draft
+        start_session_draft(request, bracket_data, tournament.participant_count)
         
         messages.success(request, f'Bracket "{saved_bracket.name}" loaded successfully!')
         return redirect('brackets_view')
@@ -154,10 +170,123 @@ def load_bracket(request, tournament_id):
         return redirect('tournament_detail', tournament_id=tournament_id)
 
 
+@require_http_methods(["POST"])
+def seed_bracket(request, tournament_id):
+    """Start a bracket with the tournament's participants placed by seed"""
+    tournament = get_object_or_404(Tournament, id=tournament_id)
+    names = seeded_participant_names(tournament)
+    
+    if not names:
+        messages.error(request, 'This tournament has no participants to seed.')
+        return redirect('tournament_detail', tournament_id=tournament_id)
+    
+    bracket_data = generate_seeded_bracket(names)
+    start_session_draft(request, bracket_data, len(names))
+    
+    messages.success(request, f'Seeded bracket created for "{tournament.name}" with {len(names)} participants.')
+    return redirect('brackets_view')
+
+
+@login_required
+@require_http_methods(["POST"])
+def create_round_robin(request, tournament_id):
+    """Create a round-robin bracket between the tournament's participants"""
+    tournament = get_object_or_404(Tournament, id=tournament_id)
+    
+    if SavedBracket.objects.filter(tournament=tournament, user=request.user).exists():
+        messages.error(request, 'You already have a bracket for this tournament.')
+        return redirect('tournament_detail', tournament_id=tournament_id)
+    
+    players = Player.objects.filter(
+        tournament_participations__tournament=tournament,
+        tournament_participations__is_active=True
+    ).order_by(
+        F('tournament_participations__seed_position').asc(nulls_last=True),
+        'tournament_participations__registration_date'
+    )
+    if players.count() < 2:
+        messages.error(request, 'A round robin needs at least two participants.')
+        return redirect('tournament_detail', tournament_id=tournament_id)
+    
+    saved_bracket = create_round_robin_bracket(
+        tournament=tournament,
+        user=request.user,
+        entrants=players.iterator(),
+        bracket_name=request.POST.get('bracket_name', 'My Bracket')
+    )
+    messages.success(request, f'Round robin "{saved_bracket.name}" created with {saved_bracket.match_count} matches.')
+    return redirect('tournament_detail', tournament_id=tournament_id)
+
+
+@login_required
+@require_http_methods(["POST"])
+def create_double_elimination(request, tournament_id):
+    """Create a seeded double-elimination bracket between the tournament's participants"""
+    tournament = get_object_or_404(Tournament, id=tournament_id)
+    
+    if SavedBracket.objects.filter(tournament=tournament, user=request.user).exists():
+        messages.error(request, 'You already have a bracket for this tournament.')
+        return redirect('tournament_detail', tournament_id=tournament_id)
+    
+    names = seeded_participant_names(tournament)
+    if len(names) < 2:
+        messages.error(request, 'A double-elimination bracket needs at least two participants.')
+        return redirect('tournament_detail', tournament_id=tournament_id)
+    
+    saved_bracket = create_double_elimination_bracket(
+        tournament=tournament,
+        user=request.user,
+        names=names,
+        bracket_name=request.POST.get('bracket_name', 'My Bracket')
+    )
+    messages.success(request, f'Double-elimination bracket "{saved_bracket.name}" created.')
+    return redirect('tournament_detail', tournament_id=tournament_id)
+
+
+@login_required
+@require_http_methods(["POST"])
+def create_swiss(request, tournament_id):
+    """Create a Swiss bracket for the tournament and pair its first round"""
+    tournament = get_object_or_404(Tournament, id=tournament_id)
+    
+    if SavedBracket.objects.filter(tournament=tournament, user=request.user).exists():
+        messages.error(request, 'You already have a bracket for this tournament.')
+        return redirect('tournament_detail', tournament_id=tournament_id)
+    
+    try:
+        with transaction.atomic():
+            saved_bracket = create_swiss_bracket(
+                tournament=tournament,
+                user=request.user,
+                bracket_name=request.POST.get('bracket_name', 'My Bracket')
+            )
+            create_next_swiss_round(saved_bracket)
+        messages.success(request, f'Swiss bracket "{saved_bracket.name}" created and round 1 paired.')
+    except ValueError as e:
+        messages.error(request, str(e))
+    return redirect('tournament_detail', tournament_id=tournament_id)
+
+
+@login_required
+@require_http_methods(["POST"])
+def swiss_next_round(request, tournament_id):
+    """Pair the next round of the user's Swiss bracket"""
+    saved_bracket = get_object_or_404(
+        SavedBracket.objects.defer('snapshot'), tournament_id=tournament_id, user=request.user, bracket_type='swiss'
+    )
+    
+    try:
+        matches = create_next_swiss_round(saved_bracket)
+        messages.success(request, f'Round {matches[0].round_number + 1} paired ({len(matches)} matches).')
+    except ValueError as e:
+        messages.error(request, str(e))
+    return redirect('tournament_detail', tournament_id=tournament_id)
+
+
 @login_required
 def user_brackets(request):
     """Display user's saved brackets"""
-    brackets = SavedBracket.objects.filter(user=request.user).select_related('tournament')
+    brackets = SavedBracket.objects.filter(user=request.user).select_related('tournament').defer('snapshot')
     context = {
         'brackets': brackets
     }
@@ -178,4 +307,222 @@ def tournament_participants_api(request, tournament_id):
             'seed_position': participant.seed_position
         })
     
-    return JsonResponse({'participants': data})
\ No newline at end of file
+    return JsonResponse({'participants': data})
+
+
+@login_required
+@require_http_methods(["POST"])
+def tournament_roster_api(request, tournament_id):
+    """
+    API endpoint for the organizer to register a roster of players at once.
+    Expects a JSON body like {"players": [12, 15, {"player_id": 18, "seed_position": 1}], "assign_seeds": false},
+    or a text/csv body of player_id[,seed_position] rows.
+    """
+    tournament = get_object_or_404(Tournament, id=tournament_id, created_by=request.user)
+    try:
+        if request.content_type == 'text/csv':
+            entries = parse_roster_csv(request.body.decode('utf-8'))
+            assign_seeds = request.GET.get('assign_seeds') == '1'
+        else:
+            payload = json.loads(request.body)
+            entries = [
+                (int(entry['player_id']), int(entry['seed_position']) if entry.get('seed_position') is not None else None)
+                if isinstance(entry, dict) else (int(entry), None)
+                for entry in payload['players']
+            ]
+            assign_seeds = bool(payload.get('assign_seeds'))
+    except (ValueError, KeyError, TypeError, UnicodeDecodeError) as e:
+        return JsonResponse({'error': f'Expected a list of players or a CSV roster: {e}'}, status=400)
+    
+    try:
+        summary = register_roster(tournament, entries, assign_seeds=assign_seeds)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({'success': True, **summary})
+
+
+@require_http_methods(["GET"])
+def bracket_standings_api(request, bracket_id):
+    """API endpoint to get round-robin standings for a bracket"""
+    saved_bracket = get_object_or_404(SavedBracket.objects.defer('snapshot'), id=bracket_id, bracket_type='round_robin')
+    if not saved_bracket.is_public and saved_bracket.user_id != request.user.id:
+        return JsonResponse({'error': 'Bracket not found'}, status=404)
+    
+    return JsonResponse({'standings': round_robin_standings(saved_bracket)})
+
+
+@login_required
+@require_http_methods(["POST"])
+def bracket_result_api(request, bracket_id):
+    """
+    API endpoint to record a match result in a saved double-elimination bracket.
+    Expects a JSON body like {"round_number": 0, "match_number": 3, "score1": 21, "score2": 15}.
+    """
+    saved_bracket = get_object_or_404(
+        SavedBracket.objects.defer('snapshot'), id=bracket_id, user=request.user, bracket_type='double_elimination'
+    )
+    try:
+        payload = json.loads(request.body)
+        round_number = int(payload['round_number'])
+        match_number = int(payload['match_number'])
+        score1 = int(payload['score1'])
+        score2 = int(payload['score2'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected round_number, match_number, score1 and score2'}, status=400)
+    
+    try:
+        changed = record_double_elimination_result(saved_bracket, round_number, match_number, score1, score2)
+    except BracketMatch.DoesNotExist:
+        return JsonResponse({'error': 'Match not found'}, status=404)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({'matches': [{
+        'round_number': match.round_number,
+        'match_number': match.match_number,
+        'team1': match.team1_name,
+        'team2': match.team2_name,
+        'score1': match.team1_score,
+        'score2': match.team2_score,
+        'winner': match.winner_name
+    } for match in changed]})
+
+
+@require_http_methods(["GET"])
+def tournament_leaderboard_api(request, tournament_id):
+    """API endpoint to get the top of a tournament's bracket-pool leaderboard (public brackets and the user's own)"""
+    tournament = get_object_or_404(Tournament, id=tournament_id)
+    try:
+        limit = min(max(int(request.GET.get('limit', 25)), 1), 100)
+    except ValueError:
+        limit = 25
+    
+    data = []
+    # Ranks count public brackets only, so the user's private brackets don't push others down
+    public_ahead = 0
+    public_at_points = 0
+    previous_points = None
+    for result in leaderboard_top(tournament, limit, request.user):
+        if result.points_earned != previous_points:
+            public_ahead += public_at_points
+            public_at_points = 0
+            previous_points = result.points_earned
+        if result.saved_bracket.is_public:
+            public_at_points += 1
+        data.append({
+            'rank': public_ahead + 1,
+            'bracket_id': result.saved_bracket_id,
+            'bracket_name': result.saved_bracket.name,
+            'user': result.saved_bracket.user.username,
+            'points': result.points_earned,
+            'max_possible_points': result.max_possible_points
+        })
+    
+    response = {'leaderboard': data}
+    if request.user.is_authenticated:
+        response['my_brackets'] = [{
+            'bracket_id': result.saved_bracket_id,
+            'rank': leaderboard_rank(result),
+            'points': result.points_earned,
+            'max_possible_points': result.max_possible_points
+        } for result in TournamentResult.objects.filter(tournament=tournament, saved_bracket__user=request.user)]
+    return JsonResponse(response)
+
+
+@login_required
+@require_http_methods(["POST"])
+def official_result_api(request, tournament_id):
+    """
+    API endpoint for the organizer to record an official result and update the leaderboard.
+    Expects a JSON body like {"round_number": 0, "match_number": 3, "winner": "Jane Doe"}.
+    """
+    tournament = get_object_or_404(Tournament, id=tournament_id, created_by=request.user)
+    try:
+        payload = json.loads(request.body)
+        round_number = int(payload['round_number'])
+        match_number = int(payload['match_number'])
+        winner = str(payload['winner'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected round_number, match_number and winner'}, status=400)
+    
+    try:
+        record_official_result(tournament, round_number, match_number, winner)
+    except BracketMatch.DoesNotExist:
+        return JsonResponse({'error': 'Match not found'}, status=404)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({'success': True})
+
+
+@require_http_methods(["GET"])
+def tournament_picks_api(request, tournament_id):
+    """API endpoint to get how public brackets picked each slot, optionally for one round (?round=)"""
+    tournament = get_object_or_404(Tournament, id=tournament_id)
+    try:
+        round_number = int(request.GET['round']) if request.GET.get('round') else None
+    except ValueError:
+        return JsonResponse({'error': 'round must be a number'}, status=400)
+    
+    data = []
+    for (slot_round, slot_match), picks in pick_distribution(tournament, round_number).items():
+        data.append({
+            'round_number': slot_round,
+            'match_number': slot_match,
+            'picks': [{'team': team, 'count': count, 'percentage': round(percentage, 1)} for team, count, percentage in picks]
+        })
+    
+    return JsonResponse({'slots': data})
+
+
+@login_required
+@require_http_methods(["POST"])
+def tournament_schedule_api(request, tournament_id):
+    """
+    API endpoint for the organizer to schedule the official bracket's pending matches.
+    Expects a JSON body like {"courts": 4, "start": "2024-05-01T09:00:00Z"}; add
+    "overruns": [{"round_number": 1, "match_number": 0, "expected_end": "..."}] to re-plan
+    around matches running long. Optional "match_minutes" and "rest_minutes" override the settings.
+    """
+    tournament = get_object_or_404(Tournament, id=tournament_id, created_by=request.user)
+    if tournament.official_bracket is None:
+        return JsonResponse({'error': 'The tournament has no official bracket'}, status=400)
+    try:
+        payload = json.loads(request.body)
+        courts = int(payload['courts'])
+        start = _parse_api_datetime(payload['start']) if payload.get('start') else None
+        overruns = {
+            (int(overrun['round_number']), int(overrun['match_number'])): _parse_api_datetime(overrun['expected_end'])
+            for overrun in payload.get('overruns', [])
+        }
+        minutes = {key: int(payload[key]) for key in ('match_minutes', 'rest_minutes') if payload.get(key) is not None}
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected courts, and optionally start, overruns, match_minutes and rest_minutes'}, status=400)
+    
+    try:
+        planned = schedule_bracket(tournament.official_bracket, courts, start=start, overruns=overruns, **minutes)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    matches = BracketMatch.objects.filter(
+        saved_bracket=tournament.official_bracket, match_date__isnull=False
+    ).order_by('match_date', 'court')
+    return JsonResponse({'planned': planned, 'schedule': [{
+        'round_number': match.round_number,
+        'match_number': match.match_number,
+        'team1': match.team1_display_name,
+        'team2': match.team2_display_name,
+        'court': match.court,
+        'start': match.match_date.isoformat()
+    } for match in matches.select_related('team1_player', 'team2_player')]})
+
+
+def _parse_api_datetime(value):
+    """Parse an ISO 8601 datetime from an API payload, as the current timezone if it has none"""
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise ValueError(f"{value!r} is not a datetime")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
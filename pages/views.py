@@ -1,5 +1,10 @@
+import json
+
+from django.http import JsonResponse
 from django.shortcuts import render
-import math
+from django.views.decorators.http import require_POST
+from matches.drafts import get_session_draft, start_session_draft
+from matches.topology import get_bracket_topology, get_bracket_topology_for_data
 
 # Create your views here.
 def home_view(request, *args, **kwargs):
@@ -61,15 +66,18 @@ def brackets_view(request):
     if request.method == 'POST':
         if 'submit_scores' in request.POST:
             # Handle score submission
-            bracket_data = request.session.get('bracket_data', [])            
-            if bracket_data:
+            draft = get_session_draft(request)
+            if draft:
                 # Process scores and update bracket
-                bracket_data = process_scores(request.POST, bracket_data)
-                request.session['bracket_data'] = bracket_data
+                bracket_data = process_scores(request.POST, draft.get_bracket_data())
+                if not draft.store(bracket_data):
+                    context['error'] = "This bracket was changed in another window. Please review it and try again."
+                    draft.refresh_from_db()
+                    bracket_data = draft.get_bracket_data()
                 context['bracket_data'] = bracket_data
                 context['participants'] = request.session.get('participants', [])
-                context['num_participants'] = request.session.get('num_participants', 0)
-                context['total_slots'] = request.session.get('total_slots', 0)
+                context['num_participants'] = draft.num_participants
+                context['total_slots'] = draft.total_slots
                 context['show_scores'] = True
             else:
                 context['error'] = "No bracket data found. Please generate a bracket first."
@@ -84,10 +92,8 @@ def brackets_view(request):
                         # Generate bracket with empty slots
                         bracket_data = generate_empty_bracket(num_participants)
                         
-                        # Store in session for score updates
-                        request.session['bracket_data'] = bracket_data
-                        request.session['num_participants'] = num_participants
-                        request.session['total_slots'] = len(bracket_data[0])
+                        # Store as the session's draft for score updates
+                        start_session_draft(request, bracket_data, num_participants)
                         
                         context['bracket_data'] = bracket_data
                         context['num_participants'] = num_participants
@@ -98,11 +104,11 @@ def brackets_view(request):
                     context['error'] = "Number of participants must be a valid integer"
     else:
         # GET request - check if we have existing bracket data
-        bracket_data = request.session.get('bracket_data', [])
-        if bracket_data:
-            context['bracket_data'] = bracket_data
-            context['num_participants'] = request.session.get('num_participants', 0)
-            context['total_slots'] = request.session.get('total_slots', 0)
+        draft = get_session_draft(request)
+        if draft:
+            context['bracket_data'] = draft.get_bracket_data()
+            context['num_participants'] = draft.num_participants
+            context['total_slots'] = draft.total_slots
             context['show_scores'] = True
     
     return render(request, "brackets.html", context)
@@ -112,127 +118,22 @@ def generate_empty_bracket(num_participants):
     Generate a single-elimination tournament bracket with empty slots for team names
     Returns a list of rounds, where each round is a list of matches
     """
-    # Find the next power of 2
-    next_power_of_2 = 2 ** math.ceil(math.log2(num_participants))
-    
-    # Create the bracket with empty slots
-    bracket = []
-    
-    # First round (seeding round)
-    first_round = []
-    total_slots = next_power_of_2
-    
-    # Calculate BYE distribution
-    byes_needed = total_slots - num_participants
-    byes_per_quarter = byes_needed // 4
-    extra_byes = byes_needed % 4
-    
-    # Create seeding positions
-    positions = list(range(total_slots))
-    
-    # Distribute BYEs evenly across quarters
-    bye_positions = []
-    quarter_size = total_slots // 4
-    
-    for quarter in range(4):
-        quarter_byes = byes_per_quarter + (1 if quarter < extra_byes else 0)
-        if quarter_byes > 0:
-            # Distribute BYEs within this quarter
-            start_pos = quarter * quarter_size
-            for i in range(quarter_byes):
-                bye_pos = start_pos + (i * 2) + 1
-                if bye_pos < start_pos + quarter_size:
-                    bye_positions.append(bye_pos)
-    
-    # Create first round matches
-    for i in range(0, total_slots, 2):
-        pos1, pos2 = i, i + 1
-        
-        if pos1 in bye_positions:
-            match = {
-                'team1': 'BYE',
-                'team2': '',  # Empty slot for team name input
-                'winner': '',  # Will be filled when team name is entered
-                'score1': None,
-                'score2': None,
-                'match_id': f"match_0_{len(first_round)}"
-            }
-        elif pos2 in bye_positions:
-            match = {
-                'team1': '',  # Empty slot for team name input
-                'team2': 'BYE',
-                'winner': '',  # Will be filled when team name is entered
-                'score1': None,
-                'score2': None,
-                'match_id': f"match_0_{len(first_round)}"
-            }
-        else:
-            match = {
-                'team1': '',  # Empty slot for team name input
-                'team2': '',  # Empty slot for team name input
-                'winner': None,  # No auto-winner for non-BYE matches
-                'score1': None,
-                'score2': None,
-                'match_id': f"match_0_{len(first_round)}"
-            }
-        
-        first_round.append(match)
-    
-    bracket.append(first_round)
-    
-    # Generate subsequent rounds with empty matches
-    current_round = first_round
-    round_num = 1
-    while len(current_round) > 1:
-        next_round = []
-        for i in range(0, len(current_round), 2):
-            if i + 1 < len(current_round):
-                match = {
-                    'team1': None,
-                    'team2': None,
-                    'winner': None,
-                    'score1': None,
-                    'score2': None,
-                    'match_id': f"match_{round_num}_{len(next_round)}"
-                }
-                next_round.append(match)
-            else:
-                # Handle odd number of teams in round
-                match = {
-                    'team1': None,  # Will be filled from previous round winner
-                    'team2': None,
-                    'winner': None,
-                    'score1': None,
-                    'score2': None,
-                    'match_id': f"match_{round_num}_{len(next_round)}"
-                }
-                next_round.append(match)
-        
-        bracket.append(next_round)
-        current_round = next_round
-        round_num += 1
-    
-    return bracket
+    # The layout is computed once per size and copied from the cached template
+    return get_bracket_topology(num_participants).new_bracket()
 
 def _advance_winner_to_next_round(bracket_data, round_idx, match_idx, winner):
     """Helper function to advance a winner to the next round"""
-    if round_idx < len(bracket_data) - 1:
-        next_round_idx = round_idx + 1
-        next_match_idx = match_idx // 2
-        
-        if next_match_idx < len(bracket_data[next_round_idx]):
-            next_match = bracket_data[next_round_idx][next_match_idx]
-            if match_idx % 2 == 0:  # First team in pair
-                next_match['team1'] = winner
-            else:  # Second team in pair
-                next_match['team2'] = winner
-            
-            print(f"DEBUG: Advanced BYE winner {winner} to next round match {next_match['match_id']}")
+    topology = get_bracket_topology_for_data(bracket_data)
+    if topology.num_rounds != len(bracket_data):
+        return
+    target = topology.advance_target(round_idx, match_idx)
+    if target is not None:
+        next_round_idx, next_match_idx, side = target
+        next_match = bracket_data[next_round_idx][next_match_idx]
+        next_match[side] = winner
 
 def process_scores(request_data, bracket_data):
     """Process submitted scores and update bracket winners"""
-    print(f"DEBUG: Processing scores. Request data keys: {list(request_data.keys())}")
-    
     for round_idx, round_matches in enumerate(bracket_data):
         for match_idx, match in enumerate(round_matches):
             match_id = match['match_id']
@@ -261,15 +162,11 @@ def process_scores(request_data, bracket_data):
             score1_key = f"score1_{match_id}"
             score2_key = f"score2_{match_id}"
             
-            print(f"DEBUG: Checking match {match_id} - score1_key: {score1_key}, score2_key: {score2_key}")
-            
             if score1_key in request_data and score2_key in request_data:
                 try:
                     score1 = int(request_data[score1_key]) if request_data[score1_key] else None
                     score2 = int(request_data[score2_key]) if request_data[score2_key] else None
                     
-                    print(f"DEBUG: Match {match_id} - score1: {score1}, score2: {score2}")
-                    
                     if score1 is not None and score2 is not None:
                         match['score1'] = score1
                         match['score2'] = score2
@@ -282,13 +179,147 @@ def process_scores(request_data, bracket_data):
                         else:
                             match['winner'] = 'Tie'  # Handle ties if needed
                         
-                        print(f"DEBUG: Match {match_id} winner: {match['winner']}")
-                        
                         # Update next round if this isn't the final round
                         _advance_winner_to_next_round(bracket_data, round_idx, match_idx, match['winner'])
                 
                 except ValueError:
-                    print(f"DEBUG: Invalid score input for match {match_id}")
                     pass  # Invalid score input
     
     return bracket_data
+
+def _parse_match_id(match_id, bracket_data):
+    """Return (round_idx, match_idx) for a match id like 'match_2_5', or None if invalid"""
+    try:
+        prefix, round_idx, match_idx = match_id.split('_')
+        round_idx, match_idx = int(round_idx), int(match_idx)
+    except (AttributeError, ValueError):
+        return None
+    if prefix != 'match' or not 0 <= round_idx < len(bracket_data) or not 0 <= match_idx < len(bracket_data[round_idx]):
+        return None
+    return round_idx, match_idx
+
+def _propagate_winner(bracket_data, topology, round_idx, match_idx, winner, changed):
+    """
+    Push a match winner along its path towards the final. A later match whose
+    result was decided with the replaced team is reset, and the reset keeps
+    propagating, so at most one match per round is touched.
+    """
+    target = topology.advance_target(round_idx, match_idx)
+    while target is not None:
+        next_round_idx, next_match_idx, side = target
+        next_match = bracket_data[next_round_idx][next_match_idx]
+        previous = next_match[side]
+        if previous == winner:
+            break
+        next_match[side] = winner
+        changed.add((next_round_idx, next_match_idx))
+        if not previous or next_match['winner'] != previous:
+            break
+        next_match['winner'] = None
+        next_match['score1'] = None
+        next_match['score2'] = None
+        winner = None
+        target = topology.advance_target(next_round_idx, next_match_idx)
+
+def apply_match_results(bracket_data, results):
+    """
+    Apply a few match results to a bracket in place.
+
+    Each result is a dict with a 'match_id', and either 'score1'/'score2' or,
+    for first-round matches, 'team1'/'team2' names. Returns a tuple of the
+    sorted (round_idx, match_idx) positions that changed and a list of errors.
+    """
+    topology = get_bracket_topology_for_data(bracket_data)
+    # Winners are routed with the single-elimination layout, so other bracket shapes are left alone
+    if topology.round_sizes != tuple(len(round_matches) for round_matches in bracket_data):
+        return [], ["Results can only be entered for single-elimination brackets"]
+    changed = set()
+    errors = []
+    
+    for result in results:
+        match_id = result.get('match_id') if isinstance(result, dict) else None
+        position = _parse_match_id(match_id, bracket_data)
+        if position is None:
+            errors.append(f"Unknown match: {match_id}")
+            continue
+        round_idx, match_idx = position
+        match = bracket_data[round_idx][match_idx]
+        
+        if round_idx == 0:
+            renamed = False
+            for side in ('team1', 'team2'):
+                if side in result:
+                    name = str(result[side] or '').strip()
+                    renamed = renamed or name != match[side]
+                    match[side] = name
+                    changed.add(position)
+            if renamed and (match.get('winner') or match.get('score1') is not None or match.get('score2') is not None):
+                # The result belonged to the old pairing, so it is dropped along its path
+                match['winner'] = None
+                match['score1'] = None
+                match['score2'] = None
+                _propagate_winner(bracket_data, topology, round_idx, match_idx, None, changed)
+            if match['team1'] == 'BYE' and match['team2']:
+                match['winner'] = match['team2']
+                _propagate_winner(bracket_data, topology, round_idx, match_idx, match['winner'], changed)
+                continue
+            elif match['team2'] == 'BYE' and match['team1']:
+                match['winner'] = match['team1']
+                _propagate_winner(bracket_data, topology, round_idx, match_idx, match['winner'], changed)
+                continue
+        
+        if 'score1' not in result and 'score2' not in result:
+            continue
+        try:
+            score1 = int(result.get('score1'))
+            score2 = int(result.get('score2'))
+        except (TypeError, ValueError):
+            errors.append(f"Invalid scores for {match_id}")
+            continue
+        if score1 < 0 or score2 < 0:
+            errors.append(f"Invalid scores for {match_id}")
+            continue
+        if score1 == score2:
+            errors.append(f"Scores for {match_id} cannot be tied")
+            continue
+        if not match['team1'] or not match['team2']:
+            errors.append(f"Both teams of {match_id} must be known before entering scores")
+            continue
+        
+        match['score1'] = score1
+        match['score2'] = score2
+        match['winner'] = match['team1'] if score1 > score2 else match['team2']
+        changed.add(position)
+        _propagate_winner(bracket_data, topology, round_idx, match_idx, match['winner'], changed)
+    
+    return sorted(changed), errors
+
+@require_POST
+def bracket_scores_api(request):
+    """
+    API endpoint to record one or a few match results in the session's bracket draft.
+    Expects a JSON body like {"results": [{"match_id": "match_0_3", "score1": 21, "score2": 15}]}
+    and returns only the matches that changed.
+    """
+    draft = get_session_draft(request)
+    if not draft:
+        return JsonResponse({'error': 'No bracket data found. Please generate a bracket first.'}, status=400)
+    bracket_data = draft.get_bracket_data()
+    
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Request body must be valid JSON'}, status=400)
+    results = payload.get('results') if isinstance(payload, dict) else None
+    if not isinstance(results, list):
+        return JsonResponse({'error': 'Expected a list of results'}, status=400)
+    
+    changed, errors = apply_match_results(bracket_data, results)
+    if changed and not draft.store(bracket_data):
+        return JsonResponse({'error': 'The bracket was changed by another request. Please retry.'}, status=409)
+    
+    return JsonResponse({
+        'matches': [bracket_data[round_idx][match_idx] for round_idx, match_idx in changed],
+        'errors': errors,
+        'version': draft.version
+    }, status=400 if errors and not changed else 200)
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.player_leaderboard, name='player_leaderboard'),
+    path('<int:player_id>/', views.player_profile, name='player_profile'),
+]
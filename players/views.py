@@ -1,3 +1,30 @@
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 
-# Create your views here.
+from matches.models import PlayerStats
+from .models import Player
+
+
+def player_profile(request, player_id):
+    """Show a player's match statistics and rating"""
+    stats = PlayerStats.objects.select_related('player', 'player__rating').filter(player_id=player_id).first()
+    if stats is None:
+        # No recorded results yet
+        stats = PlayerStats(player=get_object_or_404(Player, id=player_id))
+    
+    context = {
+        'player': stats.player,
+        'stats': stats,
+    }
+    return render(request, 'players/player_profile.html', context)
+
+
+def player_leaderboard(request):
+    """Show the players with the most wins"""
+    stats = PlayerStats.objects.select_related('player', 'player__rating').filter(
+        matches_played__gt=0
+    ).order_by('-wins', 'losses', 'player_id')[:50]
+    
+    context = {
+        'player_stats': stats,
+    }
+    return render(request, 'players/player_leaderboard.html', context)